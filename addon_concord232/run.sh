@@ -11,6 +11,10 @@ MQTT_USERNAME="$(jq -r '.mqtt_username // empty' /data/options.json)"
 MQTT_PASSWORD="$(jq -r '.mqtt_password // empty' /data/options.json)"
 MQTT_TOPIC_PREFIX="$(jq -r '.mqtt_topic_prefix // "concord232"' /data/options.json)"
 MQTT_PUBLISH_TOUCHPAD="$(jq -r '.mqtt_publish_touchpad // true' /data/options.json)"
+# Not "// true": jq's alternative operator also replaces an explicit false.
+MQTT_PUBLISH_STATE="$(jq -r 'if .mqtt_publish_state == false then "false" else "true" end' /data/options.json)"
+MQTT_DISCOVERY="$(jq -r '.mqtt_discovery // false' /data/options.json)"
+MQTT_COMMANDS="$(jq -r '.mqtt_commands // false' /data/options.json)"
 MQTT_TLS="$(jq -r '.mqtt_tls // false' /data/options.json)"
 
 if [ -z "$SERIAL" ]; then
@@ -30,6 +34,15 @@ if [ -n "$MQTT_HOST" ]; then
   if [ "$MQTT_PUBLISH_TOUCHPAD" != "true" ]; then
     set -- "$@" --mqtt-no-touchpad
   fi
+  if [ "$MQTT_PUBLISH_STATE" != "true" ]; then
+    set -- "$@" --mqtt-no-state
+  fi
+  if [ "$MQTT_DISCOVERY" = "true" ]; then
+    set -- "$@" --mqtt-discovery
+  fi
+  if [ "$MQTT_COMMANDS" = "true" ]; then
+    set -- "$@" --mqtt-commands
+  fi
   if [ "$MQTT_TLS" = "true" ]; then
     set -- "$@" --mqtt-tls
   fi
@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+
+class PanelState:
+    """Stand-in for AlarmPanelInterface with the attributes parsers update."""
+
+    def __init__(self) -> None:
+        self.zones: dict = {}
+        self.partitions: dict = {}
+        self.display_messages: list = []
+
+
+@pytest.fixture
+def panel_state() -> PanelState:
+    return PanelState()
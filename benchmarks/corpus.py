@@ -0,0 +1,21 @@
+"""Loader for the frame corpus in frames.txt."""
+
+import os
+from typing import List, Tuple
+
+from concord232.concord import decode_message_from_ascii
+
+FRAMES_FILE = os.path.join(os.path.dirname(__file__), "frames.txt")
+
+
+def load_frames() -> List[Tuple[str, List[int]]]:
+    """Return (command ID, decoded frame) pairs from the capture corpus."""
+    frames = []
+    with open(FRAMES_FILE) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            command_id, ascii_msg = line.split()
+            frames.append((command_id, decode_message_from_ascii(ascii_msg)))
+    return frames
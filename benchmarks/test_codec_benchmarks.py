@@ -0,0 +1,123 @@
+"""
+Microbenchmarks for the wire codec, text/alarm decoders and RX parsers.
+
+Run with:  pytest benchmarks/ --benchmark-group-by=group
+Compare:   pytest benchmarks/ --benchmark-autosave
+           pytest benchmarks/ --benchmark-compare
+"""
+
+import pytest
+from corpus import load_frames
+
+from concord232.concord import (
+    compute_checksum,
+    decode_message_from_ascii,
+    encode_message_to_ascii,
+    validate_message_checksum,
+)
+from concord232.concord_commands import RX_COMMANDS, decode_alarm_type
+from concord232.concord_helpers import ascii_hex_to_byte
+from concord232.concord_tokens import decode_text_tokens
+
+CORPUS = load_frames()
+PARSERS = {cid: (code, parser) for code, (cid, _, parser) in RX_COMMANDS.items()}
+# Message sizes spanning a short frame to far past CONCORD_MAX_LEN; a codec
+# whose cost grows faster than linearly shows up as a widening gap here.
+SIZES = (16, 58, 1024, 8192)
+
+
+def _sized(n):
+    return [i % 256 for i in range(n)]
+
+
+def test_corpus_covers_every_rx_command():
+    assert {cid for cid, _ in CORPUS} == set(PARSERS)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_compute_checksum(benchmark, size):
+    benchmark.group = "compute_checksum"
+    msg = _sized(size)
+    assert benchmark(compute_checksum, msg) == sum(msg) % 256
+
+
+def test_validate_corpus_checksums(benchmark):
+    benchmark.group = "compute_checksum"
+    msgs = [m for _, m in CORPUS]
+    assert benchmark(lambda: all(validate_message_checksum(m) for m in msgs))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_encode_message_to_ascii(benchmark, size):
+    benchmark.group = "encode_message_to_ascii"
+    msg = _sized(size)
+    assert len(benchmark(encode_message_to_ascii, msg)) == 2 * size
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_decode_message_from_ascii(benchmark, size):
+    benchmark.group = "decode_message_from_ascii"
+    ascii_msg = encode_message_to_ascii(_sized(size))
+    assert len(benchmark(decode_message_from_ascii, ascii_msg)) == size
+
+
+def test_encode_corpus(benchmark):
+    benchmark.group = "encode_message_to_ascii"
+    msgs = [m for _, m in CORPUS]
+    benchmark(lambda: [encode_message_to_ascii(m) for m in msgs])
+
+
+def test_decode_corpus(benchmark):
+    benchmark.group = "decode_message_from_ascii"
+    ascii_msgs = [encode_message_to_ascii(m) for _, m in CORPUS]
+    benchmark(lambda: [decode_message_from_ascii(a) for a in ascii_msgs])
+
+
+def test_ascii_hex_to_byte(benchmark):
+    benchmark.group = "ascii_hex_to_byte"
+    assert benchmark(ascii_hex_to_byte, "D6") == 0xD6
+
+
+def test_ascii_hex_to_byte_list(benchmark):
+    benchmark.group = "ascii_hex_to_byte"
+    assert benchmark(ascii_hex_to_byte, ["D", "6"]) == 0xD6
+
+
+@pytest.mark.parametrize(
+    "command_id", ["ZONE_DATA", "TOUCHPAD"], ids=["zone_text", "touchpad_text"]
+)
+def test_decode_text_tokens(benchmark, command_id):
+    benchmark.group = "decode_text_tokens"
+    offset = 9 if command_id == "ZONE_DATA" else 6
+    token_lists = [m[offset:-1] for cid, m in CORPUS if cid == command_id]
+    benchmark(lambda: [decode_text_tokens(t) for t in token_lists])
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_decode_text_tokens_scaling(benchmark, size):
+    benchmark.group = "decode_text_tokens"
+    tokens = [0x11 + i % 26 for i in range(size)]
+    assert len(benchmark(decode_text_tokens, tokens)) == size
+
+
+def test_decode_alarm_type(benchmark):
+    benchmark.group = "decode_alarm_type"
+    assert benchmark(decode_alarm_type, 15, 21)[0] == "System Trouble"
+
+
+def test_decode_alarm_type_unknown(benchmark):
+    benchmark.group = "decode_alarm_type"
+    assert benchmark(decode_alarm_type, 99, 1) == ("Unknown", "Unknown")
+
+
+@pytest.mark.parametrize("command_id", sorted(PARSERS))
+def test_rx_parser(benchmark, panel_state, command_id):
+    benchmark.group = "rx_parsers"
+    _, parser = PARSERS[command_id]
+    msgs = [m for cid, m in CORPUS if cid == command_id]
+
+    def parse_all():
+        return [parser(panel_state, m) for m in msgs]
+
+    results = benchmark(parse_all)
+    assert all(isinstance(r, dict) for r in results)
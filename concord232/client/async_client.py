@@ -0,0 +1,275 @@
+"""
+asyncio client for the concord232 server HTTP API (requires aiohttp; install
+the ``async`` extra).
+
+AsyncClient mirrors Client, but keeps one pooled keep-alive session, bounds
+every request with a timeout and retries reads with jittered exponential
+backoff.  gather_state() fetches panel, zones and partitions concurrently,
+and gather_states() sweeps many servers over a single shared session, so a
+fleet-wide status check costs about one round trip.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - exercised only without the extra
+    aiohttp = None  # type: ignore[assignment]
+
+from concord232.client.client import (
+    DEFAULT_BACKOFF_SECS,
+    DEFAULT_RETRIES,
+    RETRY_STATUSES,
+)
+
+DEFAULT_CONNECT_TIMEOUT_SECS = 3.0
+DEFAULT_TIMEOUT_SECS = 10.0
+DEFAULT_POOL_SIZE = 100
+
+
+def _require_aiohttp() -> None:
+    if aiohttp is None:
+        raise RuntimeError(
+            "AsyncClient requires aiohttp; install concord232[async] to use it"
+        )
+
+
+def make_session(
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECS,
+    timeout: float = DEFAULT_TIMEOUT_SECS,
+    pool_size: int = DEFAULT_POOL_SIZE,
+) -> "aiohttp.ClientSession":
+    """
+    Create a keep-alive session suitable for sharing between AsyncClients.
+    Args:
+        connect_timeout (float): Seconds allowed to establish a connection.
+        timeout (float): Seconds allowed for a whole request.
+        pool_size (int): Maximum open connections across all hosts.
+    Returns:
+        aiohttp.ClientSession: Session the caller must close.
+    """
+    _require_aiohttp()
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=pool_size, keepalive_timeout=30),
+        timeout=aiohttp.ClientTimeout(total=timeout, connect=connect_timeout),
+    )
+
+
+class AsyncClient(object):
+    """
+    asyncio client for the concord232 server HTTP API.  Use as an async
+    context manager, or call close() when done.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        session: Optional["aiohttp.ClientSession"] = None,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECS,
+        timeout: float = DEFAULT_TIMEOUT_SECS,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF_SECS,
+    ) -> None:
+        """
+        Args:
+            url (str): Base URL of the concord232 server (may include
+                ``/panels/<id>``).
+            session (aiohttp.ClientSession, optional): Shared session from
+                make_session(); it is not closed by this client.  By default
+                the client creates (and closes) its own.
+            connect_timeout (float): Connect timeout for an own session.
+            timeout (float): Total request timeout for an own session.
+            retries (int): Extra attempts for reads that fail with a
+                connection error, a timeout or a 502/503/504.
+            backoff (float): Base delay before the first retry; doubled per
+                attempt, with full jitter.
+        """
+        _require_aiohttp()
+        self._url = url.rstrip("/")
+        self._session = session
+        self._owns_session = session is None
+        self._connect_timeout = connect_timeout
+        self._timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        if self._session is None:
+            self._session = make_session(self._connect_timeout, self._timeout)
+        return self._session
+
+    async def close(self) -> None:
+        """Close the session if this client created it."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_json(self, path: str) -> Any:
+        """GET *path* and decode the JSON body, retrying transient failures."""
+        session = self._get_session()
+        attempt = 0
+        while True:
+            try:
+                async with session.get(self._url + path) as r:
+                    if r.status not in RETRY_STATUSES or attempt >= self.retries:
+                        r.raise_for_status()
+                        return await r.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.retries:
+                    raise
+            await asyncio.sleep(random.uniform(0, self.backoff * (2**attempt)))
+            attempt += 1
+
+    async def _command(self, params: Dict[str, str]) -> bool:
+        # Commands are not idempotent (a retried keypress is sent twice), so
+        # they get exactly one attempt.
+        async with self._get_session().get(self._url + "/command", params=params) as r:
+            return r.status == 200
+
+    async def get_panel(self) -> Dict[str, Any]:
+        """
+        Retrieve the panel state (trouble summary) from the server.
+        Returns:
+            dict: Panel state.
+        """
+        data = await self._get_json("/panel")
+        return data["panel"]
+
+    async def list_zones(self) -> List[Dict[str, Any]]:
+        """
+        Retrieve the list of zones from the server.
+        Returns:
+            list: List of zone dictionaries.
+        """
+        data = await self._get_json("/zones")
+        return data["zones"]
+
+    async def list_partitions(self) -> List[Dict[str, Any]]:
+        """
+        Retrieve the list of partitions from the server.
+        Returns:
+            list: List of partition dictionaries.
+        """
+        data = await self._get_json("/partitions")
+        return data["partitions"]
+
+    async def gather_state(self) -> Dict[str, Any]:
+        """
+        Fetch panel, zones and partitions concurrently.
+        Returns:
+            dict: ``{"panel": ..., "zones": [...], "partitions": [...]}``.
+        """
+        panel, zones, partitions = await asyncio.gather(
+            self.get_panel(), self.list_zones(), self.list_partitions()
+        )
+        return {"panel": panel, "zones": zones, "partitions": partitions}
+
+    async def arm(self, level: str, option: Optional[str] = None) -> bool:
+        """
+        Arm the system to the specified level with an optional option.
+        Args:
+            level (str): 'stay' or 'away'.
+            option (str, optional): 'silent' or 'instant'.
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        params: Dict[str, str] = {"cmd": "arm", "level": level}
+        if option is not None:
+            params["option"] = option
+        return await self._command(params)
+
+    async def disarm(self, master_pin: str) -> bool:
+        """
+        Disarm the system using the master PIN.
+        Args:
+            master_pin (str): The master PIN code.
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        return await self._command({"cmd": "disarm", "master_pin": master_pin})
+
+    async def send_keys(
+        self, keys: str, group: bool = False, partition: int = 1
+    ) -> bool:
+        """
+        Send keypresses to the panel.
+        Args:
+            keys (str): Keys to send.
+            group (bool): Whether to send as a group.
+            partition (int): Partition number.
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        return await self._command(
+            {
+                "cmd": "keys",
+                "keys": keys,
+                "group": str(group).lower(),
+                "partition": str(partition),
+            }
+        )
+
+    async def get_version(self) -> str:
+        """
+        Get the API version from the server.
+        Returns:
+            str: Version string.
+        """
+        async with self._get_session().get(self._url + "/version") as r:
+            if r.status == 404:
+                return "1.0"
+            data = await r.json(content_type=None)
+            return data["version"]
+
+
+async def gather_states(
+    urls: Sequence[str],
+    session: Optional["aiohttp.ClientSession"] = None,
+    **kwargs: Any,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run gather_state() against every server in *urls* concurrently.
+    Args:
+        urls (list): Server base URLs.
+        session (aiohttp.ClientSession, optional): Session to share; by
+            default one is created for the sweep and closed afterwards.
+        **kwargs: Passed to AsyncClient (retries, backoff).
+    Returns:
+        dict: Per URL, ``{"state": ..., "error": None, "seconds": ...}`` or
+        ``{"state": None, "error": "...", "seconds": ...}``.
+    """
+    _require_aiohttp()
+    own = session is None
+    if session is None:
+        session = make_session()
+
+    async def one(url: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            state = await AsyncClient(url, session=session, **kwargs).gather_state()
+            error = None
+        except Exception as e:
+            state, error = None, "%s: %s" % (type(e).__name__, e)
+        return {
+            "state": state,
+            "error": error,
+            "seconds": time.perf_counter() - started,
+        }
+
+    try:
+        results = await asyncio.gather(*(one(url) for url in urls))
+    finally:
+        if own:
+            await session.close()
+    return dict(zip(urls, results))
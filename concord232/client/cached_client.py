@@ -0,0 +1,197 @@
+"""
+Client that serves zone, partition and panel reads from a local cache kept
+current by the server's ``/stream`` push feed.
+
+CachedClient fetches a snapshot once over ``/stream`` and applies the
+zone / partition / panel deltas that follow, in a background thread.
+Reads are answered from memory while the stream has been heard from
+within *max_staleness* seconds (the server sends keepalives while idle);
+otherwise they fall back to a plain HTTP request, like Client.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from concord232.client.client import Client
+
+LOG = logging.getLogger("concord232.client")
+
+DEFAULT_MAX_STALENESS_SECS = 30.0
+DEFAULT_SYNC_TIMEOUT_SECS = 2.0
+RECONNECT_DELAY_SECS = 1.0
+# The server sends a keepalive every 15 s; a silent stream for longer than
+# this is treated as dead and reconnected.
+STREAM_READ_TIMEOUT_SECS = 45.0
+
+
+def iter_sse(lines: Iterable[str]) -> Iterator[Tuple[Optional[str], Any]]:
+    """
+    Parse Server-Sent Events from *lines*: yields (event, decoded JSON
+    data) per event, and (None, None) for every other line so callers can
+    track liveness.
+    """
+    event, data = "message", []
+    for line in lines:
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            else:
+                yield None, None
+            event, data = "message", []
+            continue
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+        yield None, None
+
+
+class CachedClient(Client):
+    """
+    Client whose list_zones(), list_partitions() and get_panel() are
+    served from a stream-fed cache.  Commands go straight to the server.
+    Call close() to stop the stream thread.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_staleness: float = DEFAULT_MAX_STALENESS_SECS,
+        sync_timeout: float = DEFAULT_SYNC_TIMEOUT_SECS,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Args:
+            url (str): Base URL of the concord232 server.
+            max_staleness (float): Serve cached data only if the stream
+                delivered something within this many seconds.
+            sync_timeout (float): How long the first read waits for the
+                initial snapshot before falling back to HTTP.
+            **kwargs: Timeout, retry and breaker settings for Client.
+        """
+        super().__init__(url, **kwargs)
+        self.max_staleness = max_staleness
+        self.sync_timeout = sync_timeout
+        self._lock = threading.Lock()
+        self._zones: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self._partitions: Dict[int, Dict[str, Any]] = {}
+        self._panel: Dict[str, Any] = {}
+        self._synced = threading.Event()
+        self._last_seen = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the stream thread (done automatically on the first read)."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, daemon=True, name="concord232-stream"
+            )
+            self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stop serving from the cache.  The stream thread (a daemon) exits
+        when the next event or keepalive arrives.
+        """
+        self._stop.set()
+        self._synced.clear()
+
+    @property
+    def staleness(self) -> Optional[float]:
+        """Seconds since the stream was last heard from; None if not synced."""
+        if not self._synced.is_set():
+            return None
+        return time.monotonic() - self._last_seen
+
+    def _fresh(self) -> bool:
+        if self._thread is None:
+            self.start()
+            self._synced.wait(self.sync_timeout)
+        staleness = self.staleness
+        return staleness is not None and staleness <= self.max_staleness
+
+    def list_zones(self) -> List[Dict[str, Any]]:
+        """
+        Zones from the cache, or from the server if the cache is stale.
+        Returns:
+            list: List of zone dictionaries.
+        """
+        if self._fresh():
+            with self._lock:
+                return [dict(z) for z in self._zones.values()]
+        return super().list_zones()
+
+    def list_partitions(self) -> List[Dict[str, Any]]:
+        """
+        Partitions from the cache, or from the server if the cache is stale.
+        Returns:
+            list: List of partition dictionaries.
+        """
+        if self._fresh():
+            with self._lock:
+                return [dict(p) for p in self._partitions.values()]
+        return super().list_partitions()
+
+    def get_panel(self) -> Dict[str, Any]:
+        """
+        Panel state (trouble summary) from the cache, or from the server if
+        the cache is stale.
+        Returns:
+            dict: Panel state.
+        """
+        if self._fresh():
+            with self._lock:
+                return dict(self._panel)
+        return super().get_panel()
+
+    def _apply(self, event: str, data: Any) -> None:
+        with self._lock:
+            if event == "snapshot":
+                self._panel = data["panel"]
+                self._zones = {(z["partition"], z["number"]): z for z in data["zones"]}
+                self._partitions = {p["number"]: p for p in data["partitions"]}
+            elif event == "zone":
+                self._zones[(data["partition"], data["number"])] = data
+            elif event == "partition":
+                self._partitions[data["number"]] = data
+            elif event == "panel":
+                self._panel = data
+        if event == "snapshot":
+            self._synced.set()
+
+    def _consume(self, response: requests.Response) -> None:
+        for event, data in iter_sse(response.iter_lines(decode_unicode=True)):
+            if self._stop.is_set():
+                return
+            self._last_seen = time.monotonic()
+            if event is not None:
+                self._apply(event, data)
+
+    def _run(self) -> None:
+        session = requests.Session()
+        while not self._stop.is_set():
+            try:
+                with session.get(
+                    self._url + "/stream",
+                    stream=True,
+                    timeout=(RECONNECT_DELAY_SECS * 5, STREAM_READ_TIMEOUT_SECS),
+                ) as r:
+                    r.raise_for_status()
+                    self._consume(r)
+            except (requests.RequestException, ValueError) as e:
+                if not self._stop.is_set():
+                    LOG.warning("Stream from %s failed: %s", self._url, e)
+            finally:
+                # Deltas may have been missed; reads go to HTTP until the
+                # next snapshot arrives.
+                self._synced.clear()
+            self._stop.wait(RECONNECT_DELAY_SECS)
+        session.close()
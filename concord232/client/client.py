@@ -1,23 +1,223 @@
+import random
+import threading
+import time
 from typing import Any, Dict, List, Optional, cast
 
 import requests
 
+DEFAULT_CONNECT_TIMEOUT_SECS = 3.05
+DEFAULT_READ_TIMEOUT_SECS = 10.0
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF_SECS = 0.2
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET_SECS = 30.0
+
+# Statuses worth retrying a read for; anything else is returned as is.
+RETRY_STATUSES = (502, 503, 504)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised without contacting the server while the circuit breaker is open."""
+
+
+class CircuitBreaker(object):
+    """
+    Fails fast after *threshold* consecutive failures.  After *reset_after*
+    seconds one trial request is let through (half open): success closes
+    the breaker, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        threshold: int = DEFAULT_BREAKER_THRESHOLD,
+        reset_after: float = DEFAULT_BREAKER_RESET_SECS,
+    ) -> None:
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """ "closed", "open" or "half_open"."""
+        if self.opened_at is None:
+            return "closed"
+        if self._trial or time.monotonic() - self.opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self.opened_at < self.reset_after:
+                return False
+            self._trial = True
+            return True
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._trial = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class EndpointStats(object):
+    """Request count, failures and latency for one endpoint."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "mean_seconds": (
+                self.total_seconds / self.requests if self.requests else 0.0
+            ),
+            "max_seconds": self.max_seconds,
+            "last_error": self.last_error,
+        }
+
 
 class Client(object):
     """
     Client for interacting with the concord232 server HTTP API.
     Provides methods to list zones, partitions, arm/disarm, send keys, and get version info.
+
+    Every request has a connect and read timeout.  Reads are retried on
+    connection errors, timeouts and 502/503/504 with jittered exponential
+    backoff; commands are sent once, since a repeated keypress is not
+    harmless.  After repeated failures a circuit breaker makes calls raise
+    CircuitOpenError immediately instead of waiting on a dead server.
     """
 
-    def __init__(self, url: str) -> None:
+    def __init__(
+        self,
+        url: str,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECS,
+        read_timeout: float = DEFAULT_READ_TIMEOUT_SECS,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF_SECS,
+        breaker_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+        breaker_reset: float = DEFAULT_BREAKER_RESET_SECS,
+    ) -> None:
         """
         Initialize the client with the server URL.
         Args:
             url (str): Base URL of the concord232 server.
+            connect_timeout (float): Seconds allowed to connect.
+            read_timeout (float): Seconds allowed between bytes of a response.
+            retries (int): Extra attempts for failed reads.
+            backoff (float): Base delay before the first retry; doubled per
+                attempt, with full jitter.
+            breaker_threshold (int): Consecutive failures that open the
+                circuit breaker.
+            breaker_reset (float): Seconds the breaker stays open before a
+                trial request.
         """
         self._url = url
         self._session = requests.Session()
         self._last_event_index = 0
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self._stats: Dict[str, EndpointStats] = {}
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-endpoint request statistics.
+        Returns:
+            dict: Endpoint path to requests, errors, retries, rejected
+            (breaker open), mean/max latency and the last error.
+        """
+        return {path: st.as_dict() for path, st in list(self._stats.items())}
+
+    def _get(
+        self,
+        path: str,
+        params: Optional[Dict[str, str]] = None,
+        idempotent: bool = True,
+    ) -> Any:
+        """
+        GET *path* with timeouts, retries (if *idempotent*), the circuit
+        breaker and stats.
+        Raises:
+            CircuitOpenError: The breaker is open.
+            requests.RequestException: The request failed on its last attempt.
+        """
+        st = self._stats.get(path)
+        if st is None:
+            st = self._stats.setdefault(path, EndpointStats())
+        attempts = 1 + (self.retries if idempotent else 0)
+        kwargs: Dict[str, Any] = {"timeout": self.timeout}
+        if params is not None:
+            kwargs["params"] = params
+        attempt = 0
+        while True:
+            if attempt:
+                time.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            if not self.breaker.allow():
+                st.rejected += 1
+                raise CircuitOpenError("Circuit open for %s" % self._url)
+            if attempt:
+                st.retries += 1
+            started = time.perf_counter()
+            failure: Optional[Exception] = None
+            try:
+                r = self._session.get(self._url + path, **kwargs)
+            except requests.RequestException as e:
+                failure = e
+            except BaseException:
+                # Never leave a half-open trial outstanding.
+                self.breaker.record(False)
+                raise
+            elapsed = time.perf_counter() - started
+            st.requests += 1
+            st.total_seconds += elapsed
+            st.max_seconds = max(st.max_seconds, elapsed)
+            if failure is not None:
+                error = "%s: %s" % (type(failure).__name__, failure)
+            elif getattr(r, "status_code", None) in RETRY_STATUSES:
+                error = "HTTP %s" % r.status_code
+            else:
+                self.breaker.record(True)
+                return r
+            self.breaker.record(False)
+            st.errors += 1
+            st.last_error = error
+            attempt += 1
+            if attempt == attempts:
+                if failure is not None:
+                    raise failure
+                return r
+
+    def get_panel(self) -> Dict[str, Any]:
+        """
+        Retrieve the panel state (trouble summary) from the server.
+        Returns:
+            dict: Panel state.
+        """
+        r = self._get("/panel")
+        data = r.json()
+        return cast(Dict[str, Any], data["panel"])
 
     def list_zones(self) -> List[Dict[str, Any]]:
         """
@@ -25,7 +225,7 @@ class Client(object):
         Returns:
             list: List of zone dictionaries.
         """
-        r = self._session.get(self._url + "/zones")
+        r = self._get("/zones")
         data = r.json()
         return cast(List[Dict[str, Any]], data["zones"])
 
@@ -35,7 +235,7 @@ class Client(object):
         Returns:
             list: List of partition dictionaries.
         """
-        r = self._session.get(self._url + "/partitions")
+        r = self._get("/partitions")
         data = r.json()
         return cast(List[Dict[str, Any]], data["partitions"])
 
@@ -51,7 +251,7 @@ class Client(object):
         params: Dict[str, str] = {"cmd": "arm", "level": level}
         if option is not None:
             params["option"] = option
-        r = self._session.get(self._url + "/command", params=params)
+        r = self._get("/command", params=params, idempotent=False)
         return r.status_code == 200
 
     def disarm(self, master_pin: str) -> bool:
@@ -63,7 +263,7 @@ class Client(object):
             bool: True if successful, False otherwise.
         """
         params: Dict[str, str] = {"cmd": "disarm", "master_pin": master_pin}
-        r = self._session.get(self._url + "/command", params=params)
+        r = self._get("/command", params=params, idempotent=False)
         return r.status_code == 200
 
     def send_keys(self, keys: str, group: bool = False, partition: int = 1) -> bool:
@@ -82,7 +282,7 @@ class Client(object):
             "group": str(group).lower(),
             "partition": str(partition),
         }
-        r = self._session.get(self._url + "/command", params=params)
+        r = self._get("/command", params=params, idempotent=False)
         return r.status_code == 200
 
     def get_version(self) -> str:
@@ -91,7 +291,7 @@ class Client(object):
         Returns:
             str: Version string.
         """
-        r = self._session.get(self._url + "/version")
+        r = self._get("/version")
         if r.status_code == 404:
             return "1.0"
         else:
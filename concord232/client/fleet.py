@@ -0,0 +1,102 @@
+"""
+Run one client operation against many concord232 servers at once, for the
+``concord232_client --hosts`` / ``--hosts-file`` fleet mode.
+
+Each host gets its own Client (so one dead server only trips its own
+circuit breaker) and the calls run on a bounded thread pool; results come
+back in host order with the time taken and any error.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence
+
+from concord232.client.client import Client
+
+DEFAULT_WORKERS = 16
+
+
+class HostResult(NamedTuple):
+    host: str
+    result: Any
+    error: Optional[str]
+    seconds: float
+
+    def as_dict(self) -> dict:
+        return {
+            "host": self.host,
+            "ok": self.error is None,
+            "seconds": round(self.seconds, 4),
+            "error": self.error,
+            "result": self.result,
+        }
+
+
+def parse_hosts(text: str) -> List[str]:
+    """
+    Hosts from a host list: one ``host[:port][/panel]`` per line or
+    comma separated; blank lines and ``#`` comments are ignored.
+    """
+    hosts = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0]
+        hosts.extend(h.strip() for h in line.split(",") if h.strip())
+    return hosts
+
+
+def read_hosts(path: str) -> List[str]:
+    """Hosts from the host list file *path* (``-`` for stdin)."""
+    if path == "-":
+        return parse_hosts(sys.stdin.read())
+    with open(path) as f:
+        return parse_hosts(f.read())
+
+
+def host_url(host: str, default_port: int = 5007) -> str:
+    """
+    Server URL for a host list entry: ``alarm1`` → ``http://alarm1:5007``,
+    ``alarm1:5008/barn`` → ``http://alarm1:5008/panels/barn``.
+    """
+    address, _, panel = host.partition("/")
+    if ":" not in address:
+        address = "%s:%d" % (address, default_port)
+    url = "http://%s" % address
+    if panel:
+        url += "/panels/%s" % panel
+    return url
+
+
+def run_fleet(
+    hosts: Sequence[str],
+    action: Callable[[Any], Any],
+    workers: int = DEFAULT_WORKERS,
+    client_factory: Callable[[str], Any] = Client,
+) -> List[HostResult]:
+    """
+    Call *action(client)* for every host concurrently.
+    Args:
+        hosts (list): Host list entries (see host_url()).
+        action (callable): Called with each host's client; its return
+            value becomes HostResult.result.
+        workers (int): Maximum concurrent hosts.
+        client_factory (callable): Builds a client from a server URL.
+    Returns:
+        list: One HostResult per host, in *hosts* order.
+    """
+
+    def one(host: str) -> HostResult:
+        started = time.perf_counter()
+        try:
+            result = action(client_factory(host_url(host)))
+            error = None
+        except Exception as e:
+            result, error = None, "%s: %s" % (type(e).__name__, e)
+        return HostResult(host, result, error, time.perf_counter() - started)
+
+    if not hosts:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(hosts)))) as pool:
+        return list(pool.map(one, hosts))
@@ -0,0 +1,216 @@
+"""
+Live terminal view for ``concord232_client watch``.
+
+WatchScreen follows the server's ``/stream`` events and turns them into
+ANSI terminal output: a full draw for each snapshot, and afterwards only
+the rows that changed are rewritten in place.  Zones that changed state
+recently are highlighted, and the top line shows serial link health from
+the stream's ``link`` events.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+
+import requests
+
+from concord232.client.cached_client import iter_sse
+
+HIGHLIGHT_SECS = 30.0
+LINK_INTERVAL_SECS = 2.0
+RECONNECT_DELAY_SECS = 2.0
+
+CLEAR = "\x1b[H\x1b[2J"
+HIGHLIGHT = "\x1b[1;7m"
+RESET = "\x1b[0m"
+
+_ZONE_FORMAT = "%-5s %-4s %-24.24s %-20.20s %-12.12s %s"
+_PARTITION_FORMAT = "%-9s %-16.16s %s"
+
+
+def _state(zone: Dict[str, Any]) -> str:
+    state = zone.get("state")
+    if isinstance(state, list):
+        return ", ".join(state) or "Normal"
+    return str(state or "Normal")
+
+
+class WatchScreen(object):
+    """
+    Screen model: apply() takes one stream event and returns the terminal
+    output that brings the display up to date.
+    """
+
+    def __init__(self, title: str, clock: Callable[[], float] = time.monotonic) -> None:
+        self.title = title
+        self.clock = clock
+        self.link: Optional[Dict[str, Any]] = None
+        self.connected = False
+        self.partitions: Dict[int, Dict[str, Any]] = {}
+        self.zones: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self.changed_at: Dict[Tuple[int, int], float] = {}
+        # Screen row (1-based) of each partition / zone, set by a full draw.
+        self._rows: Dict[Any, int] = {}
+        self._highlighted: set = set()
+        self._bottom = 1
+
+    def _link_line(self) -> str:
+        if not self.connected:
+            return "%s  [disconnected]" % self.title
+        if self.link is None:
+            return self.title
+        last_rx = self.link.get("last_rx_secs")
+        return (
+            "%s  last RX %s  frames %s  resends %s  failures %s  "
+            "reconnects %s  tx queue %s"
+            % (
+                self.title,
+                "never" if last_rx is None else "%.1fs ago" % last_rx,
+                self.link.get("rx_frames"),
+                self.link.get("tx_resends"),
+                self.link.get("tx_failures"),
+                self.link.get("reconnects"),
+                self.link.get("tx_queue_depth"),
+            )
+        )
+
+    def _partition_line(self, number: int) -> str:
+        p = self.partitions[number]
+        return _PARTITION_FORMAT % (p["number"], p["arming_level"], p.get("zones", ""))
+
+    def _zone_line(self, key: Tuple[int, int]) -> str:
+        z = self.zones[key]
+        changed = ""
+        since = self.changed_at.get(key)
+        if since is not None:
+            changed = "%ds ago" % (self.clock() - since)
+        line = _ZONE_FORMAT % (
+            z["number"],
+            z["partition"],
+            z["name"],
+            _state(z),
+            z["type"],
+            changed,
+        )
+        if key in self._highlighted:
+            return HIGHLIGHT + line + RESET
+        return line
+
+    def _update_highlights(self) -> List[Tuple[int, int]]:
+        """Refresh the highlighted set; returns zones whose highlight ended."""
+        now = self.clock()
+        expired = [
+            key
+            for key in self._highlighted
+            if now - self.changed_at.get(key, now) >= HIGHLIGHT_SECS
+        ]
+        self._highlighted.difference_update(expired)
+        return expired
+
+    def draw(self) -> str:
+        """Full redraw."""
+        self._update_highlights()
+        self._rows = {}
+        lines = [self._link_line(), ""]
+        lines.append(_PARTITION_FORMAT % ("Partition", "Level", "Zones"))
+        for number in sorted(self.partitions):
+            self._rows[("partition", number)] = len(lines) + 1
+            lines.append(self._partition_line(number))
+        lines.append("")
+        lines.append(
+            _ZONE_FORMAT % ("Zone", "Part", "Name", "State", "Type", "Changed")
+        )
+        for key in sorted(self.zones):
+            self._rows[key] = len(lines) + 1
+            lines.append(self._zone_line(key))
+        self._bottom = len(lines) + 1
+        return CLEAR + "\n".join(lines) + "\n"
+
+    def _rewrite(self, row: int, line: str) -> str:
+        return "\x1b[%d;1H\x1b[2K%s" % (row, line)
+
+    def _park(self) -> str:
+        return "\x1b[%d;1H" % self._bottom
+
+    def apply(self, event: str, data: Any) -> str:
+        """
+        Apply one stream event.
+        Returns:
+            str: Terminal output (may be empty).
+        """
+        if event == "snapshot":
+            self.connected = True
+            self.partitions = {p["number"]: p for p in data["partitions"]}
+            zones = {(z["partition"], z["number"]): z for z in data["zones"]}
+            for key, zone in zones.items():
+                old = self.zones.get(key)
+                if old is not None and _state(old) != _state(zone):
+                    self.changed_at[key] = self.clock()
+                    self._highlighted.add(key)
+            self.zones = zones
+            return self.draw()
+        out = []
+        if event == "zone":
+            key = (data["partition"], data["number"])
+            old = self.zones.get(key)
+            self.zones[key] = data
+            if old is None or key not in self._rows:
+                return self.draw()
+            if _state(old) != _state(data):
+                self.changed_at[key] = self.clock()
+                self._highlighted.add(key)
+            out.append(self._rewrite(self._rows[key], self._zone_line(key)))
+        elif event == "partition":
+            number = data["number"]
+            self.partitions[number] = data
+            row = self._rows.get(("partition", number))
+            if row is None:
+                return self.draw()
+            out.append(self._rewrite(row, self._partition_line(number)))
+        elif event == "link":
+            self.link = data
+            out.append(self._rewrite(1, self._link_line()))
+            for key in self._update_highlights():
+                out.append(self._rewrite(self._rows[key], self._zone_line(key)))
+            # Refresh the "Ns ago" column of zones still highlighted.
+            for key in sorted(self._highlighted):
+                out.append(self._rewrite(self._rows[key], self._zone_line(key)))
+        else:
+            return ""
+        return "".join(out) + self._park()
+
+    def disconnected(self) -> str:
+        self.connected = False
+        return self._rewrite(1, self._link_line()) + self._park()
+
+
+def watch(url: str, out: TextIO = sys.stdout) -> None:
+    """Follow *url*'s ``/stream`` and keep the terminal up to date until ^C."""
+    screen = WatchScreen("concord232 %s" % url)
+    session = requests.Session()
+    try:
+        while True:
+            try:
+                with session.get(
+                    url + "/stream",
+                    params={"keepalive": LINK_INTERVAL_SECS},
+                    stream=True,
+                    timeout=(5, LINK_INTERVAL_SECS * 10),
+                ) as r:
+                    r.raise_for_status()
+                    lines = r.iter_lines(decode_unicode=True)
+                    for event, data in iter_sse(lines):
+                        if event is not None:
+                            out.write(screen.apply(event, data))
+                            out.flush()
+            except (requests.RequestException, ValueError):
+                pass
+            out.write(screen.disconnected())
+            out.flush()
+            time.sleep(RECONNECT_DELAY_SECS)
+    except KeyboardInterrupt:
+        out.write("\n")
+    finally:
+        session.close()
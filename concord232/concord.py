@@ -1,8 +1,9 @@
+import logging
 import sys
 import time
 import traceback
 from datetime import datetime
-from typing import Any, Callable, Dict, List, Optional, Tuple, cast
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, cast
 
 import serial
 
@@ -16,6 +17,9 @@ from concord232.concord_commands import (
     build_keypress,
 )
 from concord232.concord_helpers import ascii_hex_to_byte, total_secs
+from concord232.metrics import PanelMetrics
+from concord232.panel_state import PanelState
+from concord232.tracing import FrameTrace, Tracer
 
 is_py2 = sys.version[0] == "2"
 if is_py2:
@@ -59,6 +63,32 @@ RECONNECT_BACKOFF_MAX_SECS = 120.0
 
 STOP = "STOP"
 
+# Equipment list replies (ZONE_DATA, PART_DATA) are published to readers
+# together when EQPT_LIST_DONE arrives, or this long after the first one
+# if it never does.
+EQPT_LIST_COMMANDS = frozenset(("ZONE_DATA", "PART_DATA"))
+EQPT_LIST_MAX_SECS = 10.0
+
+# Called once per transmitted message with (acked, reason); reason is "ACK"
+# or why the message was abandoned.
+TxCallback = Callable[[bool, str], None]
+
+# Per-frame hex dumps of everything on the wire.  Off (WARNING) by default;
+# enable at runtime with set_wire_trace(True) or the /admin/wire_trace
+# endpoint.  Records are logged at INFO so they pass INFO-level handlers.
+WIRE_LOG = logging.getLogger("concord232.wire")
+WIRE_LOG.setLevel(logging.WARNING)
+
+
+def set_wire_trace(enabled: bool) -> None:
+    """Turn per-frame wire hex dumps on or off."""
+    WIRE_LOG.setLevel(logging.INFO if enabled else logging.WARNING)
+
+
+def wire_trace_enabled() -> bool:
+    return WIRE_LOG.isEnabledFor(logging.INFO)
+
+
 # Trouble / restoral general-type pairs: when a restoral is received, the
 # matching active trouble (same spec + source + partition) is cleared.
 TROUBLE_RESTORAL_PAIRS: Tuple[Tuple[int, int], ...] = (
@@ -142,6 +172,31 @@ def apply_alarm_to_trouble_store(store: dict, d: dict) -> bool:
     return False
 
 
+def _join_tx_callbacks(
+    n: int, on_complete: Optional[TxCallback]
+) -> List[Optional[TxCallback]]:
+    """
+    Return *n* per-message callbacks that call *on_complete* once: with
+    (True, "ACK") after all *n* messages are ACKed, or with the first failure.
+    """
+    if on_complete is None or n == 0:
+        return [None] * n
+    remaining = [n]
+
+    def callback(acked: bool, reason: str) -> None:
+        if remaining[0] <= 0:
+            return
+        if not acked:
+            remaining[0] = 0
+            on_complete(False, reason)
+            return
+        remaining[0] -= 1
+        if remaining[0] == 0:
+            on_complete(True, reason)
+
+    return [callback] * n
+
+
 class CommException(Exception):
     pass
 
@@ -172,6 +227,8 @@ class SerialInterface(object):
         """
         self.control_char_cb = control_char_cb
         self.logger = logger
+        # Set by the panel while a sampled frame is being read.
+        self.byte_hook: Optional[Callable[[int], None]] = None
         self.logger.debug("SerialInterface Starting")
         # Ugly debugging hack
         if dev_name == "fake":
@@ -228,12 +285,9 @@ class SerialInterface(object):
         # (Telnet IAC) sent by some network serial servers are safely decoded
         # and then discarded by wait_for_message_start().
         raw = self.serdev.read(size=1)
-        if raw:
-            self.logger.debug("RX byte: 0x%02x", raw[0])
-        else:
-            self.logger.debug("RX: timeout (no data)")
-        c = raw.decode("latin-1")
-        return cast(str, c)
+        if raw and self.byte_hook is not None:
+            self.byte_hook(raw[0])
+        return cast(str, raw.decode("latin-1"))
 
     def _try_to_read(self, n: int) -> Tuple[List[str], List[str]]:
         """
@@ -314,6 +368,8 @@ class SerialInterface(object):
         except ValueError:
             raise BadEncoding("Invalid message encoding: %r" % msg_ascii)
 
+        if WIRE_LOG.isEnabledFor(logging.INFO):
+            WIRE_LOG.info("RX %s", bytes(msg_bin).hex(" "))
         return msg_bin
 
     def write_message(self, msg: List[int]) -> None:
@@ -324,12 +380,14 @@ class SerialInterface(object):
         message-start linefeed character.
         """
         framed_msg = MSG_START + encode_message_to_ascii(msg)
-        raw = framed_msg.encode()
-        self.logger.debug("TX %d bytes: %s", len(raw), raw.hex(" "))
-        self.serdev.write(raw)
+        if WIRE_LOG.isEnabledFor(logging.INFO):
+            WIRE_LOG.info("TX %s", bytes(msg).hex(" "))
+        self.serdev.write(framed_msg.encode())
 
     def write(self, data: Any) -> None:
         """Write raw *data* to the serial port."""
+        if WIRE_LOG.isEnabledFor(logging.INFO):
+            WIRE_LOG.info("TX ctrl %s", data.hex(" "))
         self.serdev.write(data)
 
     def close(self) -> None:
@@ -384,11 +442,13 @@ def decode_message_from_ascii(ascii_msg: str) -> List[int]:
 class AlarmPanelInterface(object):
     def __init__(self, dev_name: str, timeout_secs: float, logger: Any) -> None:
         self.dev_name = dev_name
+        self.logger = logger
+        self.serial_logger = logger.getChild("serial")
+        self.dispatch_logger = logger.getChild("dispatch")
         self.serial_interface = SerialInterface(
-            dev_name, timeout_secs, self.ctrl_char_cb, logger
+            dev_name, timeout_secs, self.ctrl_char_cb, self.serial_logger
         )
         self.timeout_secs = timeout_secs
-        self.logger = logger
         self.logger.debug("Starting")
         self.panel: dict[str, Any] = {}
         self.partitions: dict[str, Any] = {}
@@ -398,6 +458,15 @@ class AlarmPanelInterface(object):
         self.display_messages: list[Any] = []
         self.tx_queue: Any = Queue.Queue()
         self.fake_rx_queue: Any = Queue.Queue()
+        self.metrics = PanelMetrics()
+        self.metrics.tx_queue_depth.set_function(self.tx_queue.qsize)
+        # time.monotonic() of the last frame received from the panel.
+        self.last_rx_at: Optional[float] = None
+        self.tracer: Optional[Tracer] = None
+        self._tx_traces: Dict[int, FrameTrace] = {}
+        self._tx_trace: Optional[FrameTrace] = None
+        self._tx_callbacks: Dict[int, TxCallback] = {}
+        self._tx_callback: Optional[TxCallback] = None
         self.reset_pending_tx()
         self._consecutive_reconnects = 0
         self.message_handlers: dict[Any, list[Callable[[dict], None]]] = {}
@@ -405,6 +474,22 @@ class AlarmPanelInterface(object):
             self.message_handlers[command_id] = []
         self._active_troubles: Dict[Tuple[Any, ...], dict] = {}
         self._trouble_summary_logged: str = ""
+        self.trouble_handlers: List[Callable[[dict], None]] = []
+        # Incremented whenever a zone, a partition or the panel dict
+        # changes; the state_version of each entity's last change is kept
+        # (zones by (partition, zone) number, partitions by number).
+        self.state_version = 0
+        self.panel_version = 0
+        self.zone_versions: Dict[Tuple[int, int], int] = {}
+        self.partition_versions: Dict[int, int] = {}
+        # Published copy of zones / partitions / panel for other threads;
+        # see concord232/panel_state.py.
+        self.state = PanelState()
+        self.state_handlers: List[Callable[[PanelState], None]] = []
+        self._dirty_zones: Set[Tuple[int, int]] = set()
+        self._dirty_partitions: Set[int] = set()
+        self._panel_dirty = False
+        self._eqpt_list_started: Optional[float] = None
         self._sync_trouble_to_panel()
 
     def _sync_trouble_to_panel(self) -> None:
@@ -417,6 +502,136 @@ class AlarmPanelInterface(object):
             self.panel["trouble_buses"] = buses
         else:
             self.panel.pop("trouble_buses", None)
+        self.state_version += 1
+        self.panel_version = self.state_version
+        self._panel_dirty = True
+        if self._eqpt_list_started is None:
+            self.publish_state()
+        if self.trouble_handlers:
+            state = self.trouble_state()
+            for handler in self.trouble_handlers:
+                try:
+                    handler(state)
+                except Exception:
+                    self.logger.exception("Trouble handler %r failed", handler)
+
+    def zone_changed(self, partition_number: int, zone_number: int) -> None:
+        """
+        Called by the parsers after they change a zone.  A new zone also
+        changes its partition's zone count, so the partition is bumped too.
+        """
+        key = (partition_number, zone_number)
+        new_zone = key not in self.zone_versions
+        self.state_version += 1
+        self.zone_versions[key] = self.state_version
+        self._dirty_zones.add(key)
+        if new_zone and partition_number in self.partitions:
+            self.partition_versions[partition_number] = self.state_version
+            self._dirty_partitions.add(partition_number)
+
+    def partition_changed(self, partition_number: int) -> None:
+        """Called by the parsers after they change a partition."""
+        self.state_version += 1
+        self.partition_versions[partition_number] = self.state_version
+        self._dirty_partitions.add(partition_number)
+
+    def publish_state(self) -> None:
+        """
+        Publish zones, partitions and panel as a new self.state, copying
+        only what changed since the last one.  Called from the message
+        loop thread after each batch of updates.
+        """
+        if self.state.version == self.state_version:
+            return
+        zones = self._dirty_zones
+        partitions = self._dirty_partitions
+        self.state = self.state.updated(
+            self.state_version,
+            panel=self.panel if self._panel_dirty else None,
+            zones={"p%sz%s" % key: self.zones["p%sz%s" % key] for key in zones},
+            partitions={n: self.partitions[n] for n in partitions},
+            panel_version=self.panel_version,
+            zone_versions={key: self.zone_versions[key] for key in zones},
+            partition_versions={n: self.partition_versions[n] for n in partitions},
+        )
+        self._dirty_zones = set()
+        self._dirty_partitions = set()
+        self._panel_dirty = False
+        for handler in self.state_handlers:
+            try:
+                handler(self.state)
+            except Exception:
+                self.logger.exception("State handler %r failed", handler)
+
+    def _end_of_message(self, command_id: str) -> None:
+        """Publish state after a message unless an equipment list is arriving."""
+        if command_id in EQPT_LIST_COMMANDS and self._eqpt_list_started is None:
+            self._eqpt_list_started = time.monotonic()
+        elif command_id == "EQPT_LIST_DONE":
+            self._eqpt_list_started = None
+        self._publish_unless_eqpt_list()
+
+    def _publish_unless_eqpt_list(self) -> None:
+        """
+        Publish state unless an equipment list is still arriving; a list
+        without EQPT_LIST_DONE is published EQPT_LIST_MAX_SECS after it
+        started.
+        """
+        if self._eqpt_list_started is not None:
+            if time.monotonic() - self._eqpt_list_started < EQPT_LIST_MAX_SECS:
+                return
+            self.dispatch_logger.warning(
+                "No EQPT_LIST_DONE after %.0fs; publishing partial equipment list",
+                EQPT_LIST_MAX_SECS,
+            )
+            self._eqpt_list_started = None
+        self.publish_state()
+
+    def trouble_state(self) -> dict:
+        """Current trouble summary as passed to trouble handlers."""
+        return {
+            "trouble": self.panel["trouble"],
+            "trouble_count": self.panel["trouble_count"],
+            "trouble_detail": self.panel["trouble_detail"],
+            "trouble_buses": list(self.panel.get("trouble_buses", [])),
+        }
+
+    def link_health(self) -> dict:
+        """Serial link summary: seconds since the last frame, and totals."""
+        m = self.metrics
+        return {
+            "last_rx_secs": (
+                round(time.monotonic() - self.last_rx_at, 3)
+                if self.last_rx_at is not None
+                else None
+            ),
+            "rx_frames": int(m.rx_frames.total()),
+            "tx_resends": int(m.tx_resends.total()),
+            "tx_failures": int(m.tx_failures.total()),
+            "naks_received": int(m.naks_received.total()),
+            "reconnects": int(m.reconnects.total()),
+            "tx_queue_depth": self.tx_queue.qsize(),
+        }
+
+    def register_trouble_handler(self, handler_fn: Callable[[dict], None]) -> None:
+        """
+        *handler_fn* will be called with trouble_state() now and whenever
+        the set of active troubles is re-synced (ALARM messages, reconnect).
+
+        Note: like message handlers, it is called from the message loop
+        thread.
+        """
+        self.trouble_handlers.append(handler_fn)
+        handler_fn(self.trouble_state())
+
+    def register_state_handler(self, handler_fn: Callable[[PanelState], None]) -> None:
+        """
+        *handler_fn* will be called with every newly published PanelState
+        (see publish_state), so it sees whole equipment lists only.
+
+        Note: it is called from the message loop thread.
+        """
+        self.state_handlers.append(handler_fn)
 
     def _merge_trouble_state(self, d: dict) -> None:
         if not apply_alarm_to_trouble_store(self._active_troubles, d):
@@ -431,6 +646,18 @@ class AlarmPanelInterface(object):
         else:
             self.logger.info("Trouble cleared (no active items tracked)")
 
+    def set_tracer(self, tracer: Optional[Tracer]) -> None:
+        """
+        Attach *tracer* (see concord232.tracing) to record per-frame RX
+        and TX events, or detach tracing when *tracer* is None.
+        """
+        self.tracer = tracer
+        self._tx_traces = {}
+
+    def _finish_trace(self, trace: FrameTrace) -> None:
+        if self.tracer is not None:
+            self.tracer.finish(trace)
+
     def register_message_handler(
         self, command_id: Any, handler_fn: Callable[[dict], None]
     ) -> None:
@@ -446,21 +673,30 @@ class AlarmPanelInterface(object):
         self.message_handlers[command_id].append(handler_fn)
 
     def ctrl_char_cb(self, cc: str) -> None:
-        # self.logger.debug("Ctrl char %r" % cc)
+        if WIRE_LOG.isEnabledFor(logging.INFO):
+            WIRE_LOG.info("RX ctrl %02x", ord(cc))
         if cc == ACK:
             if self.tx_pending is None:
-                self.logger.debug("Spurious ACK")
+                self.serial_logger.debug("Spurious ACK")
+            else:
+                self.metrics.ack_rtt.observe(total_secs(datetime.now() - self.tx_time))
+                if self._tx_trace is not None:
+                    self._tx_trace.event("ack")
+                self._complete_tx(True, "ACK")
 
             self._consecutive_reconnects = 0
             self.reset_pending_tx()
         elif cc == NAK:
+            self.metrics.naks_received.inc()
             if self.tx_pending is None:
-                self.logger.debug("Spurious NAK")
+                self.serial_logger.debug("Spurious NAK")
             else:
-                self.logger.debug("Possible NAK")
+                self.serial_logger.debug("Possible NAK")
+                if self._tx_trace is not None:
+                    self._tx_trace.event("nak")
                 self.maybe_resend_message("NAK")
         else:
-            self.logger.info("Unknown control char 0x%02x" % ord(cc))
+            self.serial_logger.info("Unknown control char 0x%02x", ord(cc))
 
     def tx_timeout_exceded(self) -> bool:
         assert self.tx_pending is not None
@@ -468,6 +704,10 @@ class AlarmPanelInterface(object):
         return total_secs(elapsed) > ACK_TIMEOUT_INBOUND
 
     def reset_pending_tx(self) -> None:
+        if self._tx_trace is not None:
+            self._finish_trace(self._tx_trace)
+        self._tx_trace = None
+        self._complete_tx(False, "reset")
         self.tx_time = datetime.now()
         self.tx_pending = None
         self.tx_num_attempts = 0
@@ -481,32 +721,64 @@ class AlarmPanelInterface(object):
         self.tx_pending = msg.copy() if msg is not None else None  # type: ignore
         if retry:
             self.tx_num_attempts += 1
-            self.logger.warn(
-                "Resending message, attempt %d: %r"
-                % (self.tx_num_attempts, encode_message_to_ascii(msg))
+            self.serial_logger.warning(
+                "Resending message, attempt %d: %r",
+                self.tx_num_attempts,
+                encode_message_to_ascii(msg),
             )
         else:
             self.tx_num_attempts = 1
-            self.logger.debug(
-                "Sending message (retry=%d) %r"
-                % (self.tx_num_attempts, encode_message_to_ascii(msg))
-            )
+            if self.serial_logger.isEnabledFor(logging.DEBUG):
+                self.serial_logger.debug(
+                    "Sending message (retry=%d) %r",
+                    self.tx_num_attempts,
+                    encode_message_to_ascii(msg),
+                )
+            if self._tx_traces:
+                self._tx_trace = self._tx_traces.pop(id(msg), None)
+            if self._tx_callbacks:
+                self._tx_callback = self._tx_callbacks.pop(id(msg), None)
         self.tx_time = datetime.now()
         self.serial_interface.write_message(msg)
+        if self._tx_trace is not None:
+            self._tx_trace.event("tx_write", attempt=self.tx_num_attempts)
+        self.metrics.tx_frames.inc()
 
     def maybe_resend_message(self, reason: str) -> None:
         if self.tx_num_attempts >= MAX_RESENDS:
-            self.logger.error(
-                "Unable to send message (%s), too many attempts (%d): %r"
-                % (reason, MAX_RESENDS, encode_message_to_ascii(self.tx_pending or []))
+            self.metrics.tx_failures.inc()
+            if self._tx_trace is not None:
+                self._tx_trace.event("failed", reason=reason)
+            self._complete_tx(False, reason)
+            self.serial_logger.error(
+                "Unable to send message (%s), too many attempts (%d): %r",
+                reason,
+                MAX_RESENDS,
+                encode_message_to_ascii(self.tx_pending or []),
             )
             self.reset_pending_tx()
         else:
             if self.tx_pending is not None:
+                self.metrics.tx_resends.inc(reason)
                 self.send_message(self.tx_pending, retry=True)
 
+    def _complete_tx(self, acked: bool, reason: str) -> None:
+        callback = self._tx_callback
+        if callback is None:
+            return
+        self._tx_callback = None
+        self._call_tx_callback(callback, acked, reason)
+
+    def _call_tx_callback(self, callback: TxCallback, acked: bool, reason: str) -> None:
+        try:
+            callback(acked, reason)
+        except Exception:
+            self.logger.exception("TX completion callback %r failed", callback)
+
     # XXX include length bytes in the front?  YES
-    def enqueue_msg_for_tx(self, msg: List[int]) -> None:
+    def enqueue_msg_for_tx(
+        self, msg: List[int], on_complete: Optional[TxCallback] = None
+    ) -> None:
         """
         Put *msg* on the transmit queue, and append a checksum; *msg*
         is modified.
@@ -514,8 +786,20 @@ class AlarmPanelInterface(object):
         This method may be called by the main thread; messages
         enqueued here will be consumed and transmitted by the
         background event-loop thread.
+
+        *on_complete*, if given, is called from the event-loop thread
+        with (True, "ACK") when the panel ACKs the message, or with
+        (False, reason) when it is abandoned after MAX_RESENDS attempts
+        or dropped on reconnect.
         """
         msg.append(compute_checksum(msg))
+        if on_complete is not None:
+            self._tx_callbacks[id(msg)] = on_complete
+        if self.tracer is not None:
+            trace = self.tracer.start("tx")
+            if trace is not None:
+                trace.event("enqueue", command=msg[1])
+                self._tx_traces[id(msg)] = trace
         self.tx_queue.put(msg)
 
     def enqueue_synthetic_msg_for_rx(self, msg: List[int]) -> None:
@@ -541,10 +825,14 @@ class AlarmPanelInterface(object):
         drained = 0
         while not self.tx_queue.empty():
             try:
-                self.tx_queue.get_nowait()
+                msg = self.tx_queue.get_nowait()
                 drained += 1
             except Queue.Empty:
                 break
+            callback = self._tx_callbacks.pop(id(msg), None)
+            if callback is not None:
+                self._call_tx_callback(callback, False, "drained")
+        self._tx_traces.clear()
         if drained:
             self.logger.info("Drained %d stale message(s) from TX queue", drained)
 
@@ -558,6 +846,7 @@ class AlarmPanelInterface(object):
             return
 
         self._consecutive_reconnects += 1
+        self.metrics.reconnects.inc()
 
         if self._consecutive_reconnects > 1:
             backoff = min(
@@ -569,6 +858,7 @@ class AlarmPanelInterface(object):
                 self._consecutive_reconnects,
                 backoff,
             )
+            self.metrics.backoff_seconds.inc(amount=backoff)
             time.sleep(backoff)
 
         while True:
@@ -578,7 +868,10 @@ class AlarmPanelInterface(object):
                 except Exception:
                     pass
                 self.serial_interface = SerialInterface(
-                    self.dev_name, self.timeout_secs, self.ctrl_char_cb, self.logger
+                    self.dev_name,
+                    self.timeout_secs,
+                    self.ctrl_char_cb,
+                    self.serial_logger,
                 )
                 self.logger.info("Serial port reconnected: %s", self.dev_name)
                 self.reset_pending_tx()
@@ -644,9 +937,12 @@ class AlarmPanelInterface(object):
             no_inputs = False
             msg = self.fake_rx_queue.get()
             self.logger.debug("Received synthetic message")
+            trace = self.tracer.start("rx") if self.tracer is not None else None
+            if trace is not None:
+                trace.event("frame_complete", synthetic=True, length=len(msg))
             # Don't need to confirm checksum as we computed it
             # ourselves!
-            self.handle_message(msg)
+            self.handle_message(msg, trace)
 
         #
         # Handle incoming messages.
@@ -656,34 +952,56 @@ class AlarmPanelInterface(object):
         # minimize time waiting on messages that won't arrive.
         chars_avail = self.serial_interface.message_chars_maybe_available()
         if chars_avail:
-            self.logger.debug("Bytes available from panel, reading...")
+            self.serial_logger.debug("Bytes available from panel, reading...")
         if chars_avail and self.serial_interface.wait_for_message_start() == MSG_START:
             no_inputs = False
+            trace = self.tracer.start("rx") if self.tracer is not None else None
+            if trace is not None:
+                trace.event("rx_start")
+                if self.tracer is not None and self.tracer.trace_bytes:
+                    self.serial_interface.byte_hook = trace.rx_byte
 
             try:
                 msg = self.serial_interface.read_next_message()
                 # self.logger.debug(msg)
             except CommException as ex:
+                self.metrics.rx_errors.inc()
                 self.send_nak()
-                self.logger.error(repr(ex))
+                self.serial_logger.error(repr(ex))
+                if trace is not None:
+                    self.serial_interface.byte_hook = None
+                    trace.event("rx_error", error=type(ex).__name__)
+                    self._finish_trace(trace)
                 return loop_last_print_at
+            if trace is not None:
+                self.serial_interface.byte_hook = None
+                trace.event("frame_complete", length=len(msg))
 
             if len(msg) < 3:
                 # Message too short, need at least length byte,
                 # command byte, and checksum byte.
+                self.metrics.rx_errors.inc()
                 self.send_nak()
-                self.logger.error(
-                    "Message too short: %r" % encode_message_to_ascii(msg)
+                self.serial_logger.error(
+                    "Message too short: %r", encode_message_to_ascii(msg)
                 )
 
             if validate_message_checksum(msg):
+                if trace is not None:
+                    trace.event("checksum_ok")
                 self.send_ack()
-                self.handle_message(msg)
+                if trace is not None:
+                    trace.event("ack_sent")
+                self.handle_message(msg, trace)
             else:
                 # Bad checksum
+                self.metrics.rx_bad_checksums.inc()
                 self.send_nak()
-                self.logger.error(
-                    "Bad checksum for message %r" % encode_message_to_ascii(msg)
+                if trace is not None:
+                    trace.event("checksum_bad")
+                    self._finish_trace(trace)
+                self.serial_logger.error(
+                    "Bad checksum for message %r", encode_message_to_ascii(msg)
                 )
 
         # TODO: check here if there is pending input and handle it
@@ -711,6 +1029,11 @@ class AlarmPanelInterface(object):
                 return None
             self.send_message(msg)
 
+        # An equipment list whose EQPT_LIST_DONE never arrives is
+        # published from here when no further frames come in either.
+        if self._eqpt_list_started is not None:
+            self._publish_unless_eqpt_list()
+
         # If there was nothing to do on this pass through the
         # loop, take a nap...
         if no_inputs and no_outputs:
@@ -718,47 +1041,70 @@ class AlarmPanelInterface(object):
 
         secs_since_print = total_secs(datetime.now() - loop_last_print_at)
         if secs_since_print > 20:
-            self.logger.debug("Looping %d" % total_secs(datetime.now() - loop_start_at))
+            self.logger.debug("Looping %d", total_secs(datetime.now() - loop_start_at))
             loop_last_print_at = datetime.now()
 
         return loop_last_print_at
 
-    def handle_message(self, msg: List[int]) -> None:
+    def handle_message(
+        self, msg: List[int], trace: Optional[FrameTrace] = None
+    ) -> None:
+        try:
+            self._handle_message(msg, trace)
+        finally:
+            if trace is not None:
+                self._finish_trace(trace)
+
+    def _handle_message(self, msg: List[int], trace: Optional[FrameTrace]) -> None:
         cmd1 = msg[1]
         cmd2: Optional[int] = None
         if len(msg) > 3:
             cmd2 = msg[2]
         # self.log("Handle message %r" % encode_message_to_ascii(msg))
         command: Any
-        cmd_str: str
         if cmd1 in RX_COMMANDS:
             command = cmd1
-            cmd_str = "0x%02x" % command
         elif (cmd1, cmd2) in RX_COMMANDS:
             command = (cmd1, cmd2)
-            cmd_str = "0x%02x/0x%02x" % (command[0], command[1])
         else:
-            self.logger.error(
-                "Unknown command for message %r" % encode_message_to_ascii(msg)
+            self.dispatch_logger.error(
+                "Unknown command for message %r", encode_message_to_ascii(msg)
             )
             return
         command_id, command_name, command_parser = RX_COMMANDS[command]
+        self.metrics.rx_frames.inc(command_id)
+        self.last_rx_at = time.monotonic()
+        debug = self.dispatch_logger.isEnabledFor(logging.DEBUG)
         if command_parser is None:
-            self.logger.debug(
-                "No parser for command %s %s" % (command_name, command_id)
-            )
+            if debug:
+                self.dispatch_logger.debug(
+                    "No parser for command %s %s", command_name, command_id
+                )
             return
         # if command_id in ['SIREN_SYNC','TOUCHPAD']:
         #    return
         if command_id in ("SIREN_SYNC", "SIREN_SETUP", "SIREN_GO", "LIGHTS_STATE"):
             return
-        if command_id not in ("TOUCHPAD"):
-            self.logger.debug(
-                "Handling command %s %s, %s"
-                % (cmd_str, command_id, command_parser.__name__)
+        if debug and command_id != "TOUCHPAD":
+            if isinstance(command, tuple):
+                cmd_str = "0x%02x/0x%02x" % command
+            else:
+                cmd_str = "0x%02x" % command
+            self.dispatch_logger.debug(
+                "Handling command %s %s, %s",
+                cmd_str,
+                command_id,
+                command_parser.__name__,
             )
         try:
+            started = time.perf_counter()
             decoded_command = command_parser(self, msg)
+            self._end_of_message(command_id)
+            self.metrics.handler_seconds.observe(
+                time.perf_counter() - started, command_parser.__name__
+            )
+            if trace is not None:
+                trace.event("parsed", command_id=command_id)
             if not decoded_command:
                 return
             decoded_command["command_id"] = command_id
@@ -770,32 +1116,46 @@ class AlarmPanelInterface(object):
                     if func is not None:
                         func(decoded_command)
                     else:
-                        self.logger.info(
-                            "Counld not execute: %r" % decoded_command["action"]
+                        self.dispatch_logger.info(
+                            "Counld not execute: %r", decoded_command["action"]
                         )
                 except AttributeError as e:
-                    self.logger.info(decoded_command["action"] + " does not exists")
-                    self.logger.info(e)
-            self.logger.debug(repr(decoded_command))
+                    self.dispatch_logger.info(
+                        "%s does not exists", decoded_command["action"]
+                    )
+                    self.dispatch_logger.info(e)
+            if debug:
+                self.dispatch_logger.debug("%r", decoded_command)
             for handler in self.message_handlers[command_id]:
-                self.logger.debug("Calling handler %r" % handler)
+                if debug:
+                    self.dispatch_logger.debug("Calling handler %r", handler)
+                handler_name = getattr(handler, "__qualname__", repr(handler))
+                if trace is not None:
+                    trace.event("handler_start", handler=handler_name)
+                started = time.perf_counter()
                 handler(decoded_command)
+                self.metrics.handler_seconds.observe(
+                    time.perf_counter() - started, handler_name
+                )
+                if trace is not None:
+                    trace.event("handler_end", handler=handler_name)
         except Exception as ex:
-            self.logger.error(
-                "Problem handling command %r\n%r" % (ex, encode_message_to_ascii(msg))
+            self.dispatch_logger.error(
+                "Problem handling command %r\n%r", ex, encode_message_to_ascii(msg)
             )
-            self.logger.error(traceback.format_exc())
+            self.dispatch_logger.error(traceback.format_exc())
 
     def send_the_master_code(self, msg: Any) -> None:
         if self.master_pin is not None:
             keys = []
             for k in self.master_pin:
-                self.logger.debug("Adding Key: " + k)
+                self.logger.debug("Adding Key: %s", k)
                 keys.append(0x00 + int(k))
             self.send_keypress(keys)
 
     def send_nak(self) -> None:
         self.serial_interface.write(NAK.encode())
+        self.metrics.naks_sent.inc()
 
     def send_ack(self) -> None:
         self.serial_interface.write(ACK.encode())
@@ -824,44 +1184,82 @@ class AlarmPanelInterface(object):
         self.enqueue_msg_for_tx(msg)
 
     def send_keypress(
-        self, keys: List[int], partition: int = 1, no_check: bool = False
+        self,
+        keys: List[int],
+        partition: int = 1,
+        no_check: bool = False,
+        on_complete: Optional[TxCallback] = None,
     ) -> None:
         msg = build_keypress(keys, partition, area=0, no_check=True)
-        self.enqueue_msg_for_tx(msg)
+        self.enqueue_msg_for_tx(msg, on_complete)
 
-    def arm_stay(self, option: Optional[str], partition: int = 1) -> None:
+    def arm_stay(
+        self,
+        option: Optional[str],
+        partition: int = 1,
+        on_complete: Optional[TxCallback] = None,
+    ) -> None:
         if option is None:
-            self.send_keypress([0x02], partition=partition)
+            self.send_keypress([0x02], partition=partition, on_complete=on_complete)
         elif option == "silent":
-            self.send_keypress([0x05, 0x02], partition=partition)
+            self.send_keypress(
+                [0x05, 0x02], partition=partition, on_complete=on_complete
+            )
         elif option == "instant":
-            self.send_keypress([0x02, 0x04], partition=partition)
+            self.send_keypress(
+                [0x02, 0x04], partition=partition, on_complete=on_complete
+            )
 
-    def arm_away(self, option: Optional[str], partition: int = 1) -> None:
+    def arm_away(
+        self,
+        option: Optional[str],
+        partition: int = 1,
+        on_complete: Optional[TxCallback] = None,
+    ) -> None:
         if option is None:
-            self.send_keypress([0x03], partition=partition)
+            self.send_keypress([0x03], partition=partition, on_complete=on_complete)
         elif option == "silent":
-            self.send_keypress([0x05, 0x03], partition=partition)
+            self.send_keypress(
+                [0x05, 0x03], partition=partition, on_complete=on_complete
+            )
         elif option == "instant":
-            self.send_keypress([0x03, 0x04], partition=partition)
+            self.send_keypress(
+                [0x03, 0x04], partition=partition, on_complete=on_complete
+            )
 
-    def send_keys(self, keys: List[str], group: bool, partition: int = 1) -> None:
+    def send_keys(
+        self,
+        keys: List[str],
+        group: bool,
+        partition: int = 1,
+        on_complete: Optional[TxCallback] = None,
+    ) -> None:
         msg = []
+        codes = []
         for k in keys:
             a = list(KEYPRESS_CODES.keys())[list(KEYPRESS_CODES.values()).index(str(k))]
             if group:
                 msg.append(a)
             else:
-                self.logger.info("Sending key: %r" % msg)
-                self.send_keypress([a], partition=partition)
+                codes.append(a)
 
         if group:
-            self.logger.info("Sending group of keys: %r" % msg)
-            self.send_keypress(msg, partition=partition)
+            self.logger.info("Sending group of keys: %r", msg)
+            self.send_keypress(msg, partition=partition, on_complete=on_complete)
+            return
+        callbacks = _join_tx_callbacks(len(codes), on_complete)
+        for a, callback in zip(codes, callbacks):
+            self.logger.info("Sending key: %r", msg)
+            self.send_keypress([a], partition=partition, on_complete=callback)
 
-    def disarm(self, master_pin: str, partition: int = 1) -> None:
+    def disarm(
+        self,
+        master_pin: str,
+        partition: int = 1,
+        on_complete: Optional[TxCallback] = None,
+    ) -> None:
         self.master_pin = master_pin
-        self.send_keypress([0x20], partition=partition)
+        self.send_keypress([0x20], partition=partition, on_complete=on_complete)
 
     def inject_alarm_message(
         self, partition: int, general_type: int, specific_type: int, event_data: int = 0
@@ -259,6 +259,12 @@ def cmd_panel_type(self: Any, msg: List[Any]) -> Dict[str, Any]:
     return d
 
 
+def build_cmd_panel_type(panel_type: int, serial_number: int) -> List[int]:
+    msg = [0x0B, 0x01, panel_type, 0, 0, 0, 0] + num_to_bytes(serial_number)
+    assert len(msg) == 0x0B
+    return msg
+
+
 def cmd_automation_event_lost(self: Any, msg: List[Any]) -> Dict[str, Any]:
     """
     (From protocol docs) Panel's automation buffer has overflowed.
@@ -274,6 +280,18 @@ def build_state_list(state_code: int, state_dict: Dict[int, str]) -> List[str]:
     return ["Unknown"]
 
 
+def _zone_changed(self: Any, partition_number: int, zone_number: int) -> None:
+    # Controllers that version their state (AlarmPanelInterface) record
+    # which entity changed; plain state holders are left alone.
+    if hasattr(self, "zone_changed"):
+        self.zone_changed(partition_number, zone_number)
+
+
+def _partition_changed(self: Any, partition_number: int) -> None:
+    if hasattr(self, "partition_changed"):
+        self.partition_changed(partition_number)
+
+
 def cmd_zone_status(self: Any, msg: List[Any]) -> Dict[str, Any]:
     ck_msg_len(msg, 0x21, 0x07)
     assert msg[1] == 0x21, "Unexpected command type 0x%02x" % msg[1]
@@ -297,11 +315,21 @@ def cmd_zone_status(self: Any, msg: List[Any]) -> Dict[str, Any]:
             "zone_text_tokens": [],
         }
         self.zones[identifier] = z
-    else:
+        _zone_changed(self, d["partition_number"], d["zone_number"])
+    elif self.zones[identifier]["zone_state"] != d["zone_state"]:
         self.zones[identifier]["zone_state"] = d["zone_state"]
+        _zone_changed(self, d["partition_number"], d["zone_number"])
     return d
 
 
+def build_cmd_zone_status(
+    partition: int, area: int, zone: int, state_code: int
+) -> List[int]:
+    msg = [0x07, 0x21, partition, area, (zone >> 8) & 0xFF, zone & 0xFF, state_code]
+    assert len(msg) == 0x07
+    return msg
+
+
 def cmd_zone_data(self: Any, msg: List[Any]) -> Dict[str, Any]:
     ck_msg_len(msg, 0x03, 0x09, exact_len=False)
     assert msg[1] == 0x03, "Unexpected command type 0x%02x" % msg[1]
@@ -320,10 +348,27 @@ def cmd_zone_data(self: Any, msg: List[Any]) -> Dict[str, Any]:
         d["zone_text_tokens"] = msg[9:-1]
 
     identifier = "p" + str(d["partition_number"]) + "z" + str(d["zone_number"])
+    changed = self.zones.get(identifier) != d
     self.zones[identifier] = d
+    if changed:
+        _zone_changed(self, d["partition_number"], d["zone_number"])
     return d
 
 
+def build_cmd_zone_data(
+    partition: int,
+    area: int,
+    group: int,
+    zone: int,
+    zone_type: int,
+    state_code: int,
+    text_tokens: List[int],
+) -> List[int]:
+    body = [0x03, partition, area, group, (zone >> 8) & 0xFF, zone & 0xFF]
+    body += [zone_type, state_code] + list(text_tokens)
+    return [len(body) + 1] + body
+
+
 def cmd_arming_level(self: Any, msg: List[Any]) -> Dict[str, Any]:
     ck_msg_len(msg, (0x22, 0x01), 0x08)
     assert (msg[1], msg[2]) == (0x22, 0x01), "Unexpected command type"
@@ -352,14 +397,25 @@ def cmd_arming_level(self: Any, msg: List[Any]) -> Dict[str, Any]:
 
     if d["partition_number"] in self.partitions:
         rd = self.partitions[d["partition_number"]]
+        before = dict(rd)
         rd["user_info"] = user_num
         rd["arming_level"] = ARMING_LEVELS.get(msg[7], "Unknown Arming Level")
         rd["arming_level_code"] = msg[7]
         self.partitions[d["partition_number"]] = rd
+        if rd != before:
+            _partition_changed(self, d["partition_number"])
 
     return d
 
 
+def build_cmd_arming_level(
+    partition: int, area: int, user_number: int, level_code: int
+) -> List[int]:
+    msg = [0x08, 0x22, 0x01, partition, area, 0, user_number, level_code]
+    assert len(msg) == 0x08
+    return msg
+
+
 def decode_alarm_type(gen_code: int, spec_code: int) -> Tuple[str, str]:
     if gen_code not in ALARM_CODES:
         return "Unknown", "Unknown"
@@ -456,6 +512,13 @@ def cmd_touchpad(self: Any, msg: List[Any]) -> Dict[str, Any]:
     return d
 
 
+def build_cmd_touchpad(
+    partition: int, area: int, message_type: int, text_tokens: List[int]
+) -> List[int]:
+    body = [0x22, 0x09, partition, area, message_type] + list(text_tokens)
+    return [len(body) + 1] + body
+
+
 def cmd_siren_sync(self: Any, msg: List[Any]) -> Dict[str, Any]:
     return {}
 
@@ -475,18 +538,29 @@ def cmd_partition_data(self: Any, msg: List[Any]) -> Dict[str, Any]:
 
     if d["partition_number"] not in self.partitions:
         self.partitions[d["partition_number"]] = d
+        _partition_changed(self, d["partition_number"])
     else:
         rd = self.partitions[d["partition_number"]]
+        before = dict(rd)
         rd["partition_number"] = msg[2]
         rd["area_number"] = msg[3]
         rd["arming_level"] = ARM_LEVEL.get(msg[4], "Unknown Arming Level")
         rd["arming_level_code"] = msg[4]
         rd["partition_text"] = ""
         self.partitions[d["partition_number"]] = rd
+        if rd != before:
+            _partition_changed(self, d["partition_number"])
 
     return d
 
 
+def build_cmd_partition_data(
+    partition: int, area: int, level_code: int, text_tokens: List[int]
+) -> List[int]:
+    body = [0x04, partition, area, level_code] + list(text_tokens)
+    return [len(body) + 1] + body
+
+
 def bcd_decode(chars: List[int]) -> int:
     val = 0
     for c in chars:
@@ -576,7 +650,15 @@ def cmd_clear_image(self: Any, msg: List[Any]) -> Dict[str, Any]:
 
 
 def cmd_eqpt_list_done(self: Any, msg: List[Any]) -> Dict[str, Any]:
-    return {}
+    """
+    The panel has finished sending an equipment list.  Returns the table
+    sizes so handlers (which are skipped for empty results) are notified.
+    """
+    return {"zone_count": len(self.zones), "partition_count": len(self.partitions)}
+
+
+def build_cmd_eqpt_list_done() -> List[int]:
+    return [0x02, 0x08]
 
 
 def cmd_superbus_dev_data(self: Any, msg: List[Any]) -> Dict[str, Any]:
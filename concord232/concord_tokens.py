@@ -256,3 +256,21 @@ def decode_text_tokens(tokens: list[int]) -> str:
             s += " "
 
     return s
+
+
+# Reverse map of single-character tokens, used to encode plain text.
+_CHAR_TOKENS = {v: k for k, v in TOKENS.items() if len(v) == 1 and v != "\n"}
+
+
+def encode_text_tokens(text: str) -> list[int]:
+    """
+    Convert a plain string to a list of single-character token codes; the
+    inverse of decode_text_tokens() for text without word tokens.
+    Args:
+        text (str): Text to encode; lower case is folded to upper case.
+    Returns:
+        list: List of integer token codes.  Characters with no token are
+        encoded as '?'.
+    """
+    unknown = _CHAR_TOKENS["?"]
+    return [_CHAR_TOKENS.get(c, unknown) for c in text.upper()]
@@ -0,0 +1,119 @@
+"""
+Runtime control of per-subsystem log levels.
+
+Each subsystem maps to a named logger.  Levels can be changed while the
+server is running (see the ``/admin/logging`` endpoint), optionally for a
+limited window after which the previous level is restored automatically,
+so verbose logging is only paid for while a live issue is being debugged.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+SUBSYSTEMS: Dict[str, str] = {
+    "panel": "concord232",
+    "serial": "concord232.serial",
+    "dispatch": "concord232.dispatch",
+    "api": "concord232.api",
+    "mqtt": "concord232.mqtt_events",
+    "wire": "concord232.wire",
+}
+
+LEVELS: Tuple[str, ...] = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL", "NOTSET")
+
+
+class LogControl(object):
+    """Get and set levels for the loggers in *subsystems* (name -> logger name)."""
+
+    def __init__(self, subsystems: Optional[Mapping[str, str]] = None) -> None:
+        self.subsystems = dict(subsystems or SUBSYSTEMS)
+        self._lock = threading.Lock()
+        # subsystem -> (timer, level to restore, revert at epoch secs)
+        self._windows: Dict[str, Tuple[threading.Timer, int, float]] = {}
+
+    def _logger(self, subsystem: str) -> logging.Logger:
+        if subsystem not in self.subsystems:
+            raise KeyError("No such subsystem %r" % subsystem)
+        return logging.getLogger(self.subsystems[subsystem])
+
+    def add_panel(self, panel_id: str, logger_name: str) -> None:
+        """
+        Add ``panel.<id>``, ``serial.<id>`` and ``dispatch.<id>`` subsystems
+        for a panel logging to *logger_name* (one of several panels, whose
+        loggers are not below the shared ``serial`` and ``dispatch`` ones).
+        """
+        with self._lock:
+            self.subsystems["panel." + panel_id] = logger_name
+            self.subsystems["serial." + panel_id] = logger_name + ".serial"
+            self.subsystems["dispatch." + panel_id] = logger_name + ".dispatch"
+
+    def levels(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Current state of every subsystem.
+        Returns:
+            dict: subsystem -> {"logger", "level", "effective_level", "revert_at"}.
+        """
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for name, logger_name in self.subsystems.items():
+                logger = logging.getLogger(logger_name)
+                window = self._windows.get(name)
+                out[name] = {
+                    "logger": logger_name,
+                    "level": logging.getLevelName(logger.level),
+                    "effective_level": logging.getLevelName(logger.getEffectiveLevel()),
+                    "revert_at": window[2] if window else None,
+                }
+        return out
+
+    def set_level(
+        self, subsystem: str, level: str, duration_secs: Optional[float] = None
+    ) -> None:
+        """
+        Set *subsystem* to *level* (e.g. "DEBUG").  If *duration_secs* is
+        given, the level in force before the first timed change is restored
+        after that many seconds.  Raises KeyError for an unknown subsystem
+        and ValueError for an unknown level or non-positive duration.
+        """
+        logger = self._logger(subsystem)
+        level = level.upper()
+        if level not in LEVELS:
+            raise ValueError("Unknown log level %r" % level)
+        if duration_secs is not None and duration_secs <= 0:
+            raise ValueError("duration must be positive")
+        with self._lock:
+            window = self._windows.pop(subsystem, None)
+            if window is not None:
+                window[0].cancel()
+            if duration_secs is not None:
+                restore = window[1] if window is not None else logger.level
+                revert_at = time.time() + duration_secs
+                timer = threading.Timer(
+                    duration_secs, self._revert, (subsystem, revert_at)
+                )
+                timer.daemon = True
+                self._windows[subsystem] = (timer, restore, revert_at)
+                timer.start()
+            logger.setLevel(level)
+
+    def _revert(self, subsystem: str, revert_at: Optional[float] = None) -> None:
+        with self._lock:
+            window = self._windows.get(subsystem)
+            # A timer that fired while its window was being replaced must
+            # not revert the new window.
+            if window is None or (revert_at is not None and window[2] != revert_at):
+                return
+            del self._windows[subsystem]
+            window[0].cancel()
+            logging.getLogger(self.subsystems[subsystem]).setLevel(window[1])
+
+    def cancel_all(self) -> None:
+        """End every timed window now, restoring the previous levels."""
+        with self._lock:
+            subsystems = list(self._windows)
+        for subsystem in subsystems:
+            self._revert(subsystem)
@@ -0,0 +1,118 @@
+"""
+Non-blocking logging: records are put on a bounded queue by the logging
+thread and written to the real handlers (files, console) by a background
+QueueListener, so the serial loop never waits on disk or terminal I/O.
+
+When the queue is full a record is dropped instead of blocking: with the
+"new" policy the incoming record is discarded, with "old" the oldest
+queued record is evicted to make room.  Drops are counted.
+"""
+
+from __future__ import annotations
+
+import logging
+import logging.handlers
+import queue
+import threading
+from typing import Any, List, Optional, Sequence
+
+DROP_POLICIES = ("new", "old")
+DEFAULT_QUEUE_SIZE = 10000
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking on a full queue."""
+
+    def __init__(
+        self,
+        log_queue: "queue.Queue[Any]",
+        drop_policy: str = "new",
+        dropped_counter: Any = None,
+    ) -> None:
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError("drop_policy must be one of %s" % ", ".join(DROP_POLICIES))
+        super().__init__(log_queue)
+        self.drop_policy = drop_policy
+        self.dropped_counter = dropped_counter
+        self.dropped = 0
+        self._evict_lock = threading.Lock()
+
+    def _drop(self) -> None:
+        self.dropped += 1
+        if self.dropped_counter is not None:
+            self.dropped_counter.inc()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if self.drop_policy == "new":
+            self._drop()
+            return
+        with self._evict_lock:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            else:
+                self._drop()
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self._drop()
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The queue may be full at shutdown; wait for the listener to make
+        # room rather than failing with queue.Full.
+        self.queue.put(self._sentinel)
+
+
+class AsyncLogging(object):
+    """
+    Owns the queue, the DroppingQueueHandler installed on a logger and
+    the QueueListener feeding *handlers*.
+    """
+
+    def __init__(
+        self,
+        handlers: Sequence[logging.Handler],
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        drop_policy: str = "new",
+        dropped_counter: Any = None,
+    ) -> None:
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize)
+        self.handler = DroppingQueueHandler(self.queue, drop_policy, dropped_counter)
+        self.handlers: List[logging.Handler] = list(handlers)
+        self.listener = _Listener(
+            self.queue, *self.handlers, respect_handler_level=True
+        )
+        self._logger: Optional[logging.Logger] = None
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def install(self, logger: logging.Logger) -> None:
+        """Replace *handlers* on *logger* with the queue handler and start."""
+        for h in self.handlers:
+            logger.removeHandler(h)
+        logger.addHandler(self.handler)
+        self._logger = logger
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Flush queued records to the handlers and stop the listener."""
+        if self._logger is None:
+            return
+        self._logger.removeHandler(self.handler)
+        self.listener.stop()
+        for h in self.handlers:
+            self._logger.addHandler(h)
+        self._logger = None
@@ -1,88 +1,72 @@
 import argparse
+import atexit
 import configparser
 import logging
 import logging.handlers
 import os
-import ssl
 import threading
-from typing import Any
+from typing import Any, List, Tuple
 
-from concord232 import concord
-from concord232.mqtt_events import PanelMqttPublisher
-from concord232.server import api
+from concord232.log_queue import DEFAULT_QUEUE_SIZE, DROP_POLICIES, AsyncLogging
+from concord232.startup import StartupProfile
 
-try:
-    import paho.mqtt.client as mqtt
-except ImportError:
-    mqtt = None  # type: ignore[assignment]
+# Flask (the API server), paho-mqtt, ssl, pyserial and the supervisor are
+# imported inside main() / mqtt_setup.setup_mqtt() once they are known to
+# be needed, so --help and MQTT-less installs do not pay for them at startup.
+
+# Keep in sync with mqtt_events.DEFAULT_DISCOVERY_PREFIX (not imported here
+# so that argument parsing does not load the MQTT code).
+DEFAULT_DISCOVERY_PREFIX = "homeassistant"
 
 LOG_FORMAT = "%(asctime)-15s %(module)s %(levelname)s %(message)s"
+# With several panels each logs to concord232.<panel id>; show which.
+PANELS_LOG_FORMAT = "%(asctime)-15s %(name)s %(levelname)s %(message)s"
 
 
-def _setup_mqtt(
-    ctrl: Any,
-    *,
-    host: str,
-    port: int,
-    username: str,
-    password: str,
-    topic_prefix: str,
-    client_id: str,
-    publish_touchpad: bool,
-    tls: bool,
-    logger: logging.Logger,
-) -> None:
-    if mqtt is None:
-        logger.error("MQTT requested but paho-mqtt is not installed")
-        return
-    if not username and not password:
-        logger.warning(
-            "MQTT has no username or password configured; connecting anonymously. "
-            "Brokers that require authentication (e.g. Home Assistant Mosquitto) will "
-            "reject the client with errors such as 'not authorised' or "
-            "'null username or password'. Set mqtt_username and mqtt_password to "
-            "match your broker credentials."
-        )
-    elif password and not username:
-        logger.warning(
-            "MQTT password is set but username is empty; set mqtt_username as well "
-            "(most brokers, including HA Mosquitto, require both)."
-        )
-    elif username and not password:
-        logger.warning(
-            "MQTT username is set but password is empty; the broker may reject the "
-            "connection if a password is required."
+def _panel_logger(name: str, panel_id: str, panels: List[Any]) -> logging.Logger:
+    """*name*'s logger, or its ``<name>.<panel_id>`` child with several panels."""
+    if len(panels) == 1:
+        return logging.getLogger(name)
+    return logging.getLogger("%s.%s" % (name, panel_id))
+
+
+def _panel_configs(
+    config: configparser.ConfigParser, serial: str, topic_prefix: str
+) -> List[Tuple[str, str, str]]:
+    """
+    (panel ID, serial port, MQTT topic prefix) for every panel to run: the
+    --serial / [server] serial panel (ID from [server] panel_id, default
+    "default") and one per ``[panel:<id>]`` section.  Sections take
+    ``serial`` and optionally ``mqtt_topic_prefix`` (default
+    ``<prefix>/<id>``).
+    """
+    panels = []
+    if serial:
+        panel_id = config.get("server", "panel_id", fallback="default")
+        panels.append((panel_id, serial, topic_prefix))
+    for section in config.sections():
+        if not section.startswith("panel:"):
+            continue
+        panel_id = section[len("panel:") :].strip()
+        panel_serial = config.get(section, "serial", fallback="")
+        if not panel_serial:
+            raise ValueError("[%s] needs a serial entry" % section)
+        panels.append(
+            (
+                panel_id,
+                panel_serial,
+                config.get(
+                    section,
+                    "mqtt_topic_prefix",
+                    fallback="%s/%s" % (topic_prefix.strip("/"), panel_id),
+                ),
+            )
         )
-    client = mqtt.Client(client_id=client_id, clean_session=True)
-    if username or password:
-        client.username_pw_set(username, password)
-    if tls:
-        client.tls_set(tls_version=ssl.PROTOCOL_TLS_CLIENT)
-    try:
-        client.connect(host, port, 60)
-    except Exception:
-        logger.exception("MQTT connect failed; continuing without MQTT")
-        return
-    client.loop_start()
-    publisher = PanelMqttPublisher(
-        client,
-        topic_prefix,
-        publish_touchpad=publish_touchpad,
-        logger=logger,
-    )
-    publisher.publish_online()
-    ctrl.register_message_handler("ALARM", publisher.publish_alarm)
-    if publish_touchpad:
-        ctrl.register_message_handler("TOUCHPAD", publisher.publish_touchpad)
-    logger.info(
-        "MQTT panel events enabled prefix=%s host=%s:%s",
-        topic_prefix,
-        host,
-        port,
-    )
+    return panels
 
 
 def main() -> None:
+    profile = StartupProfile()
     parser = argparse.ArgumentParser(
         description="GE Concord 4 RS232 Serial Interface Server. Provides a Flask API for interacting with the alarm panel.",
         epilog="""
@@ -117,6 +101,13 @@ For more information, see: https://github.com/JasonCarter80/concord232
         metavar="PORT",
         help="Serial port to open for stream (e.g., /dev/ttyUSB0 or COM3) [REQUIRED]",
     )
+    parser.add_argument(
+        "--supervisor",
+        default=False,
+        action="store_true",
+        help="Run each panel in its own worker process (also see [server] "
+        "supervisor in config)",
+    )
     parser.add_argument(
         "--listen",
         default=None,
@@ -172,13 +163,82 @@ For more information, see: https://github.com/JasonCarter80/concord232
         action="store_true",
         help="Do not publish TOUCHPAD messages to MQTT",
     )
+    parser.add_argument(
+        "--mqtt-no-state",
+        default=False,
+        action="store_true",
+        help="Do not publish retained zone/partition/trouble state topics to MQTT",
+    )
+    parser.add_argument(
+        "--mqtt-discovery",
+        default=False,
+        action="store_true",
+        help="Publish Home Assistant MQTT discovery configs for zones, "
+        "partitions and troubles",
+    )
+    parser.add_argument(
+        "--mqtt-discovery-prefix",
+        default=None,
+        metavar="PREFIX",
+        help="Home Assistant discovery prefix (default: %s)" % DEFAULT_DISCOVERY_PREFIX,
+    )
+    parser.add_argument(
+        "--mqtt-commands",
+        default=False,
+        action="store_true",
+        help="Accept arm/disarm/keypress commands on "
+        "<prefix>/command/<partition> (also see [mqtt] commands in config)",
+    )
+    parser.add_argument(
+        "--mqtt-encoding",
+        default=None,
+        metavar="TOPIC=ENC,...",
+        help="Compact schema v2 payloads per topic class (alarm, touchpad, zone, "
+        "partition or *) as msgpack or cbor, e.g. alarm=msgpack,touchpad=msgpack "
+        "(default: JSON everywhere; also see [mqtt] encoding in config)",
+    )
     parser.add_argument(
         "--mqtt-tls",
         default=False,
         action="store_true",
         help="Use TLS for MQTT (also see [mqtt] tls in config)",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--log-queue-size",
+        default=None,
+        type=int,
+        metavar="N",
+        help="Log records buffered for the background log writer; 0 writes "
+        "synchronously (default: %d)" % DEFAULT_QUEUE_SIZE,
+    )
+    parser.add_argument(
+        "--log-drop-policy",
+        default=None,
+        choices=DROP_POLICIES,
+        help="When the log queue is full, drop the 'new' record or the 'old'est "
+        "queued one (default: new)",
+    )
+    parser.add_argument(
+        "--trace-file",
+        default=None,
+        metavar="FILE",
+        help="Write per-frame RX/TX traces to FILE as JSON lines (default: off)",
+    )
+    parser.add_argument(
+        "--trace-sample-rate",
+        default=None,
+        type=float,
+        metavar="RATE",
+        help="Fraction of frames to trace, 0.0-1.0 (default: 1.0)",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        default=False,
+        action="store_true",
+        help="Log the time and modules imported by each startup stage",
+    )
+    with profile.stage("arguments"):
+        args = parser.parse_args()
 
     # Load config file
     config = configparser.ConfigParser()
@@ -191,6 +251,19 @@ For more information, see: https://github.com/JasonCarter80/concord232
     listen = args.listen or cfg.get("listen", "0.0.0.0")
     port = args.port or int(cfg.get("port", 5007))
     log_file = args.log or cfg.get("log")
+    log_queue_size = args.log_queue_size
+    if log_queue_size is None:
+        log_queue_size = int(cfg.get("log_queue_size", DEFAULT_QUEUE_SIZE))
+    log_drop_policy = args.log_drop_policy or cfg.get("log_drop_policy", "new")
+    if log_drop_policy not in DROP_POLICIES:
+        parser.error("log_drop_policy must be one of: %s" % ", ".join(DROP_POLICIES))
+    trace_file = args.trace_file or cfg.get("trace_file")
+    use_supervisor = args.supervisor
+    if not use_supervisor and "server" in config:
+        use_supervisor = config.getboolean("server", "supervisor", fallback=False)
+    trace_sample_rate = args.trace_sample_rate
+    if trace_sample_rate is None:
+        trace_sample_rate = float(cfg.get("trace_sample_rate", 1.0))
 
     mqtt_host = (args.mqtt_host or mqtt_cfg.get("host") or "").strip()
     mqtt_port = args.mqtt_port
@@ -211,6 +284,33 @@ For more information, see: https://github.com/JasonCarter80/concord232
         mqtt_publish_touchpad = mqtt_publish_touchpad and config.getboolean(
             "mqtt", "publish_touchpad"
         )
+    mqtt_publish_state = not args.mqtt_no_state
+    if "mqtt" in config and config.has_option("mqtt", "publish_state"):
+        mqtt_publish_state = mqtt_publish_state and config.getboolean(
+            "mqtt", "publish_state"
+        )
+    mqtt_discovery = args.mqtt_discovery
+    if (
+        not mqtt_discovery
+        and "mqtt" in config
+        and config.has_option("mqtt", "discovery")
+    ):
+        mqtt_discovery = config.getboolean("mqtt", "discovery")
+    mqtt_discovery_prefix = args.mqtt_discovery_prefix or mqtt_cfg.get(
+        "discovery_prefix", DEFAULT_DISCOVERY_PREFIX
+    )
+    mqtt_commands = args.mqtt_commands
+    if not mqtt_commands and "mqtt" in config and config.has_option("mqtt", "commands"):
+        mqtt_commands = config.getboolean("mqtt", "commands")
+    mqtt_encoding = args.mqtt_encoding or mqtt_cfg.get("encoding", "")
+    mqtt_encodings: dict = {}
+    if mqtt_encoding:
+        from concord232.mqtt_events import parse_encodings
+
+        try:
+            mqtt_encodings = parse_encodings(mqtt_encoding)
+        except ValueError as e:
+            parser.error(str(e))
     mqtt_tls = args.mqtt_tls
     if (
         not mqtt_tls
@@ -219,9 +319,20 @@ For more information, see: https://github.com/JasonCarter80/concord232
     ):
         mqtt_tls = config.getboolean("mqtt", "tls")
 
+    # Handlers pass everything; verbosity is set on the loggers so it can be
+    # changed per subsystem at runtime (see /admin/logging).
+    try:
+        panels = _panel_configs(config, serial, str(mqtt_topic_prefix))
+    except ValueError as e:
+        parser.error(str(e))
+    if not panels:
+        parser.error(
+            "The --serial argument, a [server] serial entry or [panel:<id>] sections in the config file are required. Example: --serial /dev/ttyUSB0"
+        )
+
     LOG = logging.getLogger()
-    LOG.setLevel(logging.DEBUG)
-    formatter = logging.Formatter(LOG_FORMAT)
+    LOG.setLevel(args.debug and logging.DEBUG or logging.INFO)
+    formatter = logging.Formatter(LOG_FORMAT if len(panels) == 1 else PANELS_LOG_FORMAT)
     istty = os.isatty(0)
 
     if args.debug and not istty:
@@ -235,7 +346,7 @@ For more information, see: https://github.com/JasonCarter80/concord232
     if istty:
         verbose_handler = logging.StreamHandler()
         verbose_handler.setFormatter(formatter)
-        verbose_handler.setLevel(args.debug and logging.DEBUG or logging.INFO)
+        verbose_handler.setLevel(logging.NOTSET)
         LOG.addHandler(verbose_handler)
 
     if log_file:
@@ -243,16 +354,34 @@ For more information, see: https://github.com/JasonCarter80/concord232
             log_file, maxBytes=1024 * 1024 * 10, backupCount=3
         )
         log_handler.setFormatter(formatter)
-        log_handler.setLevel(logging.DEBUG)
+        log_handler.setLevel(logging.NOTSET)
         LOG.addHandler(log_handler)
 
-    LOG.info("Ready")
-    logging.getLogger("connectionpool").setLevel(logging.WARNING)
+    with profile.stage("api server import"):
+        from concord232.server import api
 
-    if not serial:
-        parser.error(
-            "The --serial argument or a [server] serial entry in the config file is required. Example: --serial /dev/ttyUSB0"
+    if log_queue_size > 0 and LOG.handlers:
+        # Write log records from a background thread so a slow disk (e.g. an
+        # SD card) never stalls the serial loop and delays ACKs.
+        async_logging = AsyncLogging(
+            list(LOG.handlers),
+            maxsize=log_queue_size,
+            drop_policy=log_drop_policy,
+            dropped_counter=api.API_METRICS.counter(
+                "log_records_dropped_total",
+                "Log records dropped because the log queue was full.",
+            ),
         )
+        api.API_METRICS.gauge(
+            "log_queue_depth",
+            "Log records waiting to be written.",
+            fn=async_logging.depth,
+        )
+        async_logging.install(LOG)
+        atexit.register(async_logging.stop)
+
+    LOG.info("Ready")
+    logging.getLogger("connectionpool").setLevel(logging.WARNING)
 
     # Start Flask first in a non-daemon thread so the API is always reachable
     # on port 5007 even if the serial connection fails or takes time.
@@ -264,27 +393,105 @@ For more information, see: https://github.com/JasonCarter80/concord232
     flask_thread.start()
     LOG.info("API server started on %s:%s", listen, port)
 
-    try:
-        ctrl = concord.AlarmPanelInterface(serial, 0.25, LOG)
-        api.CONTROLLER = ctrl
-        if mqtt_host:
-            _setup_mqtt(
-                ctrl,
-                host=mqtt_host,
-                port=mqtt_port,
-                username=mqtt_username,
-                password=mqtt_password,
-                topic_prefix=str(mqtt_topic_prefix),
-                client_id=str(mqtt_client_id),
-                publish_touchpad=mqtt_publish_touchpad,
-                tls=mqtt_tls,
-                logger=LOG,
-            )
-        t = threading.Thread(target=ctrl.message_loop, daemon=True, name="serial-loop")
-        t.start()
-        t.join()
-    except Exception:
-        LOG.exception(
-            "Serial connection failed; API remains available but panel control is offline"
+    def mqtt_kwargs(panel_id: str, panel_prefix: str) -> dict:
+        return dict(
+            host=mqtt_host,
+            port=mqtt_port,
+            username=mqtt_username,
+            password=mqtt_password,
+            topic_prefix=panel_prefix,
+            client_id=(
+                str(mqtt_client_id)
+                if len(panels) == 1
+                else "%s-%s" % (mqtt_client_id, panel_id)
+            ),
+            publish_touchpad=mqtt_publish_touchpad,
+            publish_state=mqtt_publish_state,
+            discovery=mqtt_discovery,
+            discovery_prefix=str(mqtt_discovery_prefix),
+            commands=mqtt_commands,
+            encodings=mqtt_encodings,
+            tls=mqtt_tls,
         )
+
+    if use_supervisor:
+        # One worker process per panel; the API reads their state from
+        # shared memory.
+        with profile.stage("supervisor import"):
+            from concord232.supervisor import PanelSupervisor
+        supervisor = PanelSupervisor()
+        for i, (panel_id, panel_serial, panel_prefix) in enumerate(panels):
+            remote = supervisor.add_panel(
+                panel_id,
+                panel_serial,
+                debug=args.debug,
+                mqtt=mqtt_kwargs(panel_id, panel_prefix) if mqtt_host else None,
+                trace_file=trace_file if i == 0 else None,
+                trace_sample_rate=trace_sample_rate,
+            )
+            api.register_panel(panel_id, remote)
+        with profile.stage("supervisor start"):
+            supervisor.start()
+        atexit.register(supervisor.stop)
+        if args.profile_startup:
+            LOG.info("Startup profile:\n%s", profile.report())
         flask_thread.join()
+        return
+
+    # One serial loop thread per panel, all served by the Flask thread above.
+    from concord232 import concord
+
+    threads = []
+    for i, (panel_id, panel_serial, panel_prefix) in enumerate(panels):
+        try:
+            with profile.stage("panel %s open" % panel_id):
+                ctrl = concord.AlarmPanelInterface(
+                    panel_serial, 0.25, _panel_logger("concord232", panel_id, panels)
+                )
+            api.register_panel(panel_id, ctrl)
+            if len(panels) > 1:
+                api.LOG_CONTROL.add_panel(panel_id, ctrl.logger.name)
+            if trace_file and i == 0:
+                from concord232.tracing import JsonLinesExporter, Tracer
+
+                tracer = Tracer(
+                    JsonLinesExporter(trace_file), sample_rate=trace_sample_rate
+                )
+                ctrl.set_tracer(tracer)
+                atexit.register(tracer.close)
+                LOG.info(
+                    "Frame tracing for panel %s to %s (sample rate %.3f)",
+                    panel_id,
+                    trace_file,
+                    trace_sample_rate,
+                )
+            if mqtt_host:
+                from concord232.mqtt_setup import setup_mqtt
+
+                with profile.stage("panel %s mqtt" % panel_id):
+                    setup_mqtt(
+                        ctrl,
+                        logger=_panel_logger(
+                            "concord232.mqtt_events", panel_id, panels
+                        ),
+                        **mqtt_kwargs(panel_id, panel_prefix),
+                    )
+            t = threading.Thread(
+                target=ctrl.message_loop,
+                daemon=True,
+                name="serial-loop" if len(panels) == 1 else "serial-loop-" + panel_id,
+            )
+            t.start()
+            threads.append(t)
+            LOG.info("Panel %s started on %s", panel_id, panel_serial)
+        except Exception:
+            LOG.exception(
+                "Serial connection failed for panel %s; API remains available but "
+                "panel control is offline",
+                panel_id,
+            )
+    if args.profile_startup:
+        LOG.info("Startup profile:\n%s", profile.report())
+    for t in threads:
+        t.join()
+    flask_thread.join()
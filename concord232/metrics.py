@@ -0,0 +1,386 @@
+"""
+Lightweight Prometheus-style metrics for link and pipeline health.
+
+Counters, gauges and histograms keep their values in plain dicts keyed by
+label values and take no locks: the serial loop is the only writer for the
+panel metrics, and API-thread updates that race may at worst lose a single
+increment, which is acceptable for monitoring.  MetricsRegistry.render()
+produces the Prometheus text exposition format served at ``/metrics``.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+PREFIX = "concord232_"
+
+# Bucket upper bounds in seconds.
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+HANDLER_BUCKETS: Tuple[float, ...] = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.05,
+    0.25,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join('%s="%s"' % (n, _escape(str(v))) for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+class _Metric(object):
+    kind = ""
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _header(self) -> List[str]:
+        return [
+            "# HELP %s %s" % (self.name, self.documentation),
+            "# TYPE %s %s" % (self.name, self.kind),
+        ]
+
+    def render(self, const_names: Sequence[str], const_values: Sequence[str]) -> str:
+        return "\n".join(self._header() + self.samples(const_names, const_values))
+
+    def samples(
+        self, const_names: Sequence[str], const_values: Sequence[str]
+    ) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value, optionally split by labels; either
+    incremented here or read from *fn* (a running total kept elsewhere)
+    at scrape time.
+    """
+
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        fn: Optional[Callable[[], float]] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._fn = fn
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        self._fn = fn
+
+    def value(self, *labelvalues: str) -> float:
+        if self._fn is not None:
+            return float(self._fn())
+        return self._values.get(labelvalues, 0.0)
+
+    def total(self) -> float:
+        """Sum over all label values."""
+        if self._fn is not None:
+            return float(self._fn())
+        return sum(list(self._values.values()))
+
+    def samples(
+        self, const_names: Sequence[str], const_values: Sequence[str]
+    ) -> List[str]:
+        names = tuple(const_names) + self.labelnames
+        lines = []
+        if self._fn is not None:
+            items: List[Tuple[Tuple[str, ...], float]] = [((), self.value())]
+        else:
+            items = list(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0.0)]
+        for labels, v in sorted(items):
+            lines.append(
+                "%s%s %s"
+                % (
+                    self.name,
+                    _format_labels(names, tuple(const_values) + labels),
+                    _format_value(v),
+                )
+            )
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down; either set explicitly or read from
+    *fn* at scrape time.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        fn: Optional[Callable[[], float]] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._fn = fn
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        self._values[labelvalues] = value
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        self._fn = fn
+
+    def value(self, *labelvalues: str) -> float:
+        if self._fn is not None:
+            return float(self._fn())
+        return self._values.get(labelvalues, 0.0)
+
+    def samples(
+        self, const_names: Sequence[str], const_values: Sequence[str]
+    ) -> List[str]:
+        names = tuple(const_names) + self.labelnames
+        lines = []
+        if self._fn is not None:
+            items: List[Tuple[Tuple[str, ...], float]] = [((), self.value())]
+        else:
+            items = list(self._values.items()) or [((), 0.0)]
+        for labels, v in sorted(items):
+            lines.append(
+                "%s%s %s"
+                % (
+                    self.name,
+                    _format_labels(names, tuple(const_values) + labels),
+                    _format_value(v),
+                )
+            )
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets, plus sum and count."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        state = self._values.get(labelvalues)
+        if state is None:
+            state = [0.0] * (len(self.buckets) + 2)
+            self._values[labelvalues] = state
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def count(self, *labelvalues: str) -> float:
+        state = self._values.get(labelvalues)
+        return sum(state[:-1]) if state else 0.0
+
+    def samples(
+        self, const_names: Sequence[str], const_values: Sequence[str]
+    ) -> List[str]:
+        names = tuple(const_names) + self.labelnames
+        bucket_names = names + ("le",)
+        lines = []
+        for labels, state in sorted(list(self._values.items())):
+            state = list(state)
+            values = tuple(const_values) + labels
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += n
+                lines.append(
+                    "%s_bucket%s %s"
+                    % (
+                        self.name,
+                        _format_labels(bucket_names, values + (_format_value(bound),)),
+                        _format_value(cumulative),
+                    )
+                )
+            lines.append(
+                "%s_sum%s %s"
+                % (self.name, _format_labels(names, values), _format_value(state[-1]))
+            )
+            lines.append(
+                "%s_count%s %s"
+                % (self.name, _format_labels(names, values), _format_value(cumulative))
+            )
+        return lines
+
+
+class MetricsRegistry(object):
+    """An ordered collection of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        fn: Optional[Callable[[], float]] = None,
+    ) -> Counter:
+        metric = Counter(name, documentation, labelnames, fn)
+        self.register(metric)
+        return metric
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        fn: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        metric = Gauge(name, documentation, labelnames, fn)
+        self.register(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.register(metric)
+        return metric
+
+    def render(self, const_labels: Optional[Mapping[str, str]] = None) -> str:
+        """
+        Render every metric in Prometheus text format.
+        Args:
+            const_labels (dict, optional): Labels added to every sample.
+        Returns:
+            str: Exposition text, newline terminated.
+        """
+        names = tuple((const_labels or {}).keys())
+        values = tuple((const_labels or {}).values())
+        return "".join(m.render(names, values) + "\n" for m in self._metrics)
+
+
+def render_merged(
+    registries: Sequence[Tuple[Mapping[str, str], MetricsRegistry]],
+) -> str:
+    """
+    Render registries with the same metrics (e.g. one PanelMetrics per
+    panel) as single metric families, told apart by each registry's
+    constant labels.  A metric only some registries have (e.g. the MQTT
+    metrics of panels with MQTT) is rendered once with their samples.
+    Args:
+        registries (list): (const_labels, registry) pairs.
+    Returns:
+        str: Exposition text, newline terminated.
+    """
+    families: Dict[str, List[str]] = {}
+    for const_labels, registry in registries:
+        names = tuple(const_labels.keys())
+        values = tuple(const_labels.values())
+        for metric in registry._metrics:
+            lines = families.get(metric.name)
+            if lines is None:
+                lines = families[metric.name] = metric._header()
+            lines += metric.samples(names, values)
+    return "".join("\n".join(lines) + "\n" for lines in families.values())
+
+
+class PanelMetrics(object):
+    """Serial link and message pipeline metrics for one AlarmPanelInterface."""
+
+    def __init__(self) -> None:
+        r = self.registry = MetricsRegistry()
+        self.rx_frames = r.counter(
+            "rx_frames_total", "Frames received from the panel.", ("command",)
+        )
+        self.rx_bad_checksums = r.counter(
+            "rx_bad_checksums_total", "Frames received with a bad checksum."
+        )
+        self.rx_errors = r.counter(
+            "rx_errors_total",
+            "Frames that could not be read (timeout, bad encoding, too short).",
+        )
+        self.naks_sent = r.counter("naks_sent_total", "NAKs sent to the panel.")
+        self.naks_received = r.counter(
+            "naks_received_total", "NAKs received from the panel."
+        )
+        self.tx_frames = r.counter("tx_frames_total", "Frames written to the panel.")
+        self.tx_resends = r.counter(
+            "tx_resends_total", "Frames resent to the panel.", ("reason",)
+        )
+        self.tx_failures = r.counter(
+            "tx_failures_total", "Frames abandoned after MAX_RESENDS attempts."
+        )
+        self.tx_queue_depth = r.gauge(
+            "tx_queue_depth", "Messages waiting in the transmit queue."
+        )
+        self.ack_rtt = r.histogram(
+            "ack_rtt_seconds", "Time from writing a frame to the panel's ACK."
+        )
+        self.handler_seconds = r.histogram(
+            "handler_seconds",
+            "Execution time of RX parsers and registered message handlers.",
+            ("handler",),
+            buckets=HANDLER_BUCKETS,
+        )
+        self.reconnects = r.counter("reconnects_total", "Serial port reconnect cycles.")
+        self.backoff_seconds = r.counter(
+            "reconnect_backoff_seconds_total",
+            "Seconds spent in reconnect backoff sleeps.",
+        )
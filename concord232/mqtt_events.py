@@ -1,17 +1,61 @@
 """
-MQTT publishing for Concord panel events (ALARM / TOUCHPAD), schema version 1.
+MQTT publishing for Concord panel events (ALARM / TOUCHPAD), retained
+per-entity state (zones, partitions, troubles), schema version 1, Home
+Assistant MQTT discovery for those state topics, and an optional command
+topic for arming, disarming and keypresses.
+
+Event and zone/partition state topics can instead carry schema version 2:
+compact msgpack or CBOR bodies with short keys, codes instead of decoded
+text and epoch-millisecond timestamps (see encode_payload and the
+build_*_compact functions), selected per topic class.
 """
 
 from __future__ import annotations
 
 import json
 import logging
+import threading
+import time
+from collections import deque
 from datetime import datetime, timezone
-from typing import Any, Mapping, Optional
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from concord232.concord_commands import (
+    ALARM_SOURCE_NAME,
+    KEYPRESS_CODES,
+    TOUCHPAD_MSG_TYPE,
+    ZONE_STATES,
+)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # type: ignore[assignment]
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None  # type: ignore[assignment]
 
 LOG = logging.getLogger(__name__)
 
 SCHEMA_VERSION = 1
+COMPACT_SCHEMA_VERSION = 2
+
+ENCODINGS = ("json", "msgpack", "cbor")
+# Topic classes whose encoding can be changed; status, trouble, discovery
+# and command results are always JSON.
+COMPACT_TOPICS = ("alarm", "touchpad", "zone", "partition")
 
 
 def _utc_now() -> datetime:
@@ -22,6 +66,15 @@ def _iso(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).isoformat()
 
 
+def _epoch_ms(dt: datetime) -> int:
+    return int(dt.timestamp() * 1000)
+
+
+# Decoded text -> code, for the compact payloads.
+_TOUCHPAD_MSG_CODES = dict((v, k) for k, v in TOUCHPAD_MSG_TYPE.items())
+_ZONE_STATE_CODES = dict((v, k) for k, v in ZONE_STATES.items())
+
+
 def build_alarm_payload(
     decoded: Mapping[str, Any],
     *,
@@ -68,8 +121,456 @@ def build_touchpad_payload(
     return body
 
 
+def build_alarm_payload_compact(
+    decoded: Mapping[str, Any],
+    *,
+    received_at: Optional[datetime] = None,
+) -> dict[str, Any]:
+    """Schema v2 ``event/alarm`` body: codes only, epoch-ms timestamp."""
+    when = received_at if received_at is not None else _utc_now()
+    return {
+        "v": COMPACT_SCHEMA_VERSION,
+        "p": decoded.get("partition_number"),
+        "a": decoded.get("area_number"),
+        "st": ALARM_SOURCE_NAME.get(decoded.get("source_type")),
+        "sn": decoded.get("source_number"),
+        "g": decoded.get("alarm_general_type_code"),
+        "s": decoded.get("alarm_specific_type_code"),
+        "d": decoded.get("event_specific_data"),
+        "t": _epoch_ms(when),
+    }
+
+
+def build_touchpad_payload_compact(
+    decoded: Mapping[str, Any],
+    *,
+    received_at: Optional[datetime] = None,
+) -> dict[str, Any]:
+    """Schema v2 ``event/touchpad`` body."""
+    when = received_at if received_at is not None else _utc_now()
+    body: dict[str, Any] = {
+        "v": COMPACT_SCHEMA_VERSION,
+        "p": decoded.get("partition_number"),
+        "a": decoded.get("area_number"),
+        "m": _TOUCHPAD_MSG_CODES.get(decoded.get("message_type")),
+        "x": decoded.get("display_text"),
+        "t": _epoch_ms(when),
+    }
+    ts = decoded.get("timestamp")
+    if isinstance(ts, datetime):
+        body["pt"] = _epoch_ms(ts)
+    return body
+
+
+def build_zone_state_compact(
+    state: Mapping[str, Any], *, updated_at: Optional[datetime] = None
+) -> dict[str, Any]:
+    """Schema v2 ``zone/<p>/<z>/state`` body; ``s`` is the zone state code."""
+    when = updated_at if updated_at is not None else _utc_now()
+    states = state.get("zone_state") or []
+    return {
+        "v": COMPACT_SCHEMA_VERSION,
+        "p": state.get("partition_number"),
+        "z": state.get("zone_number"),
+        "s": _ZONE_STATE_CODES.get(states[0]) if states else None,
+        "t": _epoch_ms(when),
+    }
+
+
+def build_partition_state_compact(
+    state: Mapping[str, Any], *, updated_at: Optional[datetime] = None
+) -> dict[str, Any]:
+    """
+    Schema v2 ``partition/<p>/state`` body; ``l`` is the arming level code
+    and ``u`` the raw user number of the last arm/disarm.
+    """
+    when = updated_at if updated_at is not None else _utc_now()
+    return {
+        "v": COMPACT_SCHEMA_VERSION,
+        "p": state.get("partition_number"),
+        "l": state.get("arming_level_code"),
+        "u": state.get("user_number_low"),
+        "t": _epoch_ms(when),
+    }
+
+
+def encode_payload(
+    payload: Optional[Mapping[str, Any]], encoding: str
+) -> Union[str, bytes]:
+    """
+    Serialize *payload* as JSON (str), msgpack or CBOR (bytes); None becomes
+    an empty body.
+    """
+    if payload is None:
+        return ""
+    if encoding == "msgpack":
+        return msgpack.packb(payload, default=str)
+    if encoding == "cbor":
+        return cbor2.dumps(payload, default=lambda enc, v: enc.encode(str(v)))
+    return json.dumps(payload, default=str, separators=(",", ":"))
+
+
+def parse_encodings(spec: str) -> Dict[str, str]:
+    """
+    Parse a per-topic encoding spec such as ``alarm=msgpack,touchpad=cbor``
+    (``*=msgpack`` sets every topic class in COMPACT_TOPICS).
+    Raises:
+        ValueError: Unknown topic class or encoding, or the encoder library
+            is not installed.
+    """
+    out: Dict[str, str] = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        topic, sep, encoding = item.partition("=")
+        topic, encoding = topic.strip().lower(), encoding.strip().lower()
+        if not sep or encoding not in ENCODINGS:
+            raise ValueError(
+                "bad MQTT encoding %r; use TOPIC=%s" % (item, "|".join(ENCODINGS))
+            )
+        if topic != "*" and topic not in COMPACT_TOPICS:
+            raise ValueError(
+                "MQTT encoding topic must be one of: %s" % ", ".join(COMPACT_TOPICS)
+            )
+        if encoding == "msgpack" and msgpack is None:
+            raise ValueError("msgpack encoding requires the msgpack package")
+        if encoding == "cbor" and cbor2 is None:
+            raise ValueError("cbor encoding requires the cbor2 package")
+        for t in COMPACT_TOPICS if topic == "*" else (topic,):
+            out[t] = encoding
+    return out
+
+
+DEFAULT_DISCOVERY_PREFIX = "homeassistant"
+
+# Zone states that make a zone's binary_sensor "on".
+_ZONE_ACTIVE_STATES = ("Tripped", "Faulted", "Alarm")
+
+# Concord arming level codes -> Home Assistant alarm_control_panel states.
+_HA_ALARM_STATES_TEMPLATE = (
+    "{{ {1: 'disarmed', 2: 'armed_home', 3: 'armed_away', 4: 'armed_night'}"
+    ".get(value_json.arming_level_code, 'unknown') }}"
+)
+
+
+def status_payload(state: str) -> str:
+    """JSON body for ``{prefix}/status`` (``online`` / ``offline``)."""
+    return json.dumps(
+        {"schema_version": SCHEMA_VERSION, "state": state}, separators=(",", ":")
+    )
+
+
+def _device_class_for_zone(zone: Mapping[str, Any]) -> str:
+    text = str(zone.get("zone_text") or "").upper()
+    if "MOTION" in text:
+        return "motion"
+    if "SMOKE" in text or "FIRE" in text:
+        return "smoke"
+    if "WINDOW" in text:
+        return "window"
+    if "DOOR" in text:
+        return "door"
+    return "opening"
+
+
+def _discovery_common(
+    topic_prefix: str, node_id: str, panel: Mapping[str, Any]
+) -> dict:
+    return {
+        "availability_topic": "%s/status" % topic_prefix,
+        "availability_template": "{{ value_json.state }}",
+        "payload_available": "online",
+        "payload_not_available": "offline",
+        "device": {
+            "identifiers": [node_id],
+            "name": "Concord alarm panel",
+            "manufacturer": "GE / Interlogix",
+            "model": panel.get("panel_type") or "Concord",
+        },
+    }
+
+
+def build_zone_discovery(
+    topic_prefix: str,
+    node_id: str,
+    zone: Mapping[str, Any],
+    *,
+    panel: Optional[Mapping[str, Any]] = None,
+    discovery_prefix: str = DEFAULT_DISCOVERY_PREFIX,
+) -> Tuple[str, dict]:
+    """Discovery (topic, config) for one zone's binary_sensor."""
+    p = zone.get("partition_number")
+    z = zone.get("zone_number")
+    object_id = "p%sz%s" % (p, z)
+    state_topic = "%s/zone/%s/%s/state" % (topic_prefix, p, z)
+    config = _discovery_common(topic_prefix, node_id, panel or {})
+    config.update(
+        {
+            "name": zone.get("zone_text") or "Zone %s" % z,
+            "unique_id": "%s_%s" % (node_id, object_id),
+            "state_topic": state_topic,
+            "value_template": "{{ 'ON' if value_json.zone_state | select('in', %r)"
+            " | list else 'OFF' }}" % (list(_ZONE_ACTIVE_STATES),),
+            "json_attributes_topic": state_topic,
+            "device_class": _device_class_for_zone(zone),
+        }
+    )
+    topic = "%s/binary_sensor/%s/%s/config" % (discovery_prefix, node_id, object_id)
+    return topic, config
+
+
+def build_partition_discovery(
+    topic_prefix: str,
+    node_id: str,
+    partition: Mapping[str, Any],
+    *,
+    panel: Optional[Mapping[str, Any]] = None,
+    discovery_prefix: str = DEFAULT_DISCOVERY_PREFIX,
+) -> Tuple[str, dict]:
+    """Discovery (topic, config) for one partition's alarm_control_panel."""
+    p = partition.get("partition_number")
+    object_id = "partition%s" % p
+    state_topic = "%s/partition/%s/state" % (topic_prefix, p)
+    config = _discovery_common(topic_prefix, node_id, panel or {})
+    config.update(
+        {
+            "name": partition.get("partition_text") or "Partition %s" % p,
+            "unique_id": "%s_%s" % (node_id, object_id),
+            "state_topic": state_topic,
+            "value_template": _HA_ALARM_STATES_TEMPLATE,
+            "json_attributes_topic": state_topic,
+            "command_topic": "%s/command/%s" % (topic_prefix, p),
+            "command_template": '{"action": "{{ action }}", "code": "{{ code }}"}',
+            # HA prompts for the PIN and forwards it in {{ code }}.
+            "code": "REMOTE_CODE",
+            "code_arm_required": False,
+            "code_disarm_required": True,
+            "supported_features": ["arm_home", "arm_away"],
+        }
+    )
+    topic = "%s/alarm_control_panel/%s/%s/config" % (
+        discovery_prefix,
+        node_id,
+        object_id,
+    )
+    return topic, config
+
+
+def build_trouble_discovery(
+    topic_prefix: str,
+    node_id: str,
+    *,
+    panel: Optional[Mapping[str, Any]] = None,
+    discovery_prefix: str = DEFAULT_DISCOVERY_PREFIX,
+) -> Tuple[str, dict]:
+    """Discovery (topic, config) for the panel trouble detail sensor."""
+    state_topic = "%s/trouble/state" % topic_prefix
+    config = _discovery_common(topic_prefix, node_id, panel or {})
+    config.update(
+        {
+            "name": "Panel trouble",
+            "unique_id": "%s_trouble" % node_id,
+            "state_topic": state_topic,
+            "value_template": "{{ value_json.trouble_detail or 'OK' }}",
+            "json_attributes_topic": state_topic,
+            "icon": "mdi:alert-circle-outline",
+        }
+    )
+    topic = "%s/sensor/%s/trouble/config" % (discovery_prefix, node_id)
+    return topic, config
+
+
+# Topic classes for the outbound queue (see PanelMqttPublisher.start()).
+KIND_STATUS = "status"
+KIND_ALARM = "alarm"
+KIND_TOUCHPAD = "touchpad"
+KIND_STATE = "state"
+KIND_RESULT = "result"
+# Queued messages of these kinds are replaced by a newer one for the same topic.
+_COALESCING_KINDS = (KIND_TOUCHPAD, KIND_STATE)
+
+# Fields carried in the retained state topics; updates merge into the last
+# published state, so e.g. ZONE_STATUS keeps the name learned from ZONE_DATA.
+ZONE_STATE_FIELDS = (
+    "partition_number",
+    "area_number",
+    "group_number",
+    "zone_number",
+    "zone_type",
+    "zone_text",
+    "zone_state",
+)
+PARTITION_STATE_FIELDS = (
+    "partition_number",
+    "area_number",
+    "arming_level",
+    "arming_level_code",
+    "user_info",
+    "user_number_low",
+    "partition_text",
+)
+TROUBLE_STATE_FIELDS = (
+    "trouble",
+    "trouble_count",
+    "trouble_detail",
+    "trouble_buses",
+)
+
+# Command "action" values, with the Home Assistant alarm_control_panel
+# payloads (see build_partition_discovery) as aliases.
+COMMAND_ACTIONS = ("arm_stay", "arm_away", "disarm", "send_keys")
+_ACTION_ALIASES = {
+    "ARM_HOME": "arm_stay",
+    "ARM_AWAY": "arm_away",
+    "DISARM": "disarm",
+}
+_ARM_OPTIONS = (None, "silent", "instant")
+_KEY_NAMES = tuple(KEYPRESS_CODES.values())
+
+
+class CommandError(ValueError):
+    """A command payload that cannot be sent to the panel."""
+
+
+def parse_command(payload: bytes, valid_keys: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Decode and validate a command payload.
+    Args:
+        payload (bytes): JSON object with "action" and, depending on the
+            action, "option" (arm_*), "code" (disarm), "keys" and "group"
+            (send_keys), plus an optional "id" echoed in the result.  A bare
+            action name (e.g. ``DISARM``) is also accepted.
+        valid_keys (sequence): Key names accepted by send_keys; not checked
+            when empty.
+    Returns:
+        dict: Normalised command with "action" and its arguments.
+    Raises:
+        CommandError: The payload is malformed or the action is unknown.
+    """
+    text = payload.decode("utf-8", "replace").strip()
+    try:
+        body = json.loads(text)
+    except ValueError:
+        body = {"action": text}
+    if isinstance(body, str):
+        body = {"action": body}
+    if not isinstance(body, dict):
+        raise CommandError("command must be a JSON object")
+    action = str(body.get("action") or "")
+    action = _ACTION_ALIASES.get(action.upper(), action.lower())
+    if action not in COMMAND_ACTIONS:
+        raise CommandError("unknown action %r" % action)
+    cmd: Dict[str, Any] = {"action": action, "id": body.get("id")}
+    if action in ("arm_stay", "arm_away"):
+        option = body.get("option") or None
+        if option not in _ARM_OPTIONS:
+            raise CommandError("unknown arm option %r" % option)
+        cmd["option"] = option
+    elif action == "disarm":
+        code = str(body.get("code") or "")
+        if not code.isdigit():
+            raise CommandError("disarm requires a numeric code")
+        cmd["code"] = code
+    else:
+        keys = body.get("keys")
+        if isinstance(keys, (str, int)):
+            keys = list(str(keys))
+        if not keys or not isinstance(keys, list):
+            raise CommandError("send_keys requires keys")
+        keys = [str(k) for k in keys]
+        if valid_keys:
+            bad = [k for k in keys if k not in valid_keys]
+            if bad:
+                raise CommandError("unknown keys %r" % bad)
+        cmd["keys"] = keys
+        cmd["group"] = bool(body.get("group", False))
+    return cmd
+
+
+DEFAULT_MAX_QUEUE = 1000
+DEFAULT_MAX_INFLIGHT = 100
+_BATCH_SIZE = 50
+_INFLIGHT_POLL_SECS = 0.05
+
+
+class _Outbound:
+    __slots__ = ("kind", "topic", "payload", "retain", "encoding")
+
+    def __init__(
+        self,
+        kind: str,
+        topic: str,
+        payload: Optional[Mapping[str, Any]],
+        retain: bool,
+        encoding: str,
+    ) -> None:
+        self.kind = kind
+        self.topic = topic
+        self.payload = payload
+        self.retain = retain
+        self.encoding = encoding
+
+
+def _is_published(info: Any) -> bool:
+    """
+    Whether the broker acknowledged a publish.  Messages paho dropped
+    (rc=MQTT_ERR_QUEUE_SIZE) are done; messages queued while disconnected
+    (rc=MQTT_ERR_NO_CONN) stay in flight until paho sends them after
+    reconnecting.
+    """
+    try:
+        return bool(info.is_published())
+    except ValueError:
+        return True
+    except RuntimeError:
+        # is_published() keeps raising for a non-zero rc even once the
+        # message went out after a reconnect.
+        return bool(getattr(info, "_published", False))
+    except Exception:
+        return True
+
+
+def _is_connected(client: Any) -> bool:
+    is_connected = getattr(client, "is_connected", None)
+    return is_connected is None or bool(is_connected())
+
+
 class PanelMqttPublisher:
-    """Publishes panel decode dicts to MQTT topics under a prefix."""
+    """
+    Publishes panel decode dicts to MQTT topics under a prefix.
+
+    Until start() is called every publish happens inline in the caller's
+    thread.  After start(), publish_* only queue the payload and a worker
+    thread serializes and publishes it, so a slow or unreachable broker
+    never delays the serial loop.  The queue holds at most *max_queue*
+    messages: pending touchpad updates for the same topic coalesce into
+    the newest one and touchpad messages are dropped when the queue is
+    full, while alarms and status are never dropped (they evict a queued
+    touchpad message instead, or grow the queue past the bound).  The
+    worker stops publishing while *max_inflight* QoS 1 messages are
+    unacknowledged by the broker, and while the client is disconnected,
+    so an outage backs up this queue rather than paho's unbounded one.
+
+    publish_zone_state / publish_partition_state / publish_trouble_state
+    maintain retained ``zone/<p>/<z>/state``, ``partition/<p>/state`` and
+    ``trouble/state`` topics and publish only when the state differs from
+    the last one published for that topic.  Queued state updates coalesce
+    like touchpad text but are never dropped.
+
+    publish_discovery() publishes retained Home Assistant discovery configs
+    for those state topics, again only for entities whose config changed
+    (e.g. a zone was renamed); entities that disappeared from the panel's
+    tables are removed.
+
+    *encodings* maps topic classes in COMPACT_TOPICS to "msgpack" or "cbor"
+    (see parse_encodings); those topics carry schema v2 compact bodies and
+    the rest stay JSON schema v1.
+
+    subscribe_commands() accepts commands on ``command/<partition>`` (see
+    parse_command) and publishes the outcome to ``command/<partition>/result``
+    once the panel ACKs the message or it is abandoned.
+    """
 
     def __init__(
         self,
@@ -77,42 +578,359 @@ class PanelMqttPublisher:
         topic_prefix: str,
         *,
         publish_touchpad: bool = True,
+        publish_state: bool = True,
+        discovery_prefix: str = DEFAULT_DISCOVERY_PREFIX,
+        node_id: Optional[str] = None,
         logger: Optional[logging.Logger] = None,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        max_inflight: int = DEFAULT_MAX_INFLIGHT,
+        encodings: Optional[Mapping[str, str]] = None,
     ) -> None:
         self._client = client
         self._prefix = topic_prefix.strip().strip("/")
         # Must not shadow method publish_touchpad (used as a message handler callback).
         self._touchpad_enabled = publish_touchpad
+        self._state_enabled = publish_state
+        # topic -> last published state (without timestamp)
+        self._last_state: Dict[str, Dict[str, Any]] = {}
+        self.discovery_prefix = discovery_prefix.strip().strip("/")
+        self.node_id = node_id or self._prefix.replace("/", "_")
+        # discovery config topic -> last published config
+        self._last_discovery: Dict[str, Dict[str, Any]] = {}
         self._log = logger or LOG
+        self.encodings = dict(encodings or {})
+        self.max_queue = max_queue
+        self.max_inflight = max_inflight
+        self._queue: Deque[_Outbound] = deque()
+        self._pending: Dict[str, _Outbound] = {}
+        self._inflight: List[Any] = []
+        self._inflight_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.published = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._controller: Any = None
 
     def _topic(self, *parts: str) -> str:
         return "/".join((self._prefix,) + parts)
 
     def publish_online(self) -> None:
-        payload = json.dumps(
-            {"schema_version": SCHEMA_VERSION, "state": "online"},
-            separators=(",", ":"),
+        payload = {"schema_version": SCHEMA_VERSION, "state": "online"}
+        self._submit(KIND_STATUS, self._topic("status"), payload, retain=True)
+
+    def publish_discovery(
+        self,
+        zones: Mapping[Any, Mapping[str, Any]],
+        partitions: Mapping[Any, Mapping[str, Any]],
+        panel: Optional[Mapping[str, Any]] = None,
+    ) -> int:
+        """
+        Publish Home Assistant discovery configs for *zones*, *partitions*
+        and the trouble sensor (AlarmPanelInterface tables).  Only configs
+        that differ from the last published ones are sent.
+        Returns:
+            int: Number of discovery messages published (including removals).
+        """
+        kwargs = {"panel": panel, "discovery_prefix": self.discovery_prefix}
+        configs = dict(
+            [build_trouble_discovery(self._prefix, self.node_id, **kwargs)]
+            + [
+                build_zone_discovery(self._prefix, self.node_id, z, **kwargs)
+                for z in list(zones.values())
+            ]
+            + [
+                build_partition_discovery(self._prefix, self.node_id, p, **kwargs)
+                for p in list(partitions.values())
+            ]
         )
-        try:
-            self._client.publish(
-                self._topic("status"), payload, qos=1, retain=True
-            )
-        except Exception:
-            self._log.exception("MQTT publish failed (status online)")
+        sent = 0
+        for topic in [t for t in self._last_discovery if t not in configs]:
+            del self._last_discovery[topic]
+            # An empty retained config removes the entity.
+            self._submit(KIND_STATE, topic, None, retain=True)
+            sent += 1
+        for topic, config in configs.items():
+            if self._last_discovery.get(topic) == config:
+                continue
+            self._last_discovery[topic] = config
+            self._submit(KIND_STATE, topic, config, retain=True)
+            sent += 1
+        return sent
 
     def publish_alarm(self, decoded: Mapping[str, Any]) -> None:
-        payload = build_alarm_payload(decoded)
-        self._publish_json(self._topic("event", "alarm"), payload, retain=False)
+        encoding = self.encodings.get("alarm", "json")
+        if encoding == "json":
+            payload = build_alarm_payload(decoded)
+        else:
+            payload = build_alarm_payload_compact(decoded)
+        self._submit(
+            KIND_ALARM,
+            self._topic("event", "alarm"),
+            payload,
+            retain=False,
+            encoding=encoding,
+        )
 
     def publish_touchpad(self, decoded: Mapping[str, Any]) -> None:
         if not self._touchpad_enabled:
             return
-        payload = build_touchpad_payload(decoded)
-        self._publish_json(self._topic("event", "touchpad"), payload, retain=False)
+        encoding = self.encodings.get("touchpad", "json")
+        if encoding == "json":
+            payload = build_touchpad_payload(decoded)
+        else:
+            payload = build_touchpad_payload_compact(decoded)
+        self._submit(
+            KIND_TOUCHPAD,
+            self._topic("event", "touchpad"),
+            payload,
+            retain=False,
+            encoding=encoding,
+        )
+
+    def publish_zone_state(self, decoded: Mapping[str, Any]) -> None:
+        """Message handler for ZONE_STATUS and ZONE_DATA."""
+        topic = self._topic(
+            "zone",
+            str(decoded.get("partition_number")),
+            str(decoded.get("zone_number")),
+            "state",
+        )
+        self._publish_state(topic, decoded, ZONE_STATE_FIELDS, "zone")
+
+    def publish_partition_state(self, decoded: Mapping[str, Any]) -> None:
+        """Message handler for ARM_LEVEL and PART_DATA."""
+        topic = self._topic("partition", str(decoded.get("partition_number")), "state")
+        self._publish_state(topic, decoded, PARTITION_STATE_FIELDS, "partition")
+
+    def publish_trouble_state(self, state: Mapping[str, Any]) -> None:
+        """Trouble handler (see AlarmPanelInterface.register_trouble_handler)."""
+        self._publish_state(
+            self._topic("trouble", "state"), state, TROUBLE_STATE_FIELDS
+        )
 
-    def _publish_json(self, topic: str, payload: Mapping[str, Any], retain: bool) -> None:
+    def _publish_state(
+        self,
+        topic: str,
+        decoded: Mapping[str, Any],
+        fields: Sequence[str],
+        topic_class: str = "trouble",
+    ) -> None:
+        if not self._state_enabled:
+            return
+        last = self._last_state.get(topic)
+        state = dict(last) if last is not None else {}
+        for f in fields:
+            if f in decoded:
+                state[f] = decoded[f]
+        if state == last:
+            return
+        self._last_state[topic] = state
+        encoding = self.encodings.get(topic_class, "json")
+        if encoding != "json":
+            compact = _COMPACT_STATE_BUILDERS[topic_class]
+            self._submit(KIND_STATE, topic, compact(state), True, encoding)
+            return
+        payload = dict(state)
+        payload["schema_version"] = SCHEMA_VERSION
+        payload["updated_at"] = _iso(_utc_now())
+        self._submit(KIND_STATE, topic, payload, retain=True)
+
+    def subscribe_commands(self, controller: Any) -> None:
+        """
+        Subscribe to ``command/+`` and run commands on *controller* (an
+        AlarmPanelInterface).  Call again from the client's on_connect to
+        resubscribe after a reconnect.
+        """
+        if self._controller is None:
+            self._client.message_callback_add(
+                self._topic("command", "+"), self._on_command
+            )
+        self._controller = controller
+        self._client.subscribe(self._topic("command", "+"), qos=1)
+
+    def _on_command(self, client: Any, userdata: Any, message: Any) -> None:
+        started = time.monotonic()
+        partition_s = message.topic.rsplit("/", 1)[-1]
+        cmd: Dict[str, Any] = {}
+        try:
+            if not partition_s.isdigit() or not 1 <= int(partition_s) <= 6:
+                raise CommandError("bad partition %r" % partition_s)
+            partition = int(partition_s)
+            cmd = parse_command(message.payload, _KEY_NAMES)
+        except CommandError as e:
+            self._log.warning("Rejected MQTT command on %s: %s", message.topic, e)
+            self._publish_result(partition_s, cmd, "rejected", str(e), started)
+            return
+
+        def on_complete(acked: bool, reason: str) -> None:
+            if acked:
+                self._publish_result(partition_s, cmd, "ack", None, started)
+            else:
+                self._publish_result(partition_s, cmd, "failed", reason, started)
+
+        action = cmd["action"]
+        # Never log the disarm code.
+        self._log.info("MQTT command %s partition=%d", action, partition)
+        ctrl = self._controller
+        try:
+            if action == "arm_stay":
+                ctrl.arm_stay(cmd["option"], partition, on_complete=on_complete)
+            elif action == "arm_away":
+                ctrl.arm_away(cmd["option"], partition, on_complete=on_complete)
+            elif action == "disarm":
+                ctrl.disarm(cmd["code"], partition, on_complete=on_complete)
+            else:
+                ctrl.send_keys(
+                    cmd["keys"], cmd["group"], partition, on_complete=on_complete
+                )
+        except Exception as e:
+            self._log.exception("MQTT command %s failed", action)
+            self._publish_result(partition_s, cmd, "failed", str(e), started)
+
+    def _publish_result(
+        self,
+        partition: str,
+        cmd: Mapping[str, Any],
+        result: str,
+        error: Optional[str],
+        started: float,
+    ) -> None:
+        payload = {
+            "schema_version": SCHEMA_VERSION,
+            "id": cmd.get("id"),
+            "action": cmd.get("action"),
+            "partition_number": int(partition) if partition.isdigit() else None,
+            "result": result,
+            "error": error,
+            "latency_ms": round((time.monotonic() - started) * 1000.0, 1),
+        }
+        topic = self._topic("command", partition, "result")
+        self._submit(KIND_RESULT, topic, payload, retain=False)
+
+    def start(self) -> None:
+        """Start the publishing thread; publish_* calls are queued from now on."""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="mqtt-publisher"
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Publish what is queued (for up to *timeout* seconds) and stop the thread."""
+        thread = self._thread
+        if thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        thread.join(timeout)
+        self._thread = None
+
+    def queued(self) -> int:
+        """Messages waiting in the outbound queue."""
+        return len(self._queue)
+
+    def inflight(self) -> int:
+        """QoS 1 messages handed to the client but not yet acknowledged."""
+        with self._inflight_lock:
+            self._inflight = [i for i in self._inflight if not _is_published(i)]
+            return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.queued(),
+            "inflight": self.inflight(),
+            "published": self.published,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
+
+    def _submit(
+        self,
+        kind: str,
+        topic: str,
+        payload: Optional[Mapping[str, Any]],
+        retain: bool,
+        encoding: str = "json",
+    ) -> None:
+        if self._thread is None:
+            self._publish_payload(topic, payload, retain, encoding)
+            return
+        with self._cond:
+            if kind in _COALESCING_KINDS:
+                pending = self._pending.get(topic)
+                if pending is not None:
+                    pending.payload = payload
+                    pending.encoding = encoding
+                    self.coalesced += 1
+                    return
+            if len(self._queue) >= self.max_queue:
+                if kind == KIND_TOUCHPAD:
+                    self.dropped += 1
+                    return
+                self._evict_touchpad()
+            item = _Outbound(kind, topic, payload, retain, encoding)
+            self._queue.append(item)
+            if kind in _COALESCING_KINDS:
+                self._pending[topic] = item
+            self._cond.notify()
+
+    def _evict_touchpad(self) -> None:
+        for item in self._queue:
+            if item.kind == KIND_TOUCHPAD:
+                self._queue.remove(item)
+                self._pending.pop(item.topic, None)
+                self.dropped += 1
+                return
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch = []
+                while self._queue and len(batch) < _BATCH_SIZE:
+                    item = self._queue.popleft()
+                    if item.kind in _COALESCING_KINDS:
+                        self._pending.pop(item.topic, None)
+                    batch.append(item)
+            for item in batch:
+                while not self._stopping and (
+                    self.inflight() >= self.max_inflight
+                    or not _is_connected(self._client)
+                ):
+                    time.sleep(_INFLIGHT_POLL_SECS)
+                info = self._publish_payload(
+                    item.topic, item.payload, item.retain, item.encoding
+                )
+                if info is not None:
+                    with self._inflight_lock:
+                        self._inflight.append(info)
+
+    def _publish_payload(
+        self,
+        topic: str,
+        payload: Optional[Mapping[str, Any]],
+        retain: bool,
+        encoding: str = "json",
+    ) -> Any:
         try:
-            body = json.dumps(payload, default=str, separators=(",", ":"))
-            self._client.publish(topic, body, qos=1, retain=retain)
+            body = encode_payload(payload, encoding)
+            info = self._client.publish(topic, body, qos=1, retain=retain)
         except Exception:
             self._log.exception("MQTT publish failed topic=%s", topic)
+            return None
+        self.published += 1
+        return info
+
+
+_COMPACT_STATE_BUILDERS = {
+    "zone": build_zone_state_compact,
+    "partition": build_partition_state_compact,
+}
@@ -0,0 +1,164 @@
+"""
+MQTT setup for one panel: connects a paho client and wires a
+PanelMqttPublisher to an AlarmPanelInterface.
+
+Used by the server and by supervisor worker processes, so it must not
+import the API server (and with it Flask); the publisher's metrics go on
+the panel's own registry.  paho-mqtt is imported only when MQTT is set up.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from concord232.mqtt_events import PanelMqttPublisher, status_payload
+
+
+def setup_mqtt(
+    ctrl: Any,
+    *,
+    host: str,
+    port: int,
+    username: str,
+    password: str,
+    topic_prefix: str,
+    client_id: str,
+    publish_touchpad: bool,
+    publish_state: bool,
+    discovery: bool,
+    discovery_prefix: str,
+    commands: bool,
+    encodings: dict,
+    tls: bool,
+    logger: logging.Logger,
+) -> None:
+    """
+    Connect a paho client and publish *ctrl*'s alarms, touchpad text,
+    state and (optionally) discovery through a started PanelMqttPublisher,
+    optionally running commands received on the command topics.  Logs and
+    returns without MQTT when paho-mqtt is missing or the connect fails.
+    """
+    try:
+        import paho.mqtt.client as mqtt
+    except ImportError:
+        logger.error("MQTT requested but paho-mqtt is not installed")
+        return
+
+    if not username and not password:
+        logger.warning(
+            "MQTT has no username or password configured; connecting anonymously. "
+            "Brokers that require authentication (e.g. Home Assistant Mosquitto) will "
+            "reject the client with errors such as 'not authorised' or "
+            "'null username or password'. Set mqtt_username and mqtt_password to "
+            "match your broker credentials."
+        )
+    elif password and not username:
+        logger.warning(
+            "MQTT password is set but username is empty; set mqtt_username as well "
+            "(most brokers, including HA Mosquitto, require both)."
+        )
+    elif username and not password:
+        logger.warning(
+            "MQTT username is set but password is empty; the broker may reject the "
+            "connection if a password is required."
+        )
+    client = mqtt.Client(client_id=client_id, clean_session=True)
+    if username or password:
+        client.username_pw_set(username, password)
+    if tls:
+        import ssl
+
+        client.tls_set(tls_version=ssl.PROTOCOL_TLS_CLIENT)
+    # Retained "offline" when the connection drops; HA discovery entities
+    # use the status topic for availability.
+    client.will_set(
+        "%s/status" % topic_prefix.strip().strip("/"),
+        status_payload("offline"),
+        qos=1,
+        retain=True,
+    )
+    try:
+        client.connect(host, port, 60)
+    except Exception:
+        logger.exception("MQTT connect failed; continuing without MQTT")
+        return
+    client.loop_start()
+    publisher = PanelMqttPublisher(
+        client,
+        topic_prefix,
+        publish_touchpad=publish_touchpad,
+        publish_state=publish_state,
+        discovery_prefix=discovery_prefix,
+        logger=logger,
+        encodings=encodings,
+    )
+    # The publisher holds messages back while disconnected; this bounds
+    # whatever still reaches paho's own (otherwise unbounded) queue.
+    client.max_queued_messages_set(publisher.max_queue)
+    publisher.start()
+    publisher.publish_online()
+    # On the panel's registry, so /metrics labels them per panel.
+    m = ctrl.metrics.registry
+    m.gauge(
+        "mqtt_queue_depth",
+        "MQTT messages waiting to be published.",
+        fn=publisher.queued,
+    )
+    m.gauge(
+        "mqtt_inflight",
+        "MQTT QoS 1 messages awaiting broker acknowledgement.",
+        fn=publisher.inflight,
+    )
+    m.counter(
+        "mqtt_published_total",
+        "MQTT messages handed to the client.",
+        fn=lambda: publisher.published,
+    )
+    m.counter(
+        "mqtt_dropped_total",
+        "MQTT touchpad messages dropped on a full queue.",
+        fn=lambda: publisher.dropped,
+    )
+    m.counter(
+        "mqtt_coalesced_total",
+        "MQTT touchpad messages replaced by a newer one while queued.",
+        fn=lambda: publisher.coalesced,
+    )
+    if commands:
+
+        def on_connect(client: Any, userdata: Any, flags: Any, rc: int) -> None:
+            # clean_session drops subscriptions on every reconnect.
+            if rc == 0:
+                publisher.subscribe_commands(ctrl)
+
+        client.on_connect = on_connect
+        publisher.subscribe_commands(ctrl)
+    ctrl.register_message_handler("ALARM", publisher.publish_alarm)
+    if publish_touchpad:
+        ctrl.register_message_handler("TOUCHPAD", publisher.publish_touchpad)
+    if publish_state:
+        for command_id in ("ZONE_STATUS", "ZONE_DATA"):
+            ctrl.register_message_handler(command_id, publisher.publish_zone_state)
+        for command_id in ("ARM_LEVEL", "PART_DATA"):
+            ctrl.register_message_handler(command_id, publisher.publish_partition_state)
+        ctrl.register_trouble_handler(publisher.publish_trouble_state)
+    if discovery:
+        if not publish_state:
+            logger.warning("MQTT discovery entities need state topics; ignoring")
+        elif set(encodings) & {"zone", "partition"}:
+            logger.warning(
+                "MQTT discovery entities need JSON zone/partition state; ignoring"
+            )
+        else:
+
+            def publish_discovery(decoded: dict) -> None:
+                publisher.publish_discovery(ctrl.zones, ctrl.partitions, ctrl.panel)
+
+            ctrl.register_message_handler("EQPT_LIST_DONE", publish_discovery)
+    logger.info(
+        "MQTT panel events enabled prefix=%s host=%s:%s",
+        topic_prefix,
+        host,
+        port,
+    )
@@ -0,0 +1,153 @@
+"""
+Immutable, versioned views of a panel's state for concurrent readers.
+
+The serial thread's parsers update AlarmPanelInterface.zones, partitions
+and panel in place.  After each batch of updates (one message, or a whole
+equipment list up to EQPT_LIST_DONE) the controller publishes a new
+PanelState by assigning ``controller.state``.  API threads take that one
+reference and work from it without locks, so they never iterate a dict
+the serial thread is changing and never see half an equipment list.
+
+States are copy-on-write: a new state shares every zone and partition
+dict that did not change with its predecessor and copies only those that
+did.  A published state, and the dicts in it, must not be modified.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+# Attempts at capturing a controller without published states while its
+# state version stays put.
+CAPTURE_ATTEMPTS = 3
+
+
+class PanelState(object):
+    """Zones, partitions and panel dict of one controller at one state version."""
+
+    __slots__ = (
+        "version",
+        "panel",
+        "zones",
+        "partitions",
+        "panel_version",
+        "zone_versions",
+        "partition_versions",
+        "zone_counts",
+    )
+
+    def __init__(
+        self,
+        version: Optional[int] = 0,
+        panel: Optional[Dict[str, Any]] = None,
+        zones: Optional[Dict[str, Dict[str, Any]]] = None,
+        partitions: Optional[Dict[Any, Dict[str, Any]]] = None,
+        panel_version: Optional[int] = None,
+        zone_versions: Optional[Dict[Tuple[int, int], int]] = None,
+        partition_versions: Optional[Dict[int, int]] = None,
+    ) -> None:
+        """
+        Args:
+            version (int): State version (None if the source has none).
+            panel (dict): Panel dict.
+            zones (dict): Zone dicts by ``p<partition>z<zone>`` key.
+            partitions (dict): Partition dicts by number.
+            panel_version (int, optional): State version of the last
+                panel change.
+            zone_versions (dict, optional): State version of each zone's
+                last change, by (partition, zone) number.
+            partition_versions (dict, optional): State version of each
+                partition's last change, by number.
+        """
+        zones = zones or {}
+        counts: Dict[Any, int] = {}
+        for zone in zones.values():
+            number = zone["partition_number"]
+            counts[number] = counts.get(number, 0) + 1
+        _set = object.__setattr__
+        _set(self, "version", version)
+        _set(self, "panel", panel or {})
+        _set(self, "zones", zones)
+        _set(self, "partitions", partitions or {})
+        _set(self, "panel_version", panel_version)
+        _set(self, "zone_versions", zone_versions)
+        _set(self, "partition_versions", partition_versions)
+        _set(self, "zone_counts", counts)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("PanelState is immutable")
+
+    def updated(
+        self,
+        version: int,
+        panel: Optional[Mapping[str, Any]] = None,
+        zones: Optional[Mapping[str, Dict[str, Any]]] = None,
+        partitions: Optional[Mapping[Any, Dict[str, Any]]] = None,
+        panel_version: Optional[int] = None,
+        zone_versions: Optional[Mapping[Tuple[int, int], int]] = None,
+        partition_versions: Optional[Mapping[int, int]] = None,
+    ) -> "PanelState":
+        """
+        This state at *version* with *panel* replaced and the given zones,
+        partitions and change versions added or replaced.  The given dicts
+        are copied; everything else is shared with this state.
+        Returns:
+            PanelState: The new state.
+        """
+        new_zones = self.zones
+        if zones:
+            new_zones = dict(self.zones)
+            new_zones.update((key, dict(zone)) for key, zone in zones.items())
+        new_partitions = self.partitions
+        if partitions:
+            new_partitions = dict(self.partitions)
+            new_partitions.update((key, dict(p)) for key, p in partitions.items())
+        return PanelState(
+            version,
+            self.panel if panel is None else dict(panel),
+            new_zones,
+            new_partitions,
+            self.panel_version if panel_version is None else panel_version,
+            _merged(self.zone_versions, zone_versions),
+            _merged(self.partition_versions, partition_versions),
+        )
+
+
+def _merged(
+    versions: Optional[Dict[Any, int]], changes: Optional[Mapping[Any, int]]
+) -> Optional[Dict[Any, int]]:
+    if not changes:
+        return versions
+    merged = dict(versions or {})
+    merged.update(changes)
+    return merged
+
+
+def _int_or_none(value: Any) -> Optional[int]:
+    return value if isinstance(value, int) else None
+
+
+def current_state(controller: Any) -> PanelState:
+    """
+    The latest published PanelState of *controller*.  Controllers that do
+    not publish states (supervisor RemotePanel, test doubles) are captured
+    from their zones / partitions / panel, retrying if their state version
+    moved meanwhile.  A PanelState is returned as is.
+    """
+    if isinstance(controller, PanelState):
+        return controller
+    state = getattr(controller, "state", None)
+    if isinstance(state, PanelState):
+        return state
+    for _ in range(CAPTURE_ATTEMPTS):
+        version = _int_or_none(getattr(controller, "state_version", None))
+        state = PanelState(
+            version,
+            dict(controller.panel),
+            dict(controller.zones),
+            dict(controller.partitions),
+            _int_or_none(getattr(controller, "panel_version", None)),
+        )
+        if version is None or getattr(controller, "state_version", None) == version:
+            break
+    return state
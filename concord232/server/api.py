@@ -1,22 +1,152 @@
 """
-Flask API for the concord232 server. Provides endpoints for panel, zones, partitions, commands, version, equipment, and all_data.
+Flask API for the concord232 server. Provides endpoints for panel, zones, partitions, state, changes, commands, version, equipment, all_data, metrics, and admin controls.
+
+One server can host several panels: each is registered in PANELS under a
+panel ID and its endpoints are served under ``/panels/<id>/``.  The
+unprefixed endpoints address the default panel, CONTROLLER.
+
+Endpoints read a controller's published PanelState (current_state()),
+never the dicts the serial thread is updating.  JSON is sent compact and,
+when large enough, compressed as negotiated by Accept-Encoding; bodies
+rendered from a state snapshot are cached with it.
 """
 
 import json
 import logging
+import re
+import threading
 import time
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 import flask
 from flask import Response
 
-from concord232.concord import AlarmPanelInterface
+from concord232.concord import AlarmPanelInterface, set_wire_trace, wire_trace_enabled
+from concord232.log_control import LogControl
+from concord232.metrics import MetricsRegistry, render_merged
+from concord232.panel_state import PanelState, current_state
+from concord232.server.compress import COMPRESS_MIN_BYTES, choose_encoding, compress
+from concord232.server.state import BOOT_ID, StateSnapshot, build_snapshot, project
+from concord232.server.stream import (
+    KEEPALIVE_SECS,
+    MIN_KEEPALIVE_SECS,
+    ChangeFeed,
+    install_change_feed,
+)
 
-LOG = logging.getLogger("api")
+LOG = logging.getLogger("concord232.api")
 CONTROLLER: Optional[AlarmPanelInterface] = None
+PANELS: Dict[str, AlarmPanelInterface] = {}
+PANEL_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+LOG_CONTROL = LogControl()
+# ChangeFeed per controller (by id()), created on the first /stream request.
+_FEEDS: Dict[int, ChangeFeed] = {}
+_FEEDS_LOCK = threading.Lock()
+# Latest StateSnapshot per controller (by id()), rebuilt when its
+# state_version moves.
+_SNAPSHOTS: Dict[int, Tuple[Any, StateSnapshot]] = {}
+_SNAPSHOTS_LOCK = threading.Lock()
 app = flask.Flask("concord232")
 LOG.info("API Code Loaded")
 
+API_METRICS = MetricsRegistry()
+REQUEST_SECONDS = API_METRICS.histogram(
+    "api_request_seconds", "API request latency by route.", ("route", "status")
+)
+
+
+@app.before_request
+def _start_timer() -> None:
+    flask.g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _observe_latency(response: Response) -> Response:
+    started = getattr(flask.g, "request_started", None)
+    if started is not None:
+        rule = flask.request.url_rule
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            rule.rule if rule is not None else "unmatched",
+            str(response.status_code),
+        )
+    return response
+
+
+def register_panel(panel_id: str, controller: AlarmPanelInterface) -> None:
+    """
+    Serve *controller* under ``/panels/<panel_id>/``.  The first panel
+    registered also becomes the default panel (CONTROLLER).
+    Raises:
+        ValueError: *panel_id* is not made of letters, digits, ``-`` and ``_``
+            or is already registered.
+    """
+    global CONTROLLER
+    if not PANEL_ID_RE.match(panel_id):
+        raise ValueError("Invalid panel id %r" % panel_id)
+    if panel_id in PANELS:
+        raise ValueError("Panel %r is already registered" % panel_id)
+    PANELS[panel_id] = controller
+    if CONTROLLER is None:
+        CONTROLLER = controller
+
+
+def _lookup(panel_id: Optional[str]) -> Union[AlarmPanelInterface, Response]:
+    """
+    Controller for *panel_id*, or the default panel when None; an error
+    response if there is no such panel or it is not running.
+    """
+    if panel_id is None:
+        controller = CONTROLLER
+    elif panel_id in PANELS:
+        controller = PANELS[panel_id]
+    else:
+        return Response("Unknown panel %r" % panel_id, status=404)
+    if controller is None:
+        return Response("Controller not initialized", status=503)
+    return controller
+
+
+def _json_response(
+    render: Callable[[], Any],
+    snapshot: Optional[StateSnapshot] = None,
+    key: Any = None,
+) -> Response:
+    """
+    Compact JSON response of render(), compressed per the request's
+    Accept-Encoding if at least COMPRESS_MIN_BYTES long.
+    Args:
+        render (callable): Returns the JSON-serializable data.
+        snapshot (StateSnapshot, optional): With *key*, cache the encoded
+            bodies on this snapshot so repeat requests at the same state
+            version skip rendering and compression.
+        key: Cache key of this body within *snapshot* (route and query).
+    Returns:
+        flask.Response: The response.
+    """
+
+    def encoded(encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return json.dumps(render(), separators=(",", ":")).encode()
+        return compress(body(None), encoding)
+
+    def body(encoding: Optional[str]) -> bytes:
+        if snapshot is None or snapshot.version is None or key is None:
+            return encoded(encoding)
+        return snapshot.cached_body((key, encoding), lambda: encoded(encoding))
+
+    data = body(None)
+    encoding = None
+    if len(data) >= COMPRESS_MIN_BYTES:
+        encoding = choose_encoding(flask.request.headers.get("Accept-Encoding"))
+    response = Response(
+        data if encoding is None else body(encoding), mimetype="application/json"
+    )
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
 
 def show_zone(zone: dict[str, Any]) -> dict[str, Any]:
     """
@@ -40,133 +170,331 @@ def show_zone(zone: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-def show_partition(partition: dict[str, Any]) -> dict[str, Any]:
+def show_partition(partition: dict[str, Any], controller: Any = None) -> dict[str, Any]:
     """
     Convert a partition dictionary to a JSON-serializable dict for API response.
     Args:
         partition (dict): Partition data.
+        controller (AlarmPanelInterface or PanelState, optional): Panel
+            whose zones are counted (default: CONTROLLER).
     Returns:
         dict: JSON-serializable partition info.
     """
+    if controller is None:
+        controller = CONTROLLER
+    zones = 0
+    if controller is not None and hasattr(controller, "zones"):
+        zones = current_state(controller).zone_counts.get(
+            partition["partition_number"], 0
+        )
     return {
         "number": partition["partition_number"],
         "area": partition["area_number"],
         "arming_level": partition["arming_level"],
         "arming_level_code": partition["arming_level_code"],
         "partition_text": partition["partition_text"],
-        "zones": (
-            sum(
-                z["partition_number"] == partition["partition_number"]
-                for z in CONTROLLER.zones.values()
-            )
-            if CONTROLLER is not None and hasattr(CONTROLLER, "zones")
-            else 0
-        ),
+        "zones": zones,
     }
 
 
+@app.route("/panels")
+def index_panels() -> Any:
+    """
+    API endpoint to list the panels served by this process.
+    Returns:
+        flask.Response: JSON response with each panel's ID and table sizes.
+    """
+    return _json_response(
+        lambda: {
+            "panels": [
+                {
+                    "id": panel_id,
+                    "default": controller is CONTROLLER,
+                    "zones": len(state.zones),
+                    "partitions": len(state.partitions),
+                }
+                for panel_id, controller in list(PANELS.items())
+                for state in (current_state(controller),)
+            ]
+        }
+    )
+
+
 @app.route("/panel")
-def index_panel() -> Any:
+@app.route("/panels/<panel_id>/panel")
+def index_panel(panel_id: Optional[str] = None) -> Any:
     """
     API endpoint to get the panel state.
     Returns:
         flask.Response: JSON response with panel state.
     """
-    if CONTROLLER is None:
-        return Response("Controller not initialized", status=503)
+    controller = _lookup(panel_id)
+    if isinstance(controller, Response):
+        return controller
     try:
-        result = json.dumps({"panel": CONTROLLER.panel})
-        return Response(result, mimetype="application/json")
+        state = current_state(controller)
+        return _json_response(
+            lambda: {"panel": state.panel}, _snapshot_for(controller, state), "panel"
+        )
     except Exception:
         LOG.exception("Failed to index zones")
 
 
 @app.route("/zones")
-def index_zones() -> Any:
+@app.route("/panels/<panel_id>/zones")
+def index_zones(panel_id: Optional[str] = None) -> Any:
     """
     API endpoint to get all zones.
     Returns:
         flask.Response: JSON response with all zones.
     """
-    if CONTROLLER is None:
-        return Response("Controller not initialized", status=503)
+    controller = _lookup(panel_id)
+    if isinstance(controller, Response):
+        return controller
     try:
-        if not bool(CONTROLLER.zones):
-            CONTROLLER.request_zones()
+        state = current_state(controller)
+        if not state.zones:
+            controller.request_zones()
 
-        while not bool(CONTROLLER.zones):
+        while not state.zones:
             time.sleep(0.25)
+            state = current_state(controller)
 
-        result = json.dumps(
-            {"zones": [show_zone(zone) for zone in CONTROLLER.zones.values()]}
+        return _json_response(
+            lambda: {"zones": [show_zone(zone) for zone in state.zones.values()]},
+            _snapshot_for(controller, state),
+            "zones",
         )
-        return Response(result, mimetype="application/json")
     except Exception:
         LOG.exception("Failed to index zones")
 
 
 @app.route("/partitions")
-def index_partitions() -> Any:
+@app.route("/panels/<panel_id>/partitions")
+def index_partitions(panel_id: Optional[str] = None) -> Any:
     """
     API endpoint to get all partitions.
     Returns:
         flask.Response: JSON response with all partitions.
     """
-    if CONTROLLER is None:
-        return Response("Controller not initialized", status=503)
+    controller = _lookup(panel_id)
+    if isinstance(controller, Response):
+        return controller
     try:
-        if not bool(CONTROLLER.partitions):
-            CONTROLLER.request_partitions()
+        state = current_state(controller)
+        if not state.partitions:
+            controller.request_partitions()
 
-        while not bool(CONTROLLER.partitions):
+        while not state.partitions:
             time.sleep(0.25)
+            state = current_state(controller)
 
-        result = json.dumps(
-            {
+        return _json_response(
+            lambda: {
                 "partitions": [
-                    show_partition(partition)
-                    for partition in CONTROLLER.partitions.values()
+                    show_partition(partition, state)
+                    for partition in state.partitions.values()
                 ]
-            }
+            },
+            _snapshot_for(controller, state),
+            "partitions",
         )
-        return Response(result, mimetype="application/json")
     except Exception:
         LOG.exception("Failed to index partitions")
 
 
+def _snapshot_for(controller: Any, state: Optional[PanelState] = None) -> StateSnapshot:
+    """
+    The StateSnapshot of *controller*'s *state* (default: its current
+    state); reused while the state version is unchanged (controllers
+    without one are snapshotted on every call).
+    """
+    with _SNAPSHOTS_LOCK:
+        cached = _SNAPSHOTS.get(id(controller))
+    if state is None:
+        state = current_state(controller)
+    if (
+        cached is not None
+        and cached[0] is controller
+        and state.version is not None
+        and cached[1].version == state.version
+    ):
+        return cached[1]
+    snapshot = build_snapshot(state, show_zone, show_partition)
+    if snapshot.version is not None:
+        with _SNAPSHOTS_LOCK:
+            _SNAPSHOTS[id(controller)] = (controller, snapshot)
+    return snapshot
+
+
+@app.route("/state")
+@app.route("/panels/<panel_id>/state")
+def index_state(panel_id: Optional[str] = None) -> Any:
+    """
+    API endpoint returning panel, partitions, zones and troubles from one
+    snapshot.  Optional filters: ``?partition=N`` (that partition and its
+    zones), ``?state=Faulted`` (zones in any of the comma-separated
+    states), ``?name=Front`` (zone name prefix, any case).  ``?fields=``
+    keeps only the listed sections or ``section.key`` fields, e.g.
+    ``fields=panel,zones.number,zones.state``.
+    Returns:
+        flask.Response: JSON response with the (filtered) state.
+    """
+    controller = _lookup(panel_id)
+    if isinstance(controller, Response):
+        return controller
+    args = flask.request.args
+    partition = args.get("partition")
+    try:
+        partition_number = int(partition) if partition is not None else None
+    except ValueError:
+        return Response("partition must be a number", status=400)
+    states = [s for s in args.get("state", "").split(",") if s]
+    fields = [f for f in args.get("fields", "").split(",") if f]
+    snapshot = _snapshot_for(controller)
+    state = snapshot.select(partition_number, states, args.get("name"))
+    if fields:
+        try:
+            state = project(state, fields)
+        except ValueError as ex:
+            return Response(str(ex), status=400)
+    return _json_response(
+        lambda: state,
+        snapshot,
+        ("state", partition_number, tuple(states), args.get("name"), tuple(fields)),
+    )
+
+
+@app.route("/zones/<int:partition>/<int:zone>")
+@app.route("/panels/<panel_id>/zones/<int:partition>/<int:zone>")
+def get_zone(partition: int, zone: int, panel_id: Optional[str] = None) -> Any:
+    """
+    API endpoint to get one zone by partition and zone number.
+    Returns:
+        flask.Response: JSON response with the zone, or 404.
+    """
+    controller = _lookup(panel_id)
+    if isinstance(controller, Response):
+        return controller
+    found = _snapshot_for(controller).zone_index.get((partition, zone))
+    if found is None:
+        return Response("Unknown zone %d/%d" % (partition, zone), status=404)
+    return _json_response(lambda: {"zone": found})
+
+
+@app.route("/partitions/<int:number>")
+@app.route("/panels/<panel_id>/partitions/<int:number>")
+def get_partition(number: int, panel_id: Optional[str] = None) -> Any:
+    """
+    API endpoint to get one partition by number.
+    Returns:
+        flask.Response: JSON response with the partition, or 404.
+    """
+    controller = _lookup(panel_id)
+    if isinstance(controller, Response):
+        return controller
+    found = _snapshot_for(controller).partition_index.get(number)
+    if found is None:
+        return Response("Unknown partition %d" % number, status=404)
+    return _json_response(lambda: {"partition": found})
+
+
+@app.route("/changes")
+@app.route("/panels/<panel_id>/changes")
+def get_changes(panel_id: Optional[str] = None) -> Any:
+    """
+    API endpoint for incremental sync: ``?since=<state_version>&epoch=<epoch>``
+    returns only the partitions and zones (and the panel) changed after
+    that version.  Pass the returned state_version and epoch back as the
+    next ``since`` and ``epoch``; ``reset`` is true when everything was
+    returned because they are from before a server restart.
+    Returns:
+        flask.Response: JSON response with the changes.
+    """
+    controller = _lookup(panel_id)
+    if isinstance(controller, Response):
+        return controller
+    try:
+        since = int(flask.request.args.get("since", 0))
+    except ValueError:
+        return Response("since must be a number", status=400)
+    epoch = flask.request.args.get("epoch")
+    # Every stale cursor gets the same full reply.
+    key = ("changes", "reset" if epoch not in (None, BOOT_ID) else since)
+    snapshot = _snapshot_for(controller)
+    return _json_response(lambda: snapshot.changes(since, epoch), snapshot, key)
+
+
 @app.route("/command")
-def command() -> Any:
+@app.route("/panels/<panel_id>/command")
+def command(panel_id: Optional[str] = None) -> Any:
     """
     API endpoint to send commands (arm, disarm, keys) to the panel.
     Returns:
         flask.Response: Empty response.
     """
-    if CONTROLLER is None:
-        return Response("Controller not initialized", status=503)
+    controller = _lookup(panel_id)
+    if isinstance(controller, Response):
+        return controller
     args = flask.request.args
     partition = int(args.get("partition", 1))
     if args.get("cmd") == "arm":
         option = args.get("option")
         if args.get("level") == "stay":
-            CONTROLLER.arm_stay(option, partition=partition)
+            controller.arm_stay(option, partition=partition)
         elif args.get("level") == "away":
-            CONTROLLER.arm_away(option, partition=partition)
+            controller.arm_away(option, partition=partition)
     elif args.get("cmd") == "disarm":
         master_pin = args.get("master_pin")
         if master_pin is not None:
-            CONTROLLER.disarm(str(master_pin), partition=partition)
+            controller.disarm(str(master_pin), partition=partition)
         else:
             return Response("Missing master_pin", status=400)
     elif args.get("cmd") == "keys":
         keys = args.get("keys")
         group = args.get("group")
         keys_list = list(keys) if keys is not None else []
-        CONTROLLER.send_keys(
+        controller.send_keys(
             keys_list, bool(group) if group is not None else False, partition=partition
         )
     return Response()
 
 
+def _feed_for(controller: Any) -> ChangeFeed:
+    with _FEEDS_LOCK:
+        feed = _FEEDS.get(id(controller))
+        if feed is None:
+            feed = install_change_feed(controller, show_zone, show_partition)
+            _FEEDS[id(controller)] = feed
+        return feed
+
+
+@app.route("/stream")
+@app.route("/panels/<panel_id>/stream")
+def stream(panel_id: Optional[str] = None) -> Any:
+    """
+    API endpoint streaming state changes as Server-Sent Events: a snapshot
+    of panel, zones and partitions, then zone / partition / panel deltas
+    and periodic link health (see concord232/server/stream.py).
+    ``?keepalive=N`` sets the link health / keepalive interval in seconds.
+    Returns:
+        flask.Response: ``text/event-stream`` response.
+    """
+    controller = _lookup(panel_id)
+    if isinstance(controller, Response):
+        return controller
+    try:
+        keepalive = float(flask.request.args.get("keepalive", KEEPALIVE_SECS))
+    except ValueError:
+        return Response("keepalive must be a number", status=400)
+    keepalive = min(max(keepalive, MIN_KEEPALIVE_SECS), KEEPALIVE_SECS)
+    return Response(
+        _feed_for(controller).events(keepalive),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/version")
 def get_version() -> Any:
     """
@@ -174,30 +502,109 @@ def get_version() -> Any:
     Returns:
         flask.Response: JSON response with version info.
     """
-    return flask.Response(json.dumps({"version": "1.1"}), mimetype="application/json")
+    return _json_response(lambda: {"version": "1.1"})
 
 
 @app.route("/equipment")
-def get_equipment() -> Any:
+@app.route("/panels/<panel_id>/equipment")
+def get_equipment(panel_id: Optional[str] = None) -> Any:
     """
     API endpoint to request all equipment data from the panel.
     Returns:
         flask.Response: Empty response.
     """
-    if CONTROLLER is None:
-        return Response("Controller not initialized", status=503)
-    CONTROLLER.request_all_equipment()
+    controller = _lookup(panel_id)
+    if isinstance(controller, Response):
+        return controller
+    controller.request_all_equipment()
     return Response()
 
 
 @app.route("/all_data")
-def get_all_data() -> Any:
+@app.route("/panels/<panel_id>/all_data")
+def get_all_data(panel_id: Optional[str] = None) -> Any:
     """
     API endpoint to request a dynamic data refresh from the panel.
     Returns:
         flask.Response: Empty response.
     """
-    if CONTROLLER is None:
-        return Response("Controller not initialized", status=503)
-    CONTROLLER.request_dynamic_data_refresh()
+    controller = _lookup(panel_id)
+    if isinstance(controller, Response):
+        return controller
+    controller.request_dynamic_data_refresh()
     return Response()
+
+
+@app.route("/metrics")
+def get_metrics() -> Any:
+    """
+    API endpoint exposing link, pipeline and API metrics in Prometheus text format.
+    With more than one panel, panel metrics carry a ``panel`` label; panels
+    run by the supervisor in worker processes are not included.
+    Returns:
+        flask.Response: Prometheus exposition text.
+    """
+    body = API_METRICS.render()
+    if len(PANELS) > 1:
+        body = (
+            render_merged(
+                [
+                    ({"panel": panel_id}, controller.metrics.registry)
+                    for panel_id, controller in list(PANELS.items())
+                    if hasattr(controller, "metrics")
+                ]
+            )
+            + body
+        )
+    elif CONTROLLER is not None and hasattr(CONTROLLER, "metrics"):
+        body = CONTROLLER.metrics.registry.render() + body
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/admin/wire_trace")
+def admin_wire_trace() -> Any:
+    """
+    API endpoint to get or toggle per-frame wire hex dumps (``concord232.wire``
+    logger).  ``?enable=1`` turns tracing on, ``?enable=0`` turns it off.
+    Returns:
+        flask.Response: JSON response with the current state.
+    """
+    enable = flask.request.args.get("enable")
+    if enable is not None:
+        if enable.lower() not in ("0", "1", "true", "false", "on", "off"):
+            return Response("enable must be 0 or 1", status=400)
+        set_wire_trace(enable.lower() in ("1", "true", "on"))
+        LOG.info("Wire trace %s", "enabled" if wire_trace_enabled() else "disabled")
+    return _json_response(lambda: {"wire_trace": wire_trace_enabled()})
+
+
+@app.route("/admin/logging")
+def admin_logging() -> Any:
+    """
+    API endpoint to get or change per-subsystem log levels at runtime.
+    ``?subsystem=serial&level=DEBUG`` sets a level; add ``&minutes=N`` to
+    revert to the previous level automatically after N minutes.
+    Returns:
+        flask.Response: JSON response with every subsystem's level.
+    """
+    args = flask.request.args
+    subsystem = args.get("subsystem")
+    level = args.get("level")
+    if subsystem is not None or level is not None:
+        if not subsystem or not level:
+            return Response("subsystem and level are both required", status=400)
+        minutes = args.get("minutes")
+        try:
+            duration = float(minutes) * 60 if minutes is not None else None
+            LOG_CONTROL.set_level(subsystem, level, duration)
+        except KeyError:
+            return Response("Unknown subsystem %r" % subsystem, status=400)
+        except ValueError as ex:
+            return Response(str(ex), status=400)
+        LOG.warning(
+            "Log level for %s set to %s%s",
+            subsystem,
+            level.upper(),
+            " for %s minute(s)" % minutes if minutes is not None else "",
+        )
+    return _json_response(lambda: {"logging": LOG_CONTROL.levels()})
@@ -0,0 +1,74 @@
+"""
+Content-Encoding negotiation for API responses.
+
+JSON bodies of at least COMPRESS_MIN_BYTES are compressed with the best
+encoding the client accepts: brotli (``br``, when the optional ``brotli``
+package is installed), gzip or deflate.  Smaller bodies are sent as is;
+compressing them costs more than it saves.
+"""
+
+from __future__ import annotations
+
+import gzip
+import zlib
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # type: ignore[assignment]
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Encodings this server can produce, most preferred first."""
+    if brotli is not None:
+        return ("br", "gzip", "deflate")
+    return ("gzip", "deflate")
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick a content coding for an ``Accept-Encoding`` header value.
+    Args:
+        accept_encoding (str): Header value, e.g. ``"gzip;q=0.8, br"``.
+    Returns:
+        str: ``"br"``, ``"gzip"`` or ``"deflate"``; None for identity.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    *body* in content coding *encoding* (as returned by choose_encoding).
+    Raises:
+        ValueError: Unsupported encoding.
+    """
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == "deflate":
+        return zlib.compress(body, GZIP_LEVEL)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    raise ValueError("Unsupported content encoding %r" % encoding)
@@ -0,0 +1,280 @@
+"""
+Whole-panel state for the ``/state``, ``/zones/<p>/<z>``, ``/partitions/<n>``
+and ``/changes`` endpoints.
+
+A StateSnapshot holds one controller's panel, partitions, zones and
+trouble summary as of one state version, together with the indexes those
+endpoints are answered from: zones and partitions by number, zones by
+partition, zones by state, zone names sorted for prefix search, and
+entities ordered by the state version they last changed at.  Snapshots
+are built once per state version and shared by every request until the
+panel changes, along with the encoded (and compressed) response bodies
+rendered from them.
+
+State versions restart from zero with the server, so ``/changes`` replies
+carry BOOT_ID, which identifies this server process; a client sending
+back a different one gets everything again.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import uuid
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from concord232.panel_state import current_state
+
+SECTIONS = ("panel", "partitions", "zones", "troubles")
+TROUBLE_KEYS = ("trouble", "trouble_count", "trouble_detail", "trouble_buses")
+# Response bodies kept per snapshot; the oldest is dropped beyond this.
+MAX_CACHED_BODIES = 64
+# Changes with every server start; state versions are only comparable
+# within one boot.
+BOOT_ID = uuid.uuid4().hex[:16]
+
+
+def zone_states(zone: Dict[str, Any]) -> List[str]:
+    """State names of an API zone dict (``state`` may be a list or a string)."""
+    state = zone.get("state")
+    if isinstance(state, (list, tuple)):
+        return [str(s) for s in state] or ["Normal"]
+    return [str(state or "Normal")]
+
+
+def _by_version(
+    keys: Sequence[Any], versions: Dict[Any, int]
+) -> Tuple[List[int], List[int]]:
+    """(sorted change versions, matching indexes into *keys*)."""
+    order = sorted(range(len(keys)), key=lambda i: versions.get(keys[i], 0))
+    return [versions.get(keys[i], 0) for i in order], order
+
+
+class StateSnapshot(object):
+    """One consistent view of a panel, indexed for /state queries."""
+
+    def __init__(
+        self,
+        version: Optional[int],
+        panel: Dict[str, Any],
+        partitions: Iterable[Dict[str, Any]],
+        zones: Iterable[Dict[str, Any]],
+        panel_version: Optional[int] = None,
+        partition_versions: Optional[Dict[int, int]] = None,
+        zone_versions: Optional[Dict[Tuple[int, int], int]] = None,
+    ) -> None:
+        """
+        Args:
+            version (int): Controller state version the data was read at.
+            panel (dict): The /panel dict.
+            partitions (list): /partitions entries.
+            zones (list): /zones entries.
+            panel_version (int, optional): State version of the last panel
+                change.
+            partition_versions (dict, optional): State version of each
+                partition's last change, by number.
+            zone_versions (dict, optional): State version of each zone's
+                last change, by (partition, zone) number.  Without version
+                maps every entity counts as changed at *version*.
+        """
+        self.version = version
+        self._bodies: Dict[Any, bytes] = {}
+        self._bodies_lock = threading.Lock()
+        self.panel = panel
+        self.troubles = {key: panel[key] for key in TROUBLE_KEYS if key in panel}
+        self.partitions = sorted(partitions, key=lambda p: p["number"])
+        self.zones = sorted(zones, key=lambda z: (z["partition"], z["number"]))
+        self.zones_by_partition: Dict[Any, List[int]] = {}
+        self.zones_by_state: Dict[str, List[int]] = {}
+        names = []
+        for i, zone in enumerate(self.zones):
+            self.zones_by_partition.setdefault(zone["partition"], []).append(i)
+            for state in zone_states(zone):
+                self.zones_by_state.setdefault(state.lower(), []).append(i)
+            names.append((str(zone["name"] or "").lower(), i))
+        names.sort()
+        self._names = [name for name, _ in names]
+        self._name_indexes = [i for _, i in names]
+        zone_keys = [(z["partition"], z["number"]) for z in self.zones]
+        partition_keys = [p["number"] for p in self.partitions]
+        self.zone_index = dict(zip(zone_keys, self.zones))
+        self.partition_index = dict(zip(partition_keys, self.partitions))
+        current = version or 0
+        self.panel_version = current if panel_version is None else panel_version
+        self._zone_changes = _by_version(
+            zone_keys,
+            (
+                dict.fromkeys(zone_keys, current)
+                if zone_versions is None
+                else zone_versions
+            ),
+        )
+        self._partition_changes = _by_version(
+            partition_keys,
+            (
+                dict.fromkeys(partition_keys, current)
+                if partition_versions is None
+                else partition_versions
+            ),
+        )
+
+    def cached_body(self, key: Any, render: Callable[[], bytes]) -> bytes:
+        """
+        Response body *key* (e.g. route and content encoding) of this
+        snapshot: render() is called once and the result reused.
+        """
+        with self._bodies_lock:
+            body = self._bodies.get(key)
+        if body is None:
+            body = render()
+            with self._bodies_lock:
+                if len(self._bodies) >= MAX_CACHED_BODIES:
+                    del self._bodies[next(iter(self._bodies))]
+                self._bodies[key] = body
+        return body
+
+    def zones_with_name_prefix(self, prefix: str) -> List[int]:
+        """Indexes into zones of zones whose name starts with *prefix* (any case)."""
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._names, prefix)
+        end = start
+        while end < len(self._names) and self._names[end].startswith(prefix):
+            end += 1
+        return self._name_indexes[start:end]
+
+    def select(
+        self,
+        partition: Optional[int] = None,
+        states: Optional[Sequence[str]] = None,
+        name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        The snapshot restricted by the /state filters.
+        Args:
+            partition (int, optional): Only this partition and its zones.
+            states (list, optional): Only zones in any of these states.
+            name (str, optional): Only zones whose name starts with this.
+        Returns:
+            dict: state_version, panel, partitions, zones and troubles.
+        """
+        partitions = self.partitions
+        matches: Optional[Set[int]] = None
+        if partition is not None:
+            partitions = [p for p in partitions if p["number"] == partition]
+            matches = set(self.zones_by_partition.get(partition, ()))
+        if states:
+            found: Set[int] = set()
+            for state in states:
+                found.update(self.zones_by_state.get(state.lower(), ()))
+            matches = found if matches is None else matches & found
+        if name:
+            found = set(self.zones_with_name_prefix(name))
+            matches = found if matches is None else matches & found
+        if matches is None:
+            zones = self.zones
+        else:
+            zones = [self.zones[i] for i in sorted(matches)]
+        return {
+            "state_version": self.version,
+            "panel": self.panel,
+            "partitions": partitions,
+            "zones": zones,
+            "troubles": self.troubles,
+        }
+
+    def changes(self, since: int, epoch: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Entities changed after state version *since*.  When *since* is
+        from another server boot (*epoch* is not BOOT_ID, or *since* is
+        newer than this snapshot) everything is returned with ``reset``
+        set.
+        Args:
+            since (int): state_version of the client's last reply.
+            epoch (str, optional): epoch of the client's last reply.
+        Returns:
+            dict: epoch, state_version, reset, partitions and zones changed
+            after *since*, and panel if it changed.
+        """
+        reset = (
+            self.version is None
+            or since > self.version
+            or (epoch is not None and epoch != BOOT_ID)
+        )
+        if reset:
+            since = -1
+        result: Dict[str, Any] = {
+            "epoch": BOOT_ID,
+            "state_version": self.version,
+            "reset": reset,
+        }
+        if self.panel_version > since:
+            result["panel"] = self.panel
+        for name, entities, (versions, order) in (
+            ("partitions", self.partitions, self._partition_changes),
+            ("zones", self.zones, self._zone_changes),
+        ):
+            changed = order[bisect.bisect_right(versions, since) :]
+            result[name] = [entities[i] for i in sorted(changed)]
+        return result
+
+
+def project(state: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """
+    Keep only *fields* of a select() result: a section name (``zones``)
+    keeps the whole section, ``section.key`` (``zones.name``) keeps that
+    key of every entry.  state_version is always kept.
+    Raises:
+        ValueError: A field names an unknown section.
+    """
+    wanted: Dict[str, Optional[List[str]]] = {}
+    for field in fields:
+        section, _, key = field.partition(".")
+        if section not in SECTIONS:
+            raise ValueError("Unknown field %r" % field)
+        if not key:
+            wanted[section] = None
+            continue
+        keys = wanted.setdefault(section, [])
+        if keys is not None:
+            keys.append(key)
+    result: Dict[str, Any] = {"state_version": state["state_version"]}
+    for section, keys in wanted.items():
+        value = state[section]
+        if keys is None:
+            result[section] = value
+        elif isinstance(value, list):
+            result[section] = [{k: e[k] for k in keys if k in e} for e in value]
+        else:
+            result[section] = {k: value[k] for k in keys if k in value}
+    return result
+
+
+def build_snapshot(
+    controller: Any,
+    show_zone: Callable[[dict], dict],
+    show_partition: Callable[[dict, Any], dict],
+) -> StateSnapshot:
+    """
+    Snapshot *controller*'s published PanelState (or a PanelState) in the
+    API's zone and partition shapes.
+    """
+    state = current_state(controller)
+    return StateSnapshot(
+        state.version,
+        state.panel,
+        [show_partition(p, state) for p in state.partitions.values()],
+        [show_zone(z) for z in state.zones.values()],
+        state.panel_version,
+        state.partition_versions,
+        state.zone_versions,
+    )
@@ -0,0 +1,191 @@
+"""
+Server push of panel state changes for ``/stream`` (Server-Sent Events).
+
+A ChangeFeed is attached to a controller once and fans every zone,
+partition and trouble change out to the subscribed stream connections.
+Each subscriber has a bounded queue; one that falls behind is dropped to a
+fresh snapshot instead of blocking the serial thread.
+
+Event stream (each event has an increasing ``id``)::
+
+    event: snapshot   data: {"panel": {...}, "zones": [...], "partitions": [...]}
+    event: zone       data: one /zones entry
+    event: partition  data: one /partitions entry
+    event: panel      data: the /panel dict
+    event: link       data: serial link health (AlarmPanelInterface.link_health)
+
+A snapshot is sent first, and again after every equipment list (zone and
+partition tables may have changed wholesale).  Link health follows the
+snapshot and is repeated every keepalive interval; for controllers without
+it, comment lines keep idle connections alive.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from concord232.panel_state import current_state
+
+KEEPALIVE_SECS = 15.0
+MIN_KEEPALIVE_SECS = 1.0
+SUBSCRIBER_QUEUE_SIZE = 1000
+# Supervisor panels have no message handlers; their shared-memory state
+# version is polled instead.
+REMOTE_POLL_SECS = 0.25
+
+Event = Tuple[str, Any]
+
+
+class ChangeFeed(object):
+    """Fan-out of (event, data) changes for one controller."""
+
+    def __init__(
+        self,
+        snapshot: Callable[[], Dict[str, Any]],
+        queue_size: int = SUBSCRIBER_QUEUE_SIZE,
+        link: Optional[Callable[[], Dict[str, Any]]] = None,
+    ) -> None:
+        self.snapshot = snapshot
+        self.link = link
+        self.queue_size = queue_size
+        self._subscribers: List["queue.Queue[Optional[Event]]"] = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self) -> "queue.Queue[Optional[Event]]":
+        q: "queue.Queue[Optional[Event]]" = queue.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q: "queue.Queue[Optional[Event]]") -> None:
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: str, data: Any) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                # Lagging subscriber: flush it and let it resync.
+                try:
+                    while True:
+                        q.get_nowait()
+                except queue.Empty:
+                    pass
+                q.put_nowait(None)
+
+    def events(self, keepalive: float = KEEPALIVE_SECS) -> Iterator[str]:
+        """
+        Yield SSE-formatted text for one connection: a snapshot, then
+        changes as they are published, until the consumer goes away.
+        """
+        q = self.subscribe()
+        try:
+            yield _format("snapshot", self.snapshot(), next(self._ids))
+            # Link health goes out right after the snapshot and then every
+            # keepalive interval; without it, a comment every interval.
+            next_tick = time.monotonic() + (0 if self.link else keepalive)
+            while True:
+                now = time.monotonic()
+                if now >= next_tick:
+                    next_tick = now + keepalive
+                    if self.link is not None:
+                        yield _format("link", self.link(), next(self._ids))
+                    else:
+                        yield ": keepalive\n\n"
+                try:
+                    item = q.get(timeout=max(0.0, next_tick - time.monotonic()))
+                except queue.Empty:
+                    continue
+                if item is None:
+                    item = ("snapshot", self.snapshot())
+                yield _format(item[0], item[1], next(self._ids))
+        finally:
+            self.unsubscribe(q)
+
+
+def _format(event: str, data: Any, event_id: int) -> str:
+    return "id: %d\nevent: %s\ndata: %s\n\n" % (
+        event_id,
+        event,
+        json.dumps(data, separators=(",", ":")),
+    )
+
+
+def install_change_feed(
+    controller: Any,
+    show_zone: Callable[[dict], dict],
+    show_partition: Callable[[dict, Any], dict],
+) -> ChangeFeed:
+    """
+    Create a ChangeFeed publishing *controller*'s changes in the API's
+    zone and partition shapes (*show_zone*, *show_partition*).
+    """
+
+    def snapshot() -> Dict[str, Any]:
+        state = current_state(controller)
+        return {
+            "panel": state.panel,
+            "zones": [show_zone(z) for z in state.zones.values()],
+            "partitions": [show_partition(p, state) for p in state.partitions.values()],
+        }
+
+    feed = ChangeFeed(snapshot, link=getattr(controller, "link_health", None))
+
+    if not hasattr(controller, "register_message_handler"):
+        _poll_remote(controller, feed)
+        return feed
+
+    def zone(decoded: dict) -> None:
+        key = "p%sz%s" % (decoded["partition_number"], decoded["zone_number"])
+        if feed.subscriber_count and key in controller.zones:
+            feed.publish("zone", show_zone(controller.zones[key]))
+
+    def partition(decoded: dict) -> None:
+        number = decoded["partition_number"]
+        if feed.subscriber_count and number in controller.partitions:
+            feed.publish(
+                "partition", show_partition(controller.partitions[number], controller)
+            )
+
+    def resync(decoded: dict) -> None:
+        if feed.subscriber_count:
+            feed.publish("snapshot", snapshot())
+
+    def trouble(state: dict) -> None:
+        if feed.subscriber_count:
+            feed.publish("panel", dict(controller.panel))
+
+    for command_id in ("ZONE_STATUS", "ZONE_DATA"):
+        controller.register_message_handler(command_id, zone)
+    for command_id in ("ARM_LEVEL", "PART_DATA"):
+        controller.register_message_handler(command_id, partition)
+    controller.register_message_handler("EQPT_LIST_DONE", resync)
+    controller.register_trouble_handler(trouble)
+    return feed
+
+
+def _poll_remote(controller: Any, feed: ChangeFeed) -> None:
+    def poll() -> None:
+        version = controller.reader.version
+        while True:
+            time.sleep(REMOTE_POLL_SECS)
+            current = controller.reader.version
+            if current != version and feed.subscriber_count:
+                feed.publish("snapshot", feed.snapshot())
+            version = current
+
+    threading.Thread(target=poll, daemon=True, name="stream-poll").start()
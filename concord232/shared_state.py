@@ -0,0 +1,330 @@
+"""
+Panel state in a shared-memory segment, for the process-per-panel
+supervisor (see concord232/supervisor.py).
+
+A worker process owns the panel's serial loop and copies zone, partition
+and panel (trouble) state into fixed-layout records with
+SharedStateWriter; the API process reads them with SharedStateReader
+without any IPC round trip.
+
+Each record is guarded by a seqlock: the writer makes the record's
+sequence number odd, writes the body and makes it even again; a reader
+copies the body and retries if the sequence was odd or changed while it
+was reading.  There is one writer per segment (the worker's serial
+thread), so writers never contend.
+
+Layout (little endian)::
+
+    magic "C232", layout version, max zones, max partitions     (fixed)
+    header record:    zone count, partition count, state version
+    zone records:     max zones x ZONE_FORMAT
+    partition records: max partitions x PARTITION_FORMAT
+    panel record:     JSON blob (trouble summary)
+
+Text longer than its field is truncated.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+MAGIC = b"C232"
+LAYOUT_VERSION = 1
+DEFAULT_MAX_ZONES = 96
+DEFAULT_MAX_PARTITIONS = 6
+
+_FIXED_FORMAT = "<4sHHH"
+_SEQ_FORMAT = "<I"
+_HEADER_FORMAT = "<HHI"
+# partition, area, group (-1 = none), zone, state, type, text
+ZONE_FORMAT = "<BBhH32s32s48s"
+# partition, area, arming level code, arming level, user, text
+PARTITION_FORMAT = "<BBB32s32s48s"
+PANEL_BLOB_SIZE = 1024
+_PANEL_FORMAT = "<H%ds" % PANEL_BLOB_SIZE
+
+_READ_RETRIES = 10000
+
+
+def _record_size(fmt: str) -> int:
+    return struct.calcsize(_SEQ_FORMAT) + struct.calcsize(fmt)
+
+
+def _text(value: Any, size: int) -> bytes:
+    data = str(value if value is not None else "").encode("utf-8")[:size]
+    # Do not cut a multi-byte character in half.
+    return data.decode("utf-8", "ignore").encode("utf-8")
+
+
+def _untext(data: bytes) -> str:
+    return data.rstrip(b"\0").decode("utf-8", "ignore")
+
+
+def segment_size(
+    max_zones: int = DEFAULT_MAX_ZONES, max_partitions: int = DEFAULT_MAX_PARTITIONS
+) -> int:
+    return (
+        struct.calcsize(_FIXED_FORMAT)
+        + _record_size(_HEADER_FORMAT)
+        + max_zones * _record_size(ZONE_FORMAT)
+        + max_partitions * _record_size(PARTITION_FORMAT)
+        + _record_size(_PANEL_FORMAT)
+    )
+
+
+class SegmentFull(Exception):
+    pass
+
+
+class _Segment(object):
+    def __init__(self, shm: shared_memory.SharedMemory) -> None:
+        self.shm = shm
+        self.buf = shm.buf
+        magic, version, self.max_zones, self.max_partitions = struct.unpack_from(
+            _FIXED_FORMAT, self.buf, 0
+        )
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            raise ValueError("%s is not a concord232 state segment" % shm.name)
+        self._header_at = struct.calcsize(_FIXED_FORMAT)
+        self._zones_at = self._header_at + _record_size(_HEADER_FORMAT)
+        self._partitions_at = self._zones_at + self.max_zones * _record_size(
+            ZONE_FORMAT
+        )
+        self._panel_at = self._partitions_at + self.max_partitions * _record_size(
+            PARTITION_FORMAT
+        )
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def _zone_at(self, slot: int) -> int:
+        return self._zones_at + slot * _record_size(ZONE_FORMAT)
+
+    def _partition_at(self, slot: int) -> int:
+        return self._partitions_at + slot * _record_size(PARTITION_FORMAT)
+
+    def _read(self, offset: int, fmt: str) -> Tuple[Any, ...]:
+        body_at = offset + struct.calcsize(_SEQ_FORMAT)
+        for _ in range(_READ_RETRIES):
+            (before,) = struct.unpack_from(_SEQ_FORMAT, self.buf, offset)
+            if before & 1:
+                time.sleep(0)
+                continue
+            values = struct.unpack_from(fmt, self.buf, body_at)
+            (after,) = struct.unpack_from(_SEQ_FORMAT, self.buf, offset)
+            if before == after:
+                return values
+        raise RuntimeError("Shared state record at %d kept changing" % offset)
+
+    def _write(self, offset: int, fmt: str, values: Tuple[Any, ...]) -> None:
+        (seq,) = struct.unpack_from(_SEQ_FORMAT, self.buf, offset)
+        struct.pack_into(_SEQ_FORMAT, self.buf, offset, (seq + 1) & 0xFFFFFFFF)
+        struct.pack_into(fmt, self.buf, offset + struct.calcsize(_SEQ_FORMAT), *values)
+        struct.pack_into(_SEQ_FORMAT, self.buf, offset, (seq + 2) & 0xFFFFFFFF)
+
+    def header(self) -> Tuple[int, int, int]:
+        """(zone count, partition count, state version)."""
+        return self._read(self._header_at, _HEADER_FORMAT)  # type: ignore[return-value]
+
+    def close(self) -> None:
+        self.buf = None  # type: ignore[assignment]
+        self.shm.close()
+
+
+def create_segment(
+    name: Optional[str] = None,
+    max_zones: int = DEFAULT_MAX_ZONES,
+    max_partitions: int = DEFAULT_MAX_PARTITIONS,
+) -> shared_memory.SharedMemory:
+    """Create and initialize an empty state segment; the caller unlinks it."""
+    shm = shared_memory.SharedMemory(
+        name=name, create=True, size=segment_size(max_zones, max_partitions)
+    )
+    shm.buf[:] = bytes(shm.size)
+    struct.pack_into(
+        _FIXED_FORMAT, shm.buf, 0, MAGIC, LAYOUT_VERSION, max_zones, max_partitions
+    )
+    return shm
+
+
+def attach_segment(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to an existing segment without taking ownership: before Python
+    3.13 the resource tracker would otherwise unlink it when this process
+    exits, even though the creator still uses it.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+    except Exception:
+        pass
+    return shm
+
+
+class SharedStateWriter(_Segment):
+    """
+    Copies an AlarmPanelInterface's tables into the segment.  Records are
+    only rewritten when their contents change; every change bumps the state
+    version in the header.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory) -> None:
+        super().__init__(shm)
+        zone_count, partition_count, self.version = self.header()
+        # Rebuild the slot maps so a restarted worker reuses its records.
+        self._zone_slots: Dict[str, int] = {}
+        self._zone_values: List[Tuple[Any, ...]] = []
+        for slot in range(zone_count):
+            values = self._read(self._zone_at(slot), ZONE_FORMAT)
+            self._zone_slots["p%sz%s" % (values[0], values[3])] = slot
+            self._zone_values.append(values)
+        self._partition_slots: Dict[int, int] = {}
+        self._partition_values: List[Tuple[Any, ...]] = []
+        for slot in range(partition_count):
+            values = self._read(self._partition_at(slot), PARTITION_FORMAT)
+            self._partition_slots[values[0]] = slot
+            self._partition_values.append(values)
+        self._panel_blob = b""
+
+    def _bump(self) -> None:
+        self.version = (self.version + 1) & 0xFFFFFFFF
+        self._write(
+            self._header_at,
+            _HEADER_FORMAT,
+            (len(self._zone_slots), len(self._partition_slots), self.version),
+        )
+
+    def write_zone(self, zone: Dict[str, Any]) -> bool:
+        """
+        Store one zone (an AlarmPanelInterface.zones value).
+        Returns:
+            bool: True if the record changed.
+        Raises:
+            SegmentFull: All zone records are in use.
+        """
+        group = zone.get("group_number")
+        values = (
+            zone["partition_number"],
+            zone.get("area_number") or 0,
+            group if isinstance(group, int) else -1,
+            zone["zone_number"],
+            _text(",".join(zone.get("zone_state") or []), 32),
+            _text(zone.get("zone_type"), 32),
+            _text(zone.get("zone_text"), 48),
+        )
+        key = "p%sz%s" % (zone["partition_number"], zone["zone_number"])
+        slot = self._zone_slots.get(key)
+        if slot is None:
+            if len(self._zone_slots) >= self.max_zones:
+                raise SegmentFull("No room for zone %s" % key)
+            slot = len(self._zone_slots)
+            self._zone_slots[key] = slot
+            self._zone_values.append(())
+        packed = struct.unpack(ZONE_FORMAT, struct.pack(ZONE_FORMAT, *values))
+        if self._zone_values[slot] == packed:
+            return False
+        self._zone_values[slot] = packed
+        self._write(self._zone_at(slot), ZONE_FORMAT, values)
+        self._bump()
+        return True
+
+    def write_partition(self, partition: Dict[str, Any]) -> bool:
+        """Store one partition (an AlarmPanelInterface.partitions value)."""
+        values = (
+            partition["partition_number"],
+            partition.get("area_number") or 0,
+            partition.get("arming_level_code") or 0,
+            _text(partition.get("arming_level"), 32),
+            _text(partition.get("user_info"), 32),
+            _text(partition.get("partition_text"), 48),
+        )
+        number = partition["partition_number"]
+        slot = self._partition_slots.get(number)
+        if slot is None:
+            if len(self._partition_slots) >= self.max_partitions:
+                raise SegmentFull("No room for partition %s" % number)
+            slot = len(self._partition_slots)
+            self._partition_slots[number] = slot
+            self._partition_values.append(())
+        packed = struct.unpack(PARTITION_FORMAT, struct.pack(PARTITION_FORMAT, *values))
+        if self._partition_values[slot] == packed:
+            return False
+        self._partition_values[slot] = packed
+        self._write(self._partition_at(slot), PARTITION_FORMAT, values)
+        self._bump()
+        return True
+
+    def write_panel(self, panel: Dict[str, Any]) -> bool:
+        """Store the panel dict (trouble summary) as JSON."""
+        blob = json.dumps(panel, default=str, separators=(",", ":")).encode("utf-8")
+        if len(blob) > PANEL_BLOB_SIZE:
+            raise SegmentFull("Panel state is %d bytes" % len(blob))
+        if blob == self._panel_blob:
+            return False
+        self._panel_blob = blob
+        self._write(self._panel_at, _PANEL_FORMAT, (len(blob), blob))
+        self._bump()
+        return True
+
+    def sync(self, controller: Any) -> None:
+        """Store every zone and partition of *controller*, and its panel dict."""
+        for zone in list(controller.zones.values()):
+            self.write_zone(zone)
+        for partition in list(controller.partitions.values()):
+            self.write_partition(partition)
+        self.write_panel(controller.panel)
+
+
+class SharedStateReader(_Segment):
+    """Reads the tables back in AlarmPanelInterface's dict shapes."""
+
+    @property
+    def version(self) -> int:
+        return self.header()[2]
+
+    def zones(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for slot in range(self.header()[0]):
+            p, area, group, z, state, ztype, text = self._read(
+                self._zone_at(slot), ZONE_FORMAT
+            )
+            out["p%sz%s" % (p, z)] = {
+                "partition_number": p,
+                "area_number": area,
+                "group_number": group if group >= 0 else "",
+                "zone_number": z,
+                "zone_type": _untext(ztype),
+                "zone_state": [s for s in _untext(state).split(",") if s],
+                "zone_text": _untext(text),
+                "zone_text_tokens": [],
+            }
+        return out
+
+    def partitions(self) -> Dict[int, Dict[str, Any]]:
+        out: Dict[int, Dict[str, Any]] = {}
+        for slot in range(self.header()[1]):
+            p, area, code, level, user, text = self._read(
+                self._partition_at(slot), PARTITION_FORMAT
+            )
+            out[p] = {
+                "partition_number": p,
+                "area_number": area,
+                "arming_level_code": code,
+                "arming_level": _untext(level),
+                "user_info": _untext(user),
+                "partition_text": _untext(text),
+            }
+        return out
+
+    def panel(self) -> Dict[str, Any]:
+        length, blob = self._read(self._panel_at, _PANEL_FORMAT)
+        if not length:
+            return {}
+        return json.loads(blob[:length].decode("utf-8"))
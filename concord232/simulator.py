@@ -0,0 +1,713 @@
+"""
+Concord panel simulator for load and latency testing without a physical panel.
+
+Speaks the real Automation Module framing (line feed + ASCII hex + checksum,
+ACK/NAK control characters) over a pseudo-terminal or a TCP listener that
+``serial.serial_for_url("socket://host:port")`` can connect to.  Zones and
+partitions come from a JSON scenario file; equipment-list and dynamic data
+refresh requests are answered from it, and scripted or random zone-trip,
+alarm and touchpad traffic can be generated at controllable rates.
+
+Usage:
+  python -m concord232.simulator --tcp 127.0.0.1:5500 --scenario panel.json
+  python -m concord232.simulator --pty --zone-trip-rate 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import random
+import select
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from concord232.concord import (
+    ACK,
+    ACK_TIMEOUT_OUTBOUND,
+    MAX_RESENDS,
+    MSG_START,
+    NAK,
+    compute_checksum,
+    decode_message_from_ascii,
+    encode_message_to_ascii,
+    validate_message_checksum,
+)
+from concord232.concord_commands import (
+    ALARM_SOURCE_TYPE,
+    EQPT_LIST_REQ_TYPES,
+    build_cmd_alarm_trouble,
+    build_cmd_arming_level,
+    build_cmd_eqpt_list_done,
+    build_cmd_panel_type,
+    build_cmd_partition_data,
+    build_cmd_touchpad,
+    build_cmd_zone_data,
+    build_cmd_zone_status,
+)
+from concord232.concord_tokens import encode_text_tokens
+
+LOG = logging.getLogger(__name__)
+
+# Zone state codes (see ZONE_STATES in concord_commands).
+ZONE_NORMAL = 0
+ZONE_TRIPPED = 1
+
+# Keypress codes the simulator interprets as arming commands.
+KEY_ARM_STAY = 0x02
+KEY_ARM_AWAY = 0x03
+KEY_KEYFOB_DISARM = 0x20
+
+DEFAULT_SCENARIO: Dict[str, Any] = {
+    "panel_type": 0x14,
+    "serial_number": 12345678,
+    "partitions": [{"number": 1, "area": 0, "arming_level": 1, "text": "HOME"}],
+    "zones": [
+        {"partition": 1, "number": n, "group": 10, "type": 0, "text": "ZONE %d" % n}
+        for n in range(1, 9)
+    ],
+}
+
+
+@dataclass
+class SimZone:
+    partition: int
+    number: int
+    area: int = 0
+    group: int = 10
+    zone_type: int = 0
+    state: int = ZONE_NORMAL
+    text: str = ""
+
+
+@dataclass
+class SimPartition:
+    number: int
+    area: int = 0
+    arming_level: int = 1
+    user_number: int = 252
+    text: str = ""
+
+
+@dataclass
+class Scenario:
+    """Panel contents, link timing and traffic to generate."""
+
+    panel_type: int = 0x14
+    serial_number: int = 0
+    zones: List[SimZone] = field(default_factory=list)
+    partitions: List[SimPartition] = field(default_factory=list)
+    # Seconds to wait before ACKing (or NAKing) a frame from the automation side.
+    ack_delay: float = 0.0
+    # Probability of NAKing a frame that had a good checksum.
+    nak_rate: float = 0.0
+    # Seconds to wait before answering an equipment list or refresh request.
+    response_delay: float = 0.0
+    # Wait for the automation side to ACK each frame before sending the next.
+    wait_for_ack: bool = True
+    # Scripted events: {"at": secs, "type": "zone_trip"|"alarm"|"touchpad"|...}.
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    # Random traffic, in events per second.
+    zone_trip_rate: float = 0.0
+    alarm_rate: float = 0.0
+    touchpad_rate: float = 0.0
+
+
+def scenario_from_dict(data: Dict[str, Any]) -> Scenario:
+    """
+    Build a Scenario from parsed JSON.
+    Args:
+        data (dict): Scenario document (see DEFAULT_SCENARIO for the layout).
+    Returns:
+        Scenario: The scenario.
+    """
+    timing = data.get("timing", {})
+    rates = data.get("random", {})
+    return Scenario(
+        panel_type=int(data.get("panel_type", 0x14)),
+        serial_number=int(data.get("serial_number", 0)),
+        zones=[
+            SimZone(
+                partition=int(z.get("partition", 1)),
+                number=int(z["number"]),
+                area=int(z.get("area", 0)),
+                group=int(z.get("group", 10)),
+                zone_type=int(z.get("type", 0)),
+                state=int(z.get("state", ZONE_NORMAL)),
+                text=str(z.get("text", "")),
+            )
+            for z in data.get("zones", [])
+        ],
+        partitions=[
+            SimPartition(
+                number=int(p["number"]),
+                area=int(p.get("area", 0)),
+                arming_level=int(p.get("arming_level", 1)),
+                text=str(p.get("text", "")),
+            )
+            for p in data.get("partitions", [])
+        ],
+        ack_delay=float(timing.get("ack_delay", 0.0)),
+        nak_rate=float(timing.get("nak_rate", 0.0)),
+        response_delay=float(timing.get("response_delay", 0.0)),
+        wait_for_ack=bool(timing.get("wait_for_ack", True)),
+        events=list(data.get("events", [])),
+        zone_trip_rate=float(rates.get("zone_trip_rate", 0.0)),
+        alarm_rate=float(rates.get("alarm_rate", 0.0)),
+        touchpad_rate=float(rates.get("touchpad_rate", 0.0)),
+    )
+
+
+def load_scenario(path: str) -> Scenario:
+    """Load a Scenario from the JSON file at *path*."""
+    with open(path) as f:
+        return scenario_from_dict(json.load(f))
+
+
+class PtyTransport(object):
+    """
+    Pseudo-terminal transport; point the server at *device_name*
+    (e.g. ``--serial /dev/pts/5``).
+    """
+
+    def __init__(self) -> None:
+        import tty
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.device_name = os.ttyname(self._slave)
+
+    def connected(self) -> bool:
+        return True
+
+    def read(self, timeout: float) -> bytes:
+        r, _, _ = select.select([self._master], [], [], timeout)
+        if not r:
+            return b""
+        return os.read(self._master, 256)
+
+    def write(self, data: bytes) -> None:
+        os.write(self._master, data)
+
+    def close(self) -> None:
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class TcpListenerTransport(object):
+    """
+    TCP listener transport; point the server at *url*
+    (e.g. ``--serial socket://127.0.0.1:5500``).  One automation client is
+    served at a time; a new connection replaces the previous one.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(1)
+        self.host, self.port = self._sock.getsockname()[:2]
+        self.url = "socket://%s:%d" % (self.host, self.port)
+        self._conn: Optional[socket.socket] = None
+
+    def connected(self) -> bool:
+        return self._conn is not None
+
+    def read(self, timeout: float) -> bytes:
+        r, _, _ = select.select(
+            [self._sock] + ([self._conn] if self._conn else []), [], [], timeout
+        )
+        if self._sock in r:
+            conn, _ = self._sock.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = conn
+            return b""
+        if self._conn is None or self._conn not in r:
+            return b""
+        data = self._conn.recv(256)
+        if not data:
+            self._conn.close()
+            self._conn = None
+        return data
+
+    def write(self, data: bytes) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.sendall(data)
+        except OSError:
+            self._conn.close()
+            self._conn = None
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._sock.close()
+
+
+class PanelSimulator(object):
+    """
+    Emulates the panel side of the Automation Module link.
+
+    One I/O thread owns the transport: it parses frames from the automation
+    side, ACKs/NAKs them, answers requests, and sends queued panel frames
+    one at a time, waiting for the ACK and resending on NAK or timeout like
+    the real panel.  A second thread generates scripted and random traffic.
+    """
+
+    def __init__(
+        self,
+        scenario: Scenario,
+        transport: Any,
+        *,
+        logger: Optional[logging.Logger] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.scenario = scenario
+        self.transport = transport
+        self.logger = logger or LOG
+        self._rng = random.Random(seed)
+        self._zones: Dict[Tuple[int, int], SimZone] = {
+            (z.partition, z.number): z for z in scenario.zones
+        }
+        self._partitions: Dict[int, SimPartition] = {
+            p.number: p for p in scenario.partitions
+        }
+        self._outbound: Deque[List[int]] = deque()
+        self._outbound_lock = threading.Lock()
+        self._pending: Optional[List[int]] = None
+        self._pending_sent_at = 0.0
+        self._pending_attempts = 0
+        self._rx_buf = bytearray()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.stats: Dict[str, int] = {
+            "frames_received": 0,
+            "frames_sent": 0,
+            "acks_sent": 0,
+            "naks_sent": 0,
+            "acks_received": 0,
+            "naks_received": 0,
+            "resends": 0,
+            "bad_frames": 0,
+        }
+        # Arrival times of frames from the automation side, for latency tests.
+        self.rx_times: Deque[Tuple[float, List[int]]] = deque(maxlen=10000)
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self) -> None:
+        self._stop.clear()
+        for name, target in (
+            ("sim-io", self._io_loop),
+            ("sim-traffic", self._traffic_loop),
+        ):
+            t = threading.Thread(target=target, daemon=True, name=name)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self._threads = []
+        self.transport.close()
+
+    # -- panel frames ------------------------------------------------------
+
+    def send_frame(self, msg: List[int]) -> None:
+        """
+        Queue a panel-to-automation frame; *msg* starts with the length byte
+        and has no checksum (one is appended here).
+        """
+        frame = list(msg)
+        frame.append(compute_checksum(frame))
+        with self._outbound_lock:
+            self._outbound.append(frame)
+
+    def outbound_depth(self) -> int:
+        with self._outbound_lock:
+            return len(self._outbound)
+
+    def set_zone_state(self, partition: int, zone: int, state_code: int) -> None:
+        z = self._zones.get((partition, zone))
+        area = 0
+        if z is not None:
+            z.state = state_code
+            area = z.area
+        self.send_frame(build_cmd_zone_status(partition, area, zone, state_code))
+
+    def trip_zone(self, partition: int, zone: int) -> None:
+        self.set_zone_state(partition, zone, ZONE_TRIPPED)
+
+    def restore_zone(self, partition: int, zone: int) -> None:
+        self.set_zone_state(partition, zone, ZONE_NORMAL)
+
+    def set_arming_level(
+        self, partition: int, level_code: int, user_number: int = 252
+    ) -> None:
+        p = self._partitions.get(partition)
+        area = 0
+        if p is not None:
+            p.arming_level = level_code
+            p.user_number = user_number
+            area = p.area
+        self.send_frame(
+            build_cmd_arming_level(partition, area, user_number, level_code)
+        )
+
+    def send_alarm(
+        self,
+        partition: int,
+        general_type: int,
+        specific_type: int,
+        source_type: str = "System",
+        source_number: int = 1,
+    ) -> None:
+        self.send_frame(
+            build_cmd_alarm_trouble(
+                partition, source_type, source_number, general_type, specific_type
+            )
+        )
+
+    def send_touchpad(self, partition: int, text: str, message_type: int = 0) -> None:
+        self.send_frame(
+            build_cmd_touchpad(partition, 0, message_type, encode_text_tokens(text))
+        )
+
+    def send_equipment_list(self, request_type: int = 0) -> None:
+        if request_type == 0:
+            self.send_frame(
+                build_cmd_panel_type(
+                    self.scenario.panel_type, self.scenario.serial_number
+                )
+            )
+        if request_type in (0, EQPT_LIST_REQ_TYPES["ZONE_DATA"]):
+            for z in self._zones.values():
+                self.send_frame(
+                    build_cmd_zone_data(
+                        z.partition,
+                        z.area,
+                        z.group,
+                        z.number,
+                        z.zone_type,
+                        z.state,
+                        encode_text_tokens(z.text),
+                    )
+                )
+        if request_type in (0, EQPT_LIST_REQ_TYPES["PART_DATA"]):
+            for p in self._partitions.values():
+                self.send_frame(
+                    build_cmd_partition_data(
+                        p.number, p.area, p.arming_level, encode_text_tokens(p.text)
+                    )
+                )
+        self.send_frame(build_cmd_eqpt_list_done())
+
+    def send_dynamic_data(self) -> None:
+        for p in self._partitions.values():
+            self.send_frame(
+                build_cmd_arming_level(p.number, p.area, p.user_number, p.arming_level)
+            )
+        for z in self._zones.values():
+            self.send_frame(
+                build_cmd_zone_status(z.partition, z.area, z.number, z.state)
+            )
+
+    # -- automation requests -----------------------------------------------
+
+    def _handle_request(self, msg: List[int]) -> None:
+        if len(msg) < 3:
+            return
+        cmd = msg[1]
+        if self.scenario.response_delay:
+            time.sleep(self.scenario.response_delay)
+        if cmd == 0x02:
+            self.send_equipment_list(msg[2] if len(msg) > 3 else 0)
+        elif cmd == 0x20:
+            self.send_dynamic_data()
+        elif cmd == 0x40 and len(msg) >= 5:
+            self._handle_keypress(msg[2], msg[4:-1])
+        else:
+            self.logger.debug("Simulator ignoring command 0x%02x", cmd)
+
+    def _handle_keypress(self, partition: int, keys: List[int]) -> None:
+        if KEY_KEYFOB_DISARM in keys:
+            self.set_arming_level(partition, 1)
+            self.send_touchpad(partition, "SYSTEM DISARMED")
+        elif KEY_ARM_AWAY in keys:
+            self.set_arming_level(partition, 3)
+            self.send_touchpad(partition, "ARMED AWAY")
+        elif KEY_ARM_STAY in keys:
+            self.set_arming_level(partition, 2)
+            self.send_touchpad(partition, "ARMED STAY")
+
+    # -- I/O loop ----------------------------------------------------------
+
+    def _io_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._io_once()
+            except Exception:
+                self.logger.exception("Simulator I/O error")
+                time.sleep(0.1)
+
+    def _io_once(self) -> None:
+        data = self.transport.read(0.005)
+        if data:
+            self._rx_buf.extend(data)
+            self._consume_rx()
+        if not self.transport.connected():
+            self._pending = None
+            return
+        now = time.monotonic()
+        if self._pending is not None:
+            if now - self._pending_sent_at > ACK_TIMEOUT_OUTBOUND:
+                self._resend("timeout")
+            return
+        with self._outbound_lock:
+            frame = self._outbound.popleft() if self._outbound else None
+        if frame is not None:
+            self._write_frame(frame)
+
+    def _write_frame(self, frame: List[int]) -> None:
+        raw = (MSG_START + encode_message_to_ascii(frame)).encode("latin-1")
+        self.transport.write(raw)
+        self.stats["frames_sent"] += 1
+        if self.scenario.wait_for_ack:
+            self._pending = frame
+            self._pending_sent_at = time.monotonic()
+            self._pending_attempts += 1
+
+    def _resend(self, reason: str) -> None:
+        assert self._pending is not None
+        if self._pending_attempts >= MAX_RESENDS:
+            self.logger.warning(
+                "Simulator giving up on frame (%s): %s",
+                reason,
+                encode_message_to_ascii(self._pending),
+            )
+            self._clear_pending()
+            return
+        self.stats["resends"] += 1
+        self._write_frame(self._pending)
+
+    def _clear_pending(self) -> None:
+        self._pending = None
+        self._pending_attempts = 0
+
+    def _consume_rx(self) -> None:
+        buf = self._rx_buf
+        while buf:
+            c = chr(buf[0])
+            if c == ACK:
+                del buf[0]
+                self.stats["acks_received"] += 1
+                self._clear_pending()
+            elif c == NAK:
+                del buf[0]
+                self.stats["naks_received"] += 1
+                if self._pending is not None:
+                    self._resend("NAK")
+            elif c == MSG_START:
+                if len(buf) < 3:
+                    return
+                try:
+                    length = int(buf[1:3].decode("latin-1"), 16)
+                except ValueError:
+                    del buf[0]
+                    self._nak()
+                    continue
+                end = 1 + (length + 1) * 2
+                if len(buf) < end:
+                    return
+                ascii_msg = buf[1:end].decode("latin-1")
+                del buf[:end]
+                self._handle_frame(ascii_msg)
+            else:
+                # Noise between frames is discarded, as the panel does.
+                del buf[0]
+
+    def _handle_frame(self, ascii_msg: str) -> None:
+        try:
+            msg = decode_message_from_ascii(ascii_msg)
+        except Exception:
+            self.stats["bad_frames"] += 1
+            self._nak()
+            return
+        if len(msg) < 3 or not validate_message_checksum(msg):
+            self.stats["bad_frames"] += 1
+            self._nak()
+            return
+        self.stats["frames_received"] += 1
+        self.rx_times.append((time.monotonic(), msg))
+        if self.scenario.ack_delay:
+            time.sleep(self.scenario.ack_delay)
+        if self.scenario.nak_rate and self._rng.random() < self.scenario.nak_rate:
+            self._nak()
+            return
+        self.transport.write(ACK.encode("latin-1"))
+        self.stats["acks_sent"] += 1
+        self._handle_request(msg)
+
+    def _nak(self) -> None:
+        self.transport.write(NAK.encode("latin-1"))
+        self.stats["naks_sent"] += 1
+
+    # -- traffic generation --------------------------------------------------
+
+    def _traffic_loop(self) -> None:
+        started = time.monotonic()
+        script = sorted(self.scenario.events, key=lambda e: float(e.get("at", 0)))
+        next_at = {
+            "zone_trip": self._next_random(self.scenario.zone_trip_rate),
+            "alarm": self._next_random(self.scenario.alarm_rate),
+            "touchpad": self._next_random(self.scenario.touchpad_rate),
+        }
+        restores: List[Tuple[float, int, int]] = []
+        while not self._stop.wait(0.001):
+            now = time.monotonic() - started
+            while script and float(script[0].get("at", 0)) <= now:
+                self._run_event(script.pop(0), now, restores)
+            for kind, at in next_at.items():
+                if at is not None and at <= now:
+                    self._run_random(kind, now, restores)
+                    rate = getattr(self.scenario, kind + "_rate")
+                    next_at[kind] = now + self._rng.expovariate(rate)
+            for r in [r for r in restores if r[0] <= now]:
+                restores.remove(r)
+                self.restore_zone(r[1], r[2])
+
+    def _next_random(self, rate: float) -> Optional[float]:
+        if rate <= 0:
+            return None
+        return self._rng.expovariate(rate)
+
+    def _run_event(
+        self, event: Dict[str, Any], now: float, restores: List[Tuple[float, int, int]]
+    ) -> None:
+        kind = event.get("type")
+        partition = int(event.get("partition", 1))
+        if kind == "zone_trip":
+            zone = int(event["zone"])
+            self.trip_zone(partition, zone)
+            restores.append((now + float(event.get("duration", 1.0)), partition, zone))
+        elif kind == "zone_state":
+            self.set_zone_state(partition, int(event["zone"]), int(event["state"]))
+        elif kind == "alarm":
+            self.send_alarm(
+                partition,
+                int(event.get("general_type", 1)),
+                int(event.get("specific_type", 0)),
+                source_type=str(event.get("source_type", "System")),
+                source_number=int(event.get("source_number", 1)),
+            )
+        elif kind == "touchpad":
+            self.send_touchpad(partition, str(event.get("text", "")))
+        elif kind == "arm":
+            self.set_arming_level(partition, int(event.get("level", 1)))
+        else:
+            self.logger.warning("Unknown scenario event type %r", kind)
+
+    def _run_random(
+        self, kind: str, now: float, restores: List[Tuple[float, int, int]]
+    ) -> None:
+        if kind == "zone_trip" and self._zones:
+            z = self._rng.choice(list(self._zones.values()))
+            self.trip_zone(z.partition, z.number)
+            restores.append((now + self._rng.uniform(0.1, 2.0), z.partition, z.number))
+        elif kind == "alarm":
+            partition = self._rng.choice(list(self._partitions) or [1])
+            self.send_alarm(
+                partition,
+                self._rng.choice((15, 16)),
+                self._rng.randrange(0, 22),
+                source_type=ALARM_SOURCE_TYPE[0],
+                source_number=self._rng.randrange(1, 8),
+            )
+        elif kind == "touchpad":
+            partition = self._rng.choice(list(self._partitions) or [1])
+            self.send_touchpad(partition, "SENSOR %02d OPEN" % self._rng.randrange(100))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Simulate a GE Concord 4 panel's Automation Module link."
+    )
+    parser.add_argument(
+        "--scenario",
+        default=None,
+        metavar="FILE",
+        help="JSON scenario of zones, partitions, timing and events",
+    )
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--tcp",
+        default="127.0.0.1:5500",
+        metavar="HOST:PORT",
+        help="Listen for socket:// clients (default: 127.0.0.1:5500)",
+    )
+    group.add_argument(
+        "--pty",
+        default=False,
+        action="store_true",
+        help="Create a pseudo-terminal instead of a TCP listener",
+    )
+    parser.add_argument("--zone-trip-rate", type=float, default=None, metavar="N/S")
+    parser.add_argument("--alarm-rate", type=float, default=None, metavar="N/S")
+    parser.add_argument("--touchpad-rate", type=float, default=None, metavar="N/S")
+    parser.add_argument("--ack-delay", type=float, default=None, metavar="SECS")
+    parser.add_argument("--nak-rate", type=float, default=None, metavar="P")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--debug", default=False, action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=args.debug and logging.DEBUG or logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+    if args.scenario:
+        scenario = load_scenario(args.scenario)
+    else:
+        scenario = scenario_from_dict(DEFAULT_SCENARIO)
+    for name in ("zone_trip_rate", "alarm_rate", "touchpad_rate", "ack_delay"):
+        if getattr(args, name) is not None:
+            setattr(scenario, name, getattr(args, name))
+    if args.nak_rate is not None:
+        scenario.nak_rate = args.nak_rate
+
+    transport: Any
+    if args.pty:
+        transport = PtyTransport()
+        LOG.info("Simulated panel on %s", transport.device_name)
+    else:
+        host, port = args.tcp.rsplit(":", 1)
+        transport = TcpListenerTransport(host, int(port))
+        LOG.info("Simulated panel listening on %s", transport.url)
+
+    sim = PanelSimulator(scenario, transport, seed=args.seed)
+    sim.start()
+    try:
+        while True:
+            time.sleep(10)
+            LOG.info("Simulator stats: %s", sim.stats)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
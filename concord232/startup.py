@@ -0,0 +1,46 @@
+"""
+Startup timing for ``concord232_server --profile-startup``.
+
+The server imports its optional subsystems (API server, MQTT, supervisor,
+tracing) only when they are configured; StartupProfile records the wall
+time and number of newly imported modules of each startup stage so the
+cost of each can be seen on slow hosts.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+
+class StartupProfile(object):
+    """Wall time and modules imported per named startup stage."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float, int]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        modules = len(sys.modules)
+        try:
+            yield
+        finally:
+            self.stages.append(
+                (name, time.perf_counter() - started, len(sys.modules) - modules)
+            )
+
+    def report(self) -> str:
+        """One line per stage and a total, in milliseconds."""
+        lines = [
+            "%-28s %8.1f ms %5d modules" % (name, secs * 1000, modules)
+            for name, secs, modules in self.stages
+        ]
+        lines.append(
+            "%-28s %8.1f ms %5d modules loaded"
+            % ("total", (time.perf_counter() - self.started) * 1000, len(sys.modules))
+        )
+        return "\n".join(lines)
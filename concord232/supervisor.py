@@ -0,0 +1,315 @@
+"""
+Process-per-panel supervisor.
+
+Each panel's serial loop, parsers and MQTT publisher run in a worker
+process of their own, so panel links scale across cores instead of sharing
+one GIL.  Workers export zone, partition and trouble state through a
+shared-memory segment (concord232/shared_state.py) that the API process
+reads directly; commands from the API go to the worker over a queue.
+Workers that exit are restarted with exponential backoff.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from concord232.panel_state import PanelState
+from concord232.shared_state import (
+    DEFAULT_MAX_PARTITIONS,
+    DEFAULT_MAX_ZONES,
+    SegmentFull,
+    SharedStateReader,
+    SharedStateWriter,
+    attach_segment,
+    create_segment,
+)
+
+LOG = logging.getLogger("concord232.supervisor")
+
+# AlarmPanelInterface methods RemotePanel may invoke in the worker.
+COMMAND_METHODS = (
+    "arm_stay",
+    "arm_away",
+    "disarm",
+    "send_keys",
+    "request_zones",
+    "request_partitions",
+    "request_all_equipment",
+    "request_dynamic_data_refresh",
+)
+
+RESTART_BACKOFF_BASE_SECS = 1.0
+RESTART_BACKOFF_MAX_SECS = 60.0
+# A worker that ran at least this long resets the restart backoff.
+STABLE_RUN_SECS = 60.0
+_MONITOR_INTERVAL_SECS = 0.5
+
+WORKER_LOG_FORMAT = "%(asctime)-15s panel={panel} %(module)s %(levelname)s %(message)s"
+
+_MP = multiprocessing.get_context("spawn")
+
+
+class RemotePanel(object):
+    """
+    Stands in for an AlarmPanelInterface in the API process: state is read
+    from the worker's shared-memory segment, commands are queued to the
+    worker.  Command completion is not reported back.
+    """
+
+    def __init__(self, reader: SharedStateReader, commands: Any) -> None:
+        self.reader = reader
+        self.commands = commands
+
+    @property
+    def zones(self) -> Dict[str, Dict[str, Any]]:
+        return self.reader.zones()
+
+    @property
+    def partitions(self) -> Dict[int, Dict[str, Any]]:
+        return self.reader.partitions()
+
+    @property
+    def panel(self) -> Dict[str, Any]:
+        return self.reader.panel()
+
+    @property
+    def state_version(self) -> int:
+        return self.reader.version
+
+    def _send(self, method: str, *args: Any, **kwargs: Any) -> None:
+        self.commands.put((method, args, kwargs))
+
+    def arm_stay(self, option: Optional[str], partition: int = 1) -> None:
+        self._send("arm_stay", option, partition=partition)
+
+    def arm_away(self, option: Optional[str], partition: int = 1) -> None:
+        self._send("arm_away", option, partition=partition)
+
+    def disarm(self, master_pin: str, partition: int = 1) -> None:
+        self._send("disarm", master_pin, partition=partition)
+
+    def send_keys(self, keys: List[str], group: bool, partition: int = 1) -> None:
+        self._send("send_keys", list(keys), group, partition=partition)
+
+    def request_zones(self) -> None:
+        self._send("request_zones")
+
+    def request_partitions(self) -> None:
+        self._send("request_partitions")
+
+    def request_all_equipment(self) -> None:
+        self._send("request_all_equipment")
+
+    def request_dynamic_data_refresh(self) -> None:
+        self._send("request_dynamic_data_refresh")
+
+
+def execute_command(controller: Any, item: Tuple[str, tuple, dict]) -> None:
+    """Run one queued (method, args, kwargs) command on *controller*."""
+    method, args, kwargs = item
+    if method not in COMMAND_METHODS:
+        raise ValueError("Command %r is not allowed" % method)
+    getattr(controller, method)(*args, **kwargs)
+
+
+def install_state_export(controller: Any, writer: SharedStateWriter) -> None:
+    """
+    Copy *controller*'s zones and partitions into *writer* whenever it
+    publishes a PanelState (so equipment lists appear whole, at
+    EQPT_LIST_DONE), and its panel dict whenever troubles change.
+    """
+    full = set()
+    exported = [-1]
+
+    def guarded(fn: Any) -> Any:
+        def handler(arg: Any) -> None:
+            try:
+                fn(arg)
+            except SegmentFull as e:
+                if str(e) not in full:
+                    full.add(str(e))
+                    controller.logger.warning("Shared state: %s", e)
+
+        return handler
+
+    def export(state: PanelState) -> None:
+        since = exported[0]
+        for key, version in (state.zone_versions or {}).items():
+            zone = state.zones.get("p%sz%s" % key)
+            if version > since and zone is not None:
+                writer.write_zone(zone)
+        for number, version in (state.partition_versions or {}).items():
+            partition = state.partitions.get(number)
+            if version > since and partition is not None:
+                writer.write_partition(partition)
+        exported[0] = state.version or 0
+
+    controller.register_state_handler(guarded(export))
+    controller.register_trouble_handler(
+        guarded(lambda state: writer.write_panel(controller.panel))
+    )
+
+
+def _command_loop(controller: Any, commands: Any) -> None:
+    while True:
+        item = commands.get()
+        try:
+            execute_command(controller, item)
+        except Exception:
+            controller.logger.exception("Queued command %r failed", item[0])
+
+
+def run_worker(
+    panel_id: str,
+    serial: str,
+    segment_name: str,
+    commands: Any,
+    debug: bool = False,
+    mqtt: Optional[Dict[str, Any]] = None,
+    trace_file: Optional[str] = None,
+    trace_sample_rate: float = 1.0,
+) -> None:
+    """Worker process entry point: run one panel until the process is stopped."""
+    from concord232.concord import AlarmPanelInterface
+
+    logging.basicConfig(
+        level=logging.DEBUG if debug else logging.INFO,
+        format=WORKER_LOG_FORMAT.replace("{panel}", panel_id),
+    )
+    ctrl = AlarmPanelInterface(serial, 0.25, logging.getLogger("concord232"))
+    install_state_export(ctrl, SharedStateWriter(attach_segment(segment_name)))
+    if trace_file:
+        from concord232.tracing import JsonLinesExporter, Tracer
+
+        ctrl.set_tracer(Tracer(JsonLinesExporter(trace_file), trace_sample_rate))
+    if mqtt:
+        from concord232.mqtt_setup import setup_mqtt
+
+        setup_mqtt(ctrl, logger=logging.getLogger("concord232.mqtt_events"), **mqtt)
+    threading.Thread(
+        target=_command_loop, args=(ctrl, commands), daemon=True, name="commands"
+    ).start()
+    ctrl.message_loop()
+
+
+class _Worker(object):
+    def __init__(self, panel_id: str, kwargs: Dict[str, Any]) -> None:
+        self.panel_id = panel_id
+        self.kwargs = kwargs
+        self.segment = create_segment(
+            max_zones=kwargs.pop("max_zones", DEFAULT_MAX_ZONES),
+            max_partitions=kwargs.pop("max_partitions", DEFAULT_MAX_PARTITIONS),
+        )
+        self.commands = _MP.Queue()
+        self.process: Optional[Any] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.backoff = RESTART_BACKOFF_BASE_SECS
+        self.next_start_at = 0.0
+
+
+class PanelSupervisor(object):
+    """
+    Starts one worker process per panel added with add_panel() and keeps
+    them running.
+    """
+
+    def __init__(self) -> None:
+        self._workers: Dict[str, _Worker] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_panel(self, panel_id: str, serial: str, **kwargs: Any) -> RemotePanel:
+        """
+        Register a panel; *kwargs* are passed to run_worker() (plus
+        max_zones / max_partitions for the segment).
+        Returns:
+            RemotePanel: Controller for the API process.
+        """
+        if panel_id in self._workers:
+            raise ValueError("Panel %r is already supervised" % panel_id)
+        kwargs["serial"] = serial
+        worker = _Worker(panel_id, kwargs)
+        self._workers[panel_id] = worker
+        return RemotePanel(SharedStateReader(worker.segment), worker.commands)
+
+    def start(self) -> None:
+        for worker in self._workers.values():
+            self._spawn(worker)
+        self._thread = threading.Thread(
+            target=self._monitor, daemon=True, name="panel-supervisor"
+        )
+        self._thread.start()
+
+    def _spawn(self, worker: _Worker) -> None:
+        worker.process = _MP.Process(
+            target=run_worker,
+            args=(worker.panel_id,),
+            kwargs=dict(
+                worker.kwargs,
+                segment_name=worker.segment.name,
+                commands=worker.commands,
+            ),
+            daemon=True,
+            name="panel-%s" % worker.panel_id,
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        LOG.info(
+            "Panel %s worker started (pid %s)", worker.panel_id, worker.process.pid
+        )
+
+    def _monitor(self) -> None:
+        while not self._stop.wait(_MONITOR_INTERVAL_SECS):
+            now = time.monotonic()
+            for worker in list(self._workers.values()):
+                process = worker.process
+                if process is None or process.is_alive():
+                    continue
+                if worker.next_start_at == 0.0:
+                    if now - worker.started_at >= STABLE_RUN_SECS:
+                        worker.backoff = RESTART_BACKOFF_BASE_SECS
+                    worker.next_start_at = now + worker.backoff
+                    LOG.error(
+                        "Panel %s worker exited with code %s; restarting in %.0fs",
+                        worker.panel_id,
+                        process.exitcode,
+                        worker.backoff,
+                    )
+                    worker.backoff = min(worker.backoff * 2, RESTART_BACKOFF_MAX_SECS)
+                elif now >= worker.next_start_at:
+                    worker.next_start_at = 0.0
+                    worker.restarts += 1
+                    self._spawn(worker)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Per panel: worker pid, alive flag and restart count."""
+        return {
+            panel_id: {
+                "pid": w.process.pid if w.process is not None else None,
+                "alive": w.process is not None and w.process.is_alive(),
+                "restarts": w.restarts,
+            }
+            for panel_id, w in self._workers.items()
+        }
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the workers and release the shared-memory segments."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        for worker in self._workers.values():
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(timeout)
+            worker.commands.close()
+            worker.segment.close()
+            try:
+                worker.segment.unlink()
+            except FileNotFoundError:
+                pass
+        self._workers.clear()
@@ -0,0 +1,160 @@
+"""
+Per-frame tracing for the serial message pipeline.
+
+A Tracer is attached with AlarmPanelInterface.set_tracer().  For every
+sampled frame the panel records timestamped events along the frame's path:
+
+  RX:  rx_start (message-start byte read), rx_byte (optional, per byte),
+       frame_complete, checksum_ok / checksum_bad, ack_sent, parsed,
+       handler_start / handler_end (once per handler)
+  TX:  enqueue, tx_write (once per attempt), nak, ack / failed
+
+When the frame is done the trace is handed to Tracer.export(); the default
+implementation forwards it to the configured exporter.  Subclass Tracer and
+override export() (or pass any object with export()/close() methods) to
+plug in a different backend.  Unsampled frames cost one random() call.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_QUEUE_SIZE = 10000
+
+
+class FrameTrace(object):
+    """Events recorded for one RX or TX frame."""
+
+    __slots__ = ("trace_id", "kind", "wall_time", "started", "events")
+
+    def __init__(self, trace_id: int, kind: str) -> None:
+        self.trace_id = trace_id
+        self.kind = kind
+        self.wall_time = time.time()
+        self.started = time.perf_counter()
+        self.events: List[Tuple[str, float, Optional[Dict[str, Any]]]] = []
+
+    def event(self, name: str, **attrs: Any) -> None:
+        self.events.append((name, time.perf_counter(), attrs or None))
+
+    def rx_byte(self, b: int) -> None:
+        self.events.append(("rx_byte", time.perf_counter(), {"byte": b}))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the trace as a JSON-serializable dict; event times are
+        microseconds since the trace started.
+        """
+        events = []
+        for name, t, attrs in self.events:
+            e: Dict[str, Any] = {
+                "event": name,
+                "t_us": round((t - self.started) * 1e6, 1),
+            }
+            if attrs:
+                e.update(attrs)
+            events.append(e)
+        return {
+            "trace_id": self.trace_id,
+            "kind": self.kind,
+            "time": self.wall_time,
+            "events": events,
+        }
+
+
+class JsonLinesExporter(object):
+    """
+    Append each finished trace as one JSON object per line to *path*.
+
+    export() only puts the trace on a bounded queue; a background thread
+    serializes and writes it, flushing whenever the queue runs empty, so
+    the serial loop never waits on the disk.  Traces arriving while the
+    queue is full are dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, path: str, maxsize: int = DEFAULT_QUEUE_SIZE) -> None:
+        self.path = path
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[FrameTrace]]" = queue.Queue(maxsize)
+        self._fh = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="trace-writer"
+        )
+        self._thread.start()
+
+    def export(self, trace: FrameTrace) -> None:
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                break
+            self._fh.write(json.dumps(trace.to_dict(), separators=(",", ":")) + "\n")
+            if self._queue.empty():
+                self._fh.flush()
+        self._fh.close()
+
+    def close(self) -> None:
+        """Write the queued traces, then close the file."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+class Tracer(object):
+    """
+    Decides which frames are traced and hands finished traces to *exporter*.
+
+    *sample_rate* is the fraction of frames traced (0.0 - 1.0).  When
+    *trace_bytes* is True, sampled RX frames also record one rx_byte event
+    per byte read from the port.
+    """
+
+    def __init__(
+        self,
+        exporter: Any = None,
+        sample_rate: float = 1.0,
+        trace_bytes: bool = False,
+        seed: Optional[int] = None,
+    ) -> None:
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.trace_bytes = trace_bytes
+        self._random = random.Random(seed)
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def start(self, kind: str) -> Optional[FrameTrace]:
+        """Begin a trace of *kind* ("rx" or "tx"), or None if not sampled."""
+        if self.sample_rate < 1.0 and self._random.random() >= self.sample_rate:
+            return None
+        with self._lock:
+            self._next_id += 1
+            trace_id = self._next_id
+        return FrameTrace(trace_id, kind)
+
+    def finish(self, trace: FrameTrace) -> None:
+        try:
+            self.export(trace)
+        except Exception:
+            # Tracing must never break the serial loop.
+            pass
+
+    def export(self, trace: FrameTrace) -> None:
+        if self.exporter is not None:
+            self.exporter.export(trace)
+
+    def close(self) -> None:
+        if self.exporter is not None:
+            self.exporter.close()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmarks for the concord232 server, driven by the panel simulator.
+
+Runs the real SerialInterface + AlarmPanelInterface stack against
+concord232.simulator over a local socket:// link and measures:
+
+  rx_throughput       frames/sec through read_next_message / handle_message
+  command_latency     GET /command -> TX frame written to the serial port
+  mqtt_latency        RX frame on the wire -> MQTT publish() call
+  api_throughput      /zones and /partitions requests/sec under concurrent clients
+  soak                traced memory growth while random traffic flows
+
+Results are written as JSON so runs can be compared between releases.
+
+Usage (from repository root; adds repo to sys.path so no pip install is required):
+  python scripts/benchmark_e2e.py --output bench.json
+  python scripts/benchmark_e2e.py --only rx_throughput,command_latency
+  python scripts/benchmark_e2e.py --soak-secs 600 --compare baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Run with `python scripts/benchmark_e2e.py` from the repo root without `pip install -e .`.
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import requests
+from werkzeug.serving import make_server
+
+from concord232.concord import AlarmPanelInterface
+from concord232.mqtt_events import PanelMqttPublisher
+from concord232.server import api
+from concord232.simulator import (
+    PanelSimulator,
+    TcpListenerTransport,
+    scenario_from_dict,
+)
+
+SCHEMA_VERSION = 1
+
+# Upper bucket bounds (seconds) for latency histograms.
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+LOG = logging.getLogger("benchmark")
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """Percentiles and a cumulative bucket histogram for latency *samples*."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    n = len(ordered)
+
+    def pct(p: float) -> float:
+        return ordered[min(n - 1, int(round(p / 100.0 * (n - 1))))]
+
+    hist = {"le_%g" % b: sum(1 for s in ordered if s <= b) for b in LATENCY_BUCKETS}
+    hist["le_inf"] = n
+    return {
+        "count": n,
+        "mean": sum(ordered) / n,
+        "min": ordered[0],
+        "p50": pct(50),
+        "p90": pct(90),
+        "p99": pct(99),
+        "max": ordered[-1],
+        "histogram": hist,
+    }
+
+
+def _wait_for(cond: Callable[[], bool], timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.001)
+    return False
+
+
+class Rig(object):
+    """A simulator plus a panel interface running its message loop."""
+
+    def __init__(self, zones: int, loop_timeout: float, scenario_extra: Dict) -> None:
+        doc: Dict[str, Any] = {
+            "partitions": [{"number": 1, "arming_level": 1, "text": "HOME"}],
+            "zones": [
+                {"partition": 1, "number": n, "text": "ZONE %d" % n}
+                for n in range(1, zones + 1)
+            ],
+        }
+        doc.update(scenario_extra)
+        self.sim = PanelSimulator(
+            scenario_from_dict(doc), TcpListenerTransport("127.0.0.1", 0), seed=1
+        )
+        self.sim.start()
+        self.panel = AlarmPanelInterface(
+            self.sim.transport.url, loop_timeout, logging.getLogger("bench.panel")
+        )
+        self._loop = threading.Thread(
+            target=self.panel.message_loop, daemon=True, name="serial-loop"
+        )
+        self._loop.start()
+        if not _wait_for(
+            lambda: len(self.panel.zones) == zones and self.panel.partitions, 30.0
+        ):
+            raise RuntimeError("Panel did not load zones from the simulator")
+
+    def close(self) -> None:
+        self.panel.stop_loop()
+        self._loop.join(timeout=5)
+        self.sim.stop()
+
+
+def bench_rx_throughput(args: argparse.Namespace) -> Dict[str, Any]:
+    rig = Rig(args.zones, args.loop_timeout, {})
+    try:
+        handled = [0]
+
+        def count(_: dict) -> None:
+            handled[0] += 1
+
+        rig.panel.register_message_handler("ZONE_STATUS", count)
+        n = args.frames
+        started = time.perf_counter()
+        for i in range(n):
+            rig.sim.set_zone_state(1, 1 + i % args.zones, i % 2)
+        ok = _wait_for(lambda: handled[0] >= n, 120.0)
+        elapsed = time.perf_counter() - started
+        return {
+            "frames": handled[0],
+            "complete": ok,
+            "seconds": elapsed,
+            "frames_per_sec": handled[0] / elapsed if elapsed else 0.0,
+            "resends": rig.sim.stats["resends"],
+        }
+    finally:
+        rig.close()
+
+
+def bench_command_latency(args: argparse.Namespace) -> Dict[str, Any]:
+    rig = Rig(args.zones, args.loop_timeout, {})
+    try:
+        api.CONTROLLER = rig.panel
+        http = api.app.test_client()
+        writes: List[float] = []
+        serial_if = rig.panel.serial_interface
+        real_write = serial_if.write_message
+
+        def timed_write(msg: List[int]) -> None:
+            real_write(msg)
+            writes.append(time.perf_counter())
+
+        serial_if.write_message = timed_write  # type: ignore[method-assign]
+        samples: List[float] = []
+        for _ in range(args.commands):
+            before = len(writes)
+            started = time.perf_counter()
+            http.get("/command?cmd=keys&keys=1&group=true&partition=1")
+            if _wait_for(lambda before=before: len(writes) > before, 5.0):
+                samples.append(writes[before] - started)
+            # Let the panel ACK before the next command so we measure one hop.
+            _wait_for(lambda: rig.panel.tx_pending is None, 5.0)
+        return summarize(samples)
+    finally:
+        rig.close()
+
+
+class _TimingMqttClient(object):
+    def __init__(self) -> None:
+        self.published: List[float] = []
+
+    def publish(self, topic: str, payload: Any, qos: int = 0, retain: bool = False):
+        self.published.append(time.perf_counter())
+
+
+def bench_mqtt_latency(args: argparse.Namespace) -> Dict[str, Any]:
+    rig = Rig(args.zones, args.loop_timeout, {})
+    try:
+        client = _TimingMqttClient()
+        publisher = PanelMqttPublisher(client, "bench")
+        rig.panel.register_message_handler("ALARM", publisher.publish_alarm)
+
+        frame_writes: List[float] = []
+        transport = rig.sim.transport
+        real_write = transport.write
+
+        def timed_write(data: bytes) -> None:
+            real_write(data)
+            if data[:1] == b"\n":
+                frame_writes.append(time.perf_counter())
+
+        transport.write = timed_write  # type: ignore[method-assign]
+        samples: List[float] = []
+        for _ in range(args.events):
+            before_w, before_p = len(frame_writes), len(client.published)
+            rig.sim.send_alarm(1, 15, 21, source_type="Bus Device", source_number=4)
+            if _wait_for(
+                lambda before_p=before_p: len(client.published) > before_p, 5.0
+            ):
+                samples.append(client.published[before_p] - frame_writes[before_w])
+        return summarize(samples)
+    finally:
+        rig.close()
+
+
+def bench_api_throughput(args: argparse.Namespace) -> Dict[str, Any]:
+    rig = Rig(args.zones, args.loop_timeout, {})
+    server = make_server("127.0.0.1", 0, api.app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    try:
+        api.CONTROLLER = rig.panel
+        base = "http://127.0.0.1:%d" % server.server_port
+        out: Dict[str, Any] = {}
+        for route in ("/zones", "/partitions"):
+            for clients in args.clients:
+                local = threading.local()
+
+                def one(
+                    _: int, local: threading.local = local, route: str = route
+                ) -> float:
+                    if not hasattr(local, "session"):
+                        local.session = requests.Session()
+                    t0 = time.perf_counter()
+                    local.session.get(base + route).raise_for_status()
+                    return time.perf_counter() - t0
+
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=clients) as pool:
+                    samples = list(pool.map(one, range(args.requests)))
+                elapsed = time.perf_counter() - started
+                result = summarize(samples)
+                result["requests_per_sec"] = len(samples) / elapsed
+                out["%s@%d" % (route, clients)] = result
+        return out
+    finally:
+        server.shutdown()
+        rig.close()
+
+
+def bench_soak(args: argparse.Namespace) -> Dict[str, Any]:
+    tracemalloc.start()
+    rig = Rig(
+        args.zones,
+        args.loop_timeout,
+        {"random": {"zone_trip_rate": 50.0, "alarm_rate": 2.0, "touchpad_rate": 10.0}},
+    )
+    try:
+        client = _TimingMqttClient()
+        publisher = PanelMqttPublisher(client, "bench")
+        rig.panel.register_message_handler("ALARM", publisher.publish_alarm)
+        rig.panel.register_message_handler("TOUCHPAD", publisher.publish_touchpad)
+        samples: List[Dict[str, float]] = []
+        started = time.monotonic()
+        baseline: Optional[int] = None
+        while time.monotonic() - started < args.soak_secs:
+            time.sleep(min(args.soak_interval, args.soak_secs))
+            current, peak = tracemalloc.get_traced_memory()
+            if baseline is None:
+                baseline = current
+            samples.append(
+                {
+                    "t": time.monotonic() - started,
+                    "current_bytes": current,
+                    "peak_bytes": peak,
+                }
+            )
+        end = samples[-1]["current_bytes"] if samples else 0
+        return {
+            "seconds": args.soak_secs,
+            "frames_sent": rig.sim.stats["frames_sent"],
+            "start_bytes": baseline or 0,
+            "end_bytes": end,
+            "growth_bytes": end - (baseline or 0),
+            "display_messages": len(rig.panel.display_messages),
+            "samples": samples,
+        }
+    finally:
+        rig.close()
+        tracemalloc.stop()
+
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], Dict[str, Any]]] = {
+    "rx_throughput": bench_rx_throughput,
+    "command_latency": bench_command_latency,
+    "mqtt_latency": bench_mqtt_latency,
+    "api_throughput": bench_api_throughput,
+    "soak": bench_soak,
+}
+
+
+def _package_version() -> str:
+    try:
+        from importlib.metadata import version
+
+        return version("concord232")
+    except Exception:
+        return "unknown"
+
+
+def _flatten(prefix: str, value: Any, out: Dict[str, float]) -> None:
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if k not in ("histogram", "samples"):
+                _flatten(prefix + "." + k if prefix else k, v, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = float(value)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Return one line per numeric result that changed versus *baseline*."""
+    now: Dict[str, float] = {}
+    then: Dict[str, float] = {}
+    _flatten("", current["results"], now)
+    _flatten("", baseline.get("results", {}), then)
+    lines = []
+    for key in sorted(now):
+        if key in then and then[key]:
+            change = (now[key] - then[key]) / then[key] * 100.0
+            lines.append(
+                "%-50s %14.6g %14.6g %+8.1f%%" % (key, then[key], now[key], change)
+            )
+    return lines
+
+
+def run() -> int:
+    parser = argparse.ArgumentParser(
+        description="End-to-end concord232 benchmarks against the panel simulator."
+    )
+    parser.add_argument(
+        "--only",
+        default=",".join(BENCHMARKS),
+        help="Comma-separated benchmarks to run (default: all)",
+    )
+    parser.add_argument("--output", default=None, metavar="FILE", help="JSON output")
+    parser.add_argument(
+        "--compare", default=None, metavar="FILE", help="Baseline JSON to diff against"
+    )
+    parser.add_argument("--zones", type=int, default=32)
+    parser.add_argument(
+        "--loop-timeout",
+        type=float,
+        default=0.25,
+        metavar="SEC",
+        help="AlarmPanelInterface timeout, as the server uses (default: %(default)s)",
+    )
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument(
+        "--clients",
+        type=lambda s: [int(x) for x in s.split(",")],
+        default=[1, 8, 32],
+        help="Concurrent API client counts (default: 1,8,32)",
+    )
+    parser.add_argument("--soak-secs", type=float, default=30.0)
+    parser.add_argument("--soak-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # Per-request access logs and simulated troubles would swamp the report.
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    logging.getLogger("bench.panel").setLevel(logging.ERROR)
+    results: Dict[str, Any] = {}
+    for name in args.only.split(","):
+        name = name.strip()
+        if name not in BENCHMARKS:
+            parser.error("Unknown benchmark %r" % name)
+        print("Running %s..." % name, file=sys.stderr)
+        results[name] = BENCHMARKS[name](args)
+
+    report = {
+        "schema_version": SCHEMA_VERSION,
+        "concord232_version": _package_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "run_at": datetime.now(timezone.utc).isoformat(),
+        "params": {
+            k: v for k, v in vars(args).items() if k not in ("output", "compare")
+        },
+        "results": results,
+    }
+    body = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(body + "\n")
+    else:
+        print(body)
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        for line in compare(report, baseline):
+            print(line, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from concord232.client.async_client import AsyncClient, gather_states
+
+
+def _app(calls, fail_zones=0):
+    async def panel(request):
+        calls.append("panel")
+        return web.json_response({"panel": {"trouble": False}})
+
+    async def zones(request):
+        calls.append("zones")
+        if calls.count("zones") <= fail_zones:
+            return web.Response(status=503)
+        return web.json_response({"zones": [{"number": 1}]})
+
+    async def partitions(request):
+        calls.append("partitions")
+        return web.json_response({"partitions": [{"number": 1}]})
+
+    async def command(request):
+        calls.append(dict(request.query))
+        return web.Response(status=503)
+
+    app = web.Application()
+    app.router.add_get("/panel", panel)
+    app.router.add_get("/zones", zones)
+    app.router.add_get("/partitions", partitions)
+    app.router.add_get("/command", command)
+    return app
+
+
+async def _serve(app):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, "http://127.0.0.1:%d" % port
+
+
+def test_gather_state_retries_reads():
+    calls = []
+
+    async def main():
+        runner, url = await _serve(_app(calls, fail_zones=1))
+        try:
+            async with AsyncClient(url, backoff=0.001) as client:
+                return await client.gather_state()
+        finally:
+            await runner.cleanup()
+
+    state = asyncio.run(main())
+    assert state == {
+        "panel": {"trouble": False},
+        "zones": [{"number": 1}],
+        "partitions": [{"number": 1}],
+    }
+    assert calls.count("zones") == 2
+
+
+def test_commands_are_not_retried():
+    calls = []
+
+    async def main():
+        runner, url = await _serve(_app(calls))
+        try:
+            async with AsyncClient(url, backoff=0.001) as client:
+                return await client.send_keys("12", partition=2)
+        finally:
+            await runner.cleanup()
+
+    assert asyncio.run(main()) is False
+    assert calls == [{"cmd": "keys", "keys": "12", "group": "false", "partition": "2"}]
+
+
+def test_gather_states_reports_errors_per_server():
+    calls = []
+
+    async def main():
+        runner, url = await _serve(_app(calls))
+        try:
+            return url, await gather_states([url, "http://127.0.0.1:1"], retries=0)
+        finally:
+            await runner.cleanup()
+
+    url, results = asyncio.run(main())
+    assert results[url]["error"] is None
+    assert results[url]["state"]["zones"] == [{"number": 1}]
+    down = results["http://127.0.0.1:1"]
+    assert down["state"] is None and "ClientConnectorError" in down["error"]
@@ -0,0 +1,62 @@
+import logging
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from concord232.client.cached_client import CachedClient
+from concord232.concord import AlarmPanelInterface
+from concord232.concord_commands import (
+    build_cmd_eqpt_list_done,
+    build_cmd_zone_data,
+    build_cmd_zone_status,
+)
+from concord232.concord_tokens import encode_text_tokens
+from concord232.server import api
+
+
+@pytest.fixture
+def server(monkeypatch, deliver):
+    panel = AlarmPanelInterface("fake", 0.25, logging.getLogger("test"))
+    deliver(panel, build_cmd_zone_data(1, 0, 10, 5, 0, 0, encode_text_tokens("DOOR")))
+    deliver(panel, build_cmd_eqpt_list_done())
+    monkeypatch.setattr(api, "CONTROLLER", panel)
+    srv = make_server("127.0.0.1", 0, api.app, threaded=True)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield panel, "http://127.0.0.1:%d" % srv.server_port
+    finally:
+        srv.shutdown()
+
+
+def _requests(route):
+    return api.REQUEST_SECONDS.count(route, "200")
+
+
+def test_reads_come_from_the_stream(server, deliver, wait_for):
+    panel, url = server
+    zone_requests = _requests("/zones")
+    client = CachedClient(url)
+    try:
+        zones = client.list_zones()
+        assert [z["name"] for z in zones] == ["DOOR"]
+        assert client.staleness is not None
+
+        deliver(panel, build_cmd_zone_status(1, 0, 5, 1))
+        assert wait_for(lambda: client.list_zones()[0]["state"] == ["Tripped"])
+        assert client.get_panel()["trouble"] is False
+        assert _requests("/zones") == zone_requests
+    finally:
+        client.close()
+
+
+def test_stale_cache_falls_back_to_http(server):
+    panel, url = server
+    zone_requests = _requests("/zones")
+    client = CachedClient(url, max_staleness=0.0)
+    try:
+        assert [z["name"] for z in client.list_zones()] == ["DOOR"]
+        assert _requests("/zones") == zone_requests + 1
+    finally:
+        client.close()
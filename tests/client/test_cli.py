@@ -1,3 +1,4 @@
+import json
 import os
 import subprocess
 import sys
@@ -33,8 +34,8 @@ def patch_client(monkeypatch):
         concord232.client.client.Client,
         "list_zones",
         lambda self: [
-            {"number": 1, "name": "Front", "state": False, "type": "Door"},
-            {"number": 2, "name": "Garage", "state": True, "type": "Motion"},
+            {"number": 1, "name": "Front", "state": ["Normal"], "type": "Door"},
+            {"number": 2, "name": "Garage", "state": ["Faulted"], "type": "Motion"},
         ],
     )
     monkeypatch.setattr(
@@ -103,3 +104,21 @@ def test_version():
     result = run_cli(["version"])
     assert result.returncode == 0
     assert "1.2.3" in result.stderr
+
+
+def test_fleet_summary_json(tmp_path):
+    hosts = tmp_path / "hosts.txt"
+    hosts.write_text("# sites\nsite-a\nsite-b:5008/barn\n")
+    result = run_cli(["summary", "--hosts-file", str(hosts), "--format", "json"])
+    assert result.returncode == 0
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [line["host"] for line in lines] == ["site-a", "site-b:5008/barn"]
+    assert lines[0]["ok"] and lines[0]["error"] is None
+    assert lines[0]["result"]["faulted"] == ["Garage"]
+
+
+def test_fleet_arm_table():
+    result = run_cli(["arm-away", "--hosts", "site-a,site-b"])
+    assert result.returncode == 0
+    assert "site-a" in result.stderr and "site-b" in result.stderr
+    assert "Seconds" in result.stderr and "OK" in result.stderr
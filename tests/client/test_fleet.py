@@ -0,0 +1,40 @@
+import threading
+import time
+
+from concord232.client.fleet import host_url, parse_hosts, run_fleet
+
+
+def test_parse_hosts_and_urls():
+    hosts = parse_hosts("a, b:5008\n# comment\n\nc/barn  # trailing\n")
+    assert hosts == ["a", "b:5008", "c/barn"]
+    assert [host_url(h) for h in hosts] == [
+        "http://a:5007",
+        "http://b:5008",
+        "http://c:5007/panels/barn",
+    ]
+
+
+def test_run_fleet_is_concurrent_and_isolates_errors():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def action(url):
+        with lock:
+            active.append(url)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(url)
+        if "bad" in url:
+            raise ConnectionError("refused")
+        return url
+
+    hosts = ["h%d" % i for i in range(8)] + ["bad"]
+    results = run_fleet(hosts, action, workers=4, client_factory=lambda url: url)
+    assert [r.host for r in results] == hosts
+    assert results[0].result == "http://h0:5007" and results[0].error is None
+    assert results[-1].result is None
+    assert results[-1].error == "ConnectionError: refused"
+    assert max(peak) == 4
+    assert results[-1].as_dict()["ok"] is False
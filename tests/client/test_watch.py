@@ -0,0 +1,65 @@
+from concord232.client.watch import CLEAR, HIGHLIGHT, HIGHLIGHT_SECS, WatchScreen
+
+
+def _zone(number, state):
+    return {
+        "partition": 1,
+        "number": number,
+        "name": "ZONE %d" % number,
+        "state": state,
+        "type": "Hardwired",
+    }
+
+
+SNAPSHOT = {
+    "panel": {},
+    "partitions": [{"number": 1, "arming_level": "Off", "zones": 2}],
+    "zones": [_zone(1, []), _zone(2, [])],
+}
+
+
+class Clock:
+    now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_snapshot_draws_everything():
+    screen = WatchScreen("test")
+    out = screen.apply("snapshot", SNAPSHOT)
+    assert out.startswith(CLEAR)
+    assert "ZONE 1" in out and "ZONE 2" in out and "Off" in out
+
+
+def test_zone_change_rewrites_one_highlighted_row():
+    clock = Clock()
+    screen = WatchScreen("test", clock=clock)
+    screen.apply("snapshot", SNAPSHOT)
+    out = screen.apply("zone", _zone(2, ["Tripped"]))
+    assert CLEAR not in out
+    assert out.startswith("\x1b[8;1H\x1b[2K" + HIGHLIGHT)
+    assert "Tripped" in out and "ZONE 1" not in out
+
+    clock.now += HIGHLIGHT_SECS
+    out = screen.apply(
+        "link",
+        {
+            "last_rx_secs": 0.5,
+            "rx_frames": 10,
+            "tx_resends": 3,
+            "tx_failures": 0,
+            "reconnects": 0,
+            "tx_queue_depth": 0,
+        },
+    )
+    assert "last RX 0.5s ago" in out and "resends 3" in out
+    assert "\x1b[8;1H\x1b[2K2     1    ZONE 2" in out
+    assert HIGHLIGHT not in out
+
+
+def test_new_zone_and_disconnect():
+    screen = WatchScreen("test")
+    screen.apply("snapshot", SNAPSHOT)
+    assert screen.apply("zone", _zone(3, [])).startswith(CLEAR)
+    assert "[disconnected]" in screen.disconnected()
@@ -93,3 +93,59 @@ def test_all_data(client):
     resp = client.get("/all_data")
     assert resp.status_code == 200
     api.CONTROLLER.request_dynamic_data_refresh.assert_called()
+
+
+def test_admin_wire_trace(client):
+    resp = client.get("/admin/wire_trace")
+    assert resp.get_json() == {"wire_trace": False}
+    resp = client.get("/admin/wire_trace?enable=1")
+    assert resp.get_json() == {"wire_trace": True}
+    resp = client.get("/admin/wire_trace?enable=bogus")
+    assert resp.status_code == 400
+    resp = client.get("/admin/wire_trace?enable=0")
+    assert resp.get_json() == {"wire_trace": False}
+
+
+def test_admin_logging(client):
+    resp = client.get("/admin/logging")
+    assert resp.status_code == 200
+    assert set(resp.get_json()["logging"]) >= {"serial", "dispatch", "api", "mqtt"}
+    try:
+        resp = client.get("/admin/logging?subsystem=dispatch&level=DEBUG&minutes=5")
+        state = resp.get_json()["logging"]["dispatch"]
+        assert state["level"] == "DEBUG"
+        assert state["revert_at"] is not None
+    finally:
+        api.LOG_CONTROL.cancel_all()
+    assert api.LOG_CONTROL.levels()["dispatch"]["revert_at"] is None
+    assert client.get("/admin/logging?subsystem=nope&level=DEBUG").status_code == 400
+    assert client.get("/admin/logging?subsystem=api&level=LOUD").status_code == 400
+    assert client.get("/admin/logging?subsystem=api").status_code == 400
+
+
+def test_multi_panel_routes(client):
+    barn = MagicMock()
+    barn.panel = {"panel_type": "Concord 4"}
+    barn.zones = {}
+    barn.partitions = {}
+    api.PANELS.clear()
+    try:
+        api.register_panel("house", api.CONTROLLER)
+        api.register_panel("barn", barn)
+        resp = client.get("/panels")
+        assert [p["id"] for p in resp.get_json()["panels"]] == ["house", "barn"]
+        assert resp.get_json()["panels"][0]["default"] is True
+        resp = client.get("/panels/house/zones")
+        assert resp.get_json()["zones"][0]["name"] == "Zone 1"
+        resp = client.get("/panels/barn/panel")
+        assert resp.get_json() == {"panel": {"panel_type": "Concord 4"}}
+        assert client.get("/panels/barn/command?cmd=arm&level=away").status_code == 200
+        barn.arm_away.assert_called_once()
+        api.CONTROLLER.arm_away.assert_not_called()
+        assert client.get("/panels/shed/zones").status_code == 404
+        with pytest.raises(ValueError):
+            api.register_panel("barn", barn)
+        with pytest.raises(ValueError):
+            api.register_panel("a/b", barn)
+    finally:
+        api.PANELS.clear()
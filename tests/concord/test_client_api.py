@@ -1,8 +1,9 @@
 from unittest.mock import MagicMock
 
 import pytest
+import requests
 
-from concord232.client.client import Client
+from concord232.client.client import CircuitOpenError, Client
 
 
 @pytest.fixture
@@ -75,3 +76,72 @@ def test_get_version_success(client):
     resp.json.return_value = {"version": "1.2"}
     client._session.get.return_value = resp
     assert client.get_version() == "1.2"
+
+
+def test_reads_retry_transient_failures(client):
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = {"zones": [1]}
+    client.backoff = 0
+    client._session.get.side_effect = [
+        requests.ConnectionError("refused"),
+        MagicMock(status_code=503),
+        ok,
+    ]
+    assert client.list_zones() == [1]
+    stats = client.stats()["/zones"]
+    assert stats["requests"] == 3
+    assert stats["errors"] == 2 and stats["retries"] == 2
+    assert stats["last_error"] == "HTTP 503"
+    assert client._session.get.call_args.kwargs["timeout"] == client.timeout
+
+
+def test_commands_are_not_retried(client):
+    client._session.get.side_effect = requests.Timeout("slow")
+    with pytest.raises(requests.Timeout):
+        client.send_keys("1")
+    assert client._session.get.call_count == 1
+
+
+def test_circuit_breaker_fails_fast():
+    c = Client("http://localhost", retries=0, breaker_threshold=2, breaker_reset=60)
+    c._session = MagicMock()
+    c._session.get.side_effect = requests.ConnectionError("down")
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            c.list_zones()
+    with pytest.raises(CircuitOpenError):
+        c.list_partitions()
+    assert c._session.get.call_count == 2
+    assert c.breaker.state == "open"
+    assert c.stats()["/partitions"]["rejected"] == 1
+
+    c.breaker.opened_at -= 60  # reset timeout elapsed: one trial request
+    assert c.breaker.state == "half_open"
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = {"partitions": []}
+    c._session.get.side_effect = None
+    c._session.get.return_value = ok
+    assert c.list_partitions() == []
+    assert c.breaker.state == "closed"
+
+
+def test_failed_trial_request_reopens_the_breaker():
+    c = Client("http://localhost", retries=0, breaker_threshold=1, breaker_reset=60)
+    c._session = MagicMock()
+    c._session.get.side_effect = requests.ConnectionError("down")
+    with pytest.raises(requests.ConnectionError):
+        c.list_zones()
+    c.breaker.opened_at -= 60
+    c._session.get.side_effect = requests.exceptions.ChunkedEncodingError("cut")
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        c.list_zones()
+    assert c.breaker.state == "open"
+    assert c.stats()["/zones"]["last_error"].startswith("ChunkedEncodingError")
+
+    c.breaker.opened_at -= 60  # the next trial is still let through
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = {"zones": []}
+    c._session.get.side_effect = None
+    c._session.get.return_value = ok
+    assert c.list_zones() == []
+    assert c.breaker.state == "closed"
@@ -0,0 +1,92 @@
+import gzip
+import json
+import logging
+import zlib
+
+import pytest
+
+from concord232.concord import AlarmPanelInterface
+from concord232.concord_commands import build_cmd_eqpt_list_done, build_cmd_zone_data
+from concord232.concord_tokens import encode_text_tokens
+from concord232.server import api, compress
+
+
+@pytest.fixture
+def panel(deliver):
+    panel = AlarmPanelInterface("fake", 0.25, logging.getLogger("test"))
+    for number in range(1, 41):
+        name = encode_text_tokens("ZONE %d" % number)
+        deliver(panel, build_cmd_zone_data(1, 0, 10, number, 0, 0, name))
+    deliver(panel, build_cmd_eqpt_list_done())
+    return panel
+
+
+@pytest.fixture
+def client(panel):
+    api.CONTROLLER = panel
+    with api.app.test_client() as client:
+        yield client
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("deflate, gzip;q=0.5", "deflate"),
+        ("gzip;q=0, deflate", "deflate"),
+        ("gzip;q=0, *", "deflate"),
+        ("gzip;q=x", None),
+    ],
+)
+def test_choose_encoding(monkeypatch, header, expected):
+    monkeypatch.setattr(compress, "brotli", None)
+    assert compress.choose_encoding(header) == expected
+
+
+def test_brotli_preferred_only_when_installed(monkeypatch):
+    monkeypatch.setattr(compress, "brotli", None)
+    assert compress.choose_encoding("br, gzip") == "gzip"
+    with pytest.raises(ValueError):
+        compress.compress(b"x", "br")
+
+
+def test_compress_round_trip():
+    body = b'{"zones":[]}' * 100
+    assert gzip.decompress(compress.compress(body, "gzip")) == body
+    assert zlib.decompress(compress.compress(body, "deflate")) == body
+    assert compress.compress(body, "gzip") == compress.compress(body, "gzip")
+
+
+def test_large_bodies_are_compressed(client):
+    resp = client.get("/zones", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.headers["Vary"] == "Accept-Encoding"
+    text = gzip.decompress(resp.data).decode()
+    assert len(json.loads(text)["zones"]) == 40
+    assert ", " not in text and '": ' not in text
+    assert len(resp.data) < len(text) / 3
+
+    plain = client.get("/zones")
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data.decode() == text
+
+
+def test_small_bodies_are_sent_as_is(client):
+    resp = client.get("/zones/1/1", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    assert resp.get_json()["zone"]["name"] == "ZONE 1"
+
+
+def test_bodies_are_cached_per_state_version(client, panel, deliver):
+    snapshot = api._snapshot_for(panel)
+    first = client.get("/zones", headers={"Accept-Encoding": "deflate"}).data
+    assert snapshot.cached_body(("zones", "deflate"), lambda: b"") == first
+    again = client.get("/zones", headers={"Accept-Encoding": "deflate"}).data
+    assert again == first
+    deliver(panel, build_cmd_zone_data(1, 0, 10, 41, 0, 0, encode_text_tokens("X")))
+    deliver(panel, build_cmd_eqpt_list_done())
+    newer = client.get("/zones", headers={"Accept-Encoding": "deflate"}).data
+    assert len(json.loads(zlib.decompress(newer))["zones"]) == 41
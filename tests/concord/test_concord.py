@@ -36,3 +36,48 @@ def test_decode_message_from_ascii():
     assert decode_message_from_ascii("0AFF") == [10, 255]
     with pytest.raises(BadEncoding):
         decode_message_from_ascii("0AF")  # Odd length
+
+
+def test_wire_trace_logs_one_line_per_frame(caplog):
+    import logging
+
+    from concord232.concord import (
+        MSG_START,
+        SerialInterface,
+        set_wire_trace,
+    )
+
+    class Serdev:
+        def __init__(self, data):
+            self.data = bytearray(data)
+            self.written = []
+
+        def read(self, size=1):
+            out = bytes(self.data[:size])
+            del self.data[:size]
+            return out
+
+        def write(self, data):
+            self.written.append(data)
+
+    logger = logging.getLogger("test.serial")
+    iface = SerialInterface("fake", 0.1, lambda cc: None, logger)
+    msg = [0x03, 0x21, 0x01]
+    msg.append(compute_checksum(msg))
+    iface.serdev = Serdev((MSG_START + encode_message_to_ascii(msg)).encode())
+
+    caplog.set_level(logging.DEBUG, logger="test.serial")
+    try:
+        assert iface.wait_for_message_start() == MSG_START
+        assert iface.read_next_message() == msg
+        assert not caplog.records
+
+        set_wire_trace(True)
+        iface.serdev = Serdev((MSG_START + encode_message_to_ascii(msg)).encode())
+        iface.wait_for_message_start()
+        iface.read_next_message()
+        iface.write_message(msg)
+    finally:
+        set_wire_trace(False)
+    lines = [r.getMessage() for r in caplog.records if r.name == "concord232.wire"]
+    assert lines == ["RX 03 21 01 25", "TX 03 21 01 25"]
@@ -0,0 +1,56 @@
+import logging
+import time
+
+import pytest
+
+from concord232.log_control import LogControl
+
+
+@pytest.fixture
+def control():
+    ctl = LogControl({"serial": "test.logctl.serial", "api": "test.logctl.api"})
+    logging.getLogger("test.logctl.serial").setLevel(logging.INFO)
+    yield ctl
+    ctl.cancel_all()
+
+
+def test_set_level_permanent(control):
+    control.set_level("serial", "debug")
+    assert logging.getLogger("test.logctl.serial").level == logging.DEBUG
+    levels = control.levels()
+    assert levels["serial"]["level"] == "DEBUG"
+    assert levels["serial"]["revert_at"] is None
+
+
+def test_timed_window_reverts(control):
+    control.set_level("serial", "DEBUG", duration_secs=0.05)
+    assert control.levels()["serial"]["revert_at"] is not None
+    assert logging.getLogger("test.logctl.serial").level == logging.DEBUG
+    deadline = time.time() + 2
+    while logging.getLogger("test.logctl.serial").level != logging.INFO:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert control.levels()["serial"]["revert_at"] is None
+
+
+def test_extending_window_restores_original_level(control):
+    control.set_level("serial", "DEBUG", duration_secs=60)
+    control.set_level("serial", "WARNING", duration_secs=60)
+    control.cancel_all()
+    assert logging.getLogger("test.logctl.serial").level == logging.INFO
+
+
+def test_invalid_arguments(control):
+    with pytest.raises(KeyError):
+        control.set_level("nope", "DEBUG")
+    with pytest.raises(ValueError):
+        control.set_level("serial", "LOUD")
+    with pytest.raises(ValueError):
+        control.set_level("serial", "DEBUG", duration_secs=0)
+
+
+def test_add_panel_subsystems(control):
+    control.add_panel("barn", "test.logctl.barn")
+    control.set_level("serial.barn", "DEBUG")
+    assert logging.getLogger("test.logctl.barn.serial").level == logging.DEBUG
+    assert control.levels()["dispatch.barn"]["logger"] == "test.logctl.barn.dispatch"
@@ -0,0 +1,70 @@
+import logging
+import queue
+import threading
+
+import pytest
+
+from concord232.log_queue import AsyncLogging, DroppingQueueHandler
+from concord232.metrics import MetricsRegistry
+
+
+def _record(msg):
+    return logging.LogRecord("t", logging.INFO, __file__, 1, msg, None, None)
+
+
+def test_drop_new_keeps_oldest_records():
+    q = queue.Queue(2)
+    counter = MetricsRegistry().counter("dropped_total", "Dropped.")
+    handler = DroppingQueueHandler(q, "new", counter)
+    for i in range(4):
+        handler.handle(_record("m%d" % i))
+    assert [q.get_nowait().getMessage() for _ in range(2)] == ["m0", "m1"]
+    assert handler.dropped == 2
+    assert counter.value() == 2
+
+
+def test_drop_old_keeps_newest_records():
+    q = queue.Queue(2)
+    handler = DroppingQueueHandler(q, "old")
+    for i in range(4):
+        handler.handle(_record("m%d" % i))
+    assert [q.get_nowait().getMessage() for _ in range(2)] == ["m2", "m3"]
+    assert handler.dropped == 2
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        DroppingQueueHandler(queue.Queue(1), "block")
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.gate.wait(5)
+        self.messages.append(record.getMessage())
+
+
+def test_logging_thread_never_blocks_on_slow_handler():
+    logger = logging.getLogger("test.log_queue")
+    logger.propagate = False
+    slow = SlowHandler()
+    logger.addHandler(slow)
+    pipeline = AsyncLogging([slow], maxsize=3)
+    pipeline.install(logger)
+    try:
+        assert logger.handlers == [pipeline.handler]
+        for i in range(20):
+            logger.warning("record %d", i)
+        assert pipeline.dropped > 0
+    finally:
+        slow.gate.set()
+        pipeline.stop()
+    assert logger.handlers == [slow]
+    assert slow.messages[0] == "record 0"
+    assert len(slow.messages) == 20 - pipeline.dropped
+    logger.propagate = True
+    logger.removeHandler(slow)
@@ -22,3 +22,26 @@ def test_alarm_message_handler_receives_decoded_command() -> None:
     assert len(seen) == 1
     assert seen[0]["command_id"] == "ALARM"
     assert seen[0]["alarm_general_type"] == "System Trouble"
+
+
+def test_eqpt_list_done_invokes_handlers() -> None:
+    import logging
+
+    from concord232.concord import AlarmPanelInterface
+    from concord232.concord_commands import build_cmd_eqpt_list_done
+
+    panel = AlarmPanelInterface("fake", 0.25, logging.getLogger("test"))
+    seen: list = []
+    panel.register_message_handler("EQPT_LIST_DONE", seen.append)
+    panel.enqueue_synthetic_msg_for_rx(build_cmd_eqpt_list_done())
+    panel.handle_message(panel.fake_rx_queue.get())
+    assert seen and seen[0]["command_id"] == "EQPT_LIST_DONE"
+    assert seen[0]["zone_count"] == 0
+
+
+def test_tx_completion_callback_on_reconnect_drain() -> None:
+    panel = AlarmPanelInterface("fake", 0.25, logging.getLogger("test"))
+    results: list = []
+    panel.arm_stay(None, on_complete=lambda *r: results.append(r))
+    panel._drain_tx_queue()
+    assert results == [(False, "drained")]
@@ -0,0 +1,93 @@
+import logging
+from unittest.mock import MagicMock
+
+from concord232.concord import ACK, NAK, AlarmPanelInterface
+from concord232.concord_commands import build_cmd_alarm_trouble
+from concord232.metrics import MetricsRegistry, PanelMetrics, render_merged
+from concord232.server import api
+
+
+def test_counter_and_histogram_render() -> None:
+    reg = MetricsRegistry()
+    frames = reg.counter("rx_frames_total", "Frames.", ("command",))
+    rtt = reg.histogram("ack_rtt_seconds", "RTT.", buckets=(0.1, 1.0))
+    frames.inc("ZONE_STATUS")
+    frames.inc("ZONE_STATUS")
+    frames.inc('we"ird')
+    rtt.observe(0.05)
+    rtt.observe(0.5)
+    rtt.observe(3.0)
+    text = reg.render({"panel": "main"})
+    assert "# TYPE concord232_rx_frames_total counter" in text
+    assert 'concord232_rx_frames_total{panel="main",command="ZONE_STATUS"} 2' in text
+    assert 'command="we\\"ird"' in text
+    assert 'concord232_ack_rtt_seconds_bucket{panel="main",le="0.1"} 1' in text
+    assert 'concord232_ack_rtt_seconds_bucket{panel="main",le="1"} 2' in text
+    assert 'concord232_ack_rtt_seconds_bucket{panel="main",le="+Inf"} 3' in text
+    assert 'concord232_ack_rtt_seconds_count{panel="main"} 3' in text
+
+
+def test_panel_metrics_follow_link_events() -> None:
+    panel = AlarmPanelInterface("fake", 0.25, logging.getLogger("test"))
+    panel.serial_interface = MagicMock()
+    m = panel.metrics
+
+    msg = build_cmd_alarm_trouble(1, "System", 1, 15, 21)
+    panel.enqueue_synthetic_msg_for_rx(msg)
+    panel.handle_message(panel.fake_rx_queue.get())
+    assert m.rx_frames.value("ALARM") == 1
+    assert m.handler_seconds.count("cmd_alarm_trouble") == 1
+
+    panel.send_message([0x02, 0x20, 0x22])
+    panel.ctrl_char_cb(NAK)
+    assert m.naks_received.value() == 1
+    assert m.tx_resends.value("NAK") == 1
+    panel.ctrl_char_cb(ACK)
+    assert m.ack_rtt.count() == 1
+    assert m.tx_frames.value() == 2
+
+    panel.send_message([0x02, 0x20, 0x22])
+    for _ in range(3):
+        panel.maybe_resend_message("timeout")
+    assert m.tx_failures.value() == 1
+
+    panel.send_nak()
+    assert m.naks_sent.value() == 1
+    panel.request_zones()
+    assert m.tx_queue_depth.value() == 1
+
+    health = panel.link_health()
+    assert health["rx_frames"] == 1 and health["last_rx_secs"] is not None
+    assert health["tx_resends"] == m.tx_resends.total() == 3
+    assert health["tx_failures"] == 1 and health["tx_queue_depth"] == 1
+
+
+def test_metrics_endpoint() -> None:
+    api.CONTROLLER = AlarmPanelInterface("fake", 0.25, logging.getLogger("test"))
+    with api.app.test_client() as client:
+        client.get("/version")
+        resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    text = resp.get_data(as_text=True)
+    assert "concord232_tx_queue_depth 0" in text
+    assert 'concord232_api_request_seconds_count{route="/version",status="200"}' in text
+
+
+def test_render_merged_labels_each_panel() -> None:
+    a, b = PanelMetrics(), PanelMetrics()
+    a.naks_sent.inc()
+    text = render_merged([({"panel": "a"}, a.registry), ({"panel": "b"}, b.registry)])
+    assert text.count("# TYPE concord232_naks_sent_total counter") == 1
+    assert 'concord232_naks_sent_total{panel="a"} 1' in text
+    assert 'concord232_naks_sent_total{panel="b"} 0' in text
+
+
+def test_render_merged_metrics_of_some_panels() -> None:
+    a, b = PanelMetrics(), PanelMetrics()
+    a.registry.gauge("mqtt_queue_depth", "MQTT messages waiting.", fn=lambda: 3)
+    text = render_merged([({"panel": "a"}, a.registry), ({"panel": "b"}, b.registry)])
+    assert text.count("# TYPE concord232_mqtt_queue_depth gauge") == 1
+    assert 'concord232_mqtt_queue_depth{panel="a"} 3' in text
+    assert 'concord232_mqtt_queue_depth{panel="b"}' not in text
+    assert text.count("# TYPE concord232_naks_sent_total counter") == 1
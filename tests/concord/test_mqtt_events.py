@@ -1,11 +1,21 @@
 import json
+import logging
 from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
+import pytest
+
+from concord232 import mqtt_events
+from concord232.concord import ACK, AlarmPanelInterface
 from concord232.mqtt_events import (
+    CommandError,
     PanelMqttPublisher,
     build_alarm_payload,
+    build_alarm_payload_compact,
     build_touchpad_payload,
+    encode_payload,
+    parse_command,
+    parse_encodings,
 )
 
 
@@ -89,3 +99,506 @@ def test_publish_online_retained_status() -> None:
     assert args[0] == "concord232/status"
     assert json.loads(args[1])["state"] == "online"
     assert kwargs.get("retain") is True
+
+
+class _Info:
+    def __init__(self) -> None:
+        self.acked = False
+
+    def is_published(self) -> bool:
+        return self.acked
+
+
+class _BlockingClient:
+    """publish() blocks until released, like paho with a stalled socket."""
+
+    def __init__(self) -> None:
+        import threading
+
+        self.gate = threading.Event()
+        self.calls: list = []
+        self.infos: list = []
+
+    def publish(self, topic, body, qos=0, retain=False):
+        self.gate.wait(5)
+        self.calls.append((topic, json.loads(body)))
+        info = _Info()
+        self.infos.append(info)
+        return info
+
+
+def _touchpad(text: str) -> dict:
+    return {"command_id": "TOUCHPAD", "partition_number": 1, "display_text": text}
+
+
+def _alarm(n: int) -> dict:
+    return {"command_id": "ALARM", "source_number": n}
+
+
+def _wait(cond) -> None:
+    import time
+
+    deadline = time.time() + 5
+    while not cond():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_started_publisher_queues_coalesces_and_never_drops_alarms() -> None:
+    client = _BlockingClient()
+    pub = PanelMqttPublisher(client, "concord232", max_queue=3)
+    pub.start()
+    try:
+        # First message is taken by the worker, which then blocks in publish().
+        pub.publish_alarm(_alarm(0))
+        _wait(lambda: pub.queued() == 0)
+        pub.publish_touchpad(_touchpad("A"))
+        pub.publish_touchpad(_touchpad("B"))
+        assert pub.coalesced == 1
+        pub.publish_alarm(_alarm(1))
+        pub.publish_alarm(_alarm(2))
+        assert pub.queued() == 3
+        # Full: the queued touchpad is evicted to make room for the alarm.
+        pub.publish_alarm(_alarm(3))
+        pub.publish_touchpad(_touchpad("C"))
+        assert pub.dropped == 2
+        assert pub.queued() == 3
+        client.gate.set()
+        _wait(lambda: len(client.calls) == 4)
+    finally:
+        client.gate.set()
+        pub.stop()
+    sources = [body["source_number"] for _, body in client.calls]
+    assert sources == [0, 1, 2, 3]
+    assert pub.stats()["published"] == 4
+
+
+def test_started_publisher_coalesced_touchpad_is_latest() -> None:
+    client = _BlockingClient()
+    pub = PanelMqttPublisher(client, "concord232")
+    pub.start()
+    try:
+        pub.publish_alarm(_alarm(0))
+        _wait(lambda: pub.queued() == 0)
+        for text in ("one", "two", "three"):
+            pub.publish_touchpad(_touchpad(text))
+        client.gate.set()
+        _wait(lambda: len(client.calls) == 2)
+    finally:
+        client.gate.set()
+        pub.stop()
+    assert client.calls[1][0] == "concord232/event/touchpad"
+    assert client.calls[1][1]["display_text"] == "three"
+
+
+def test_inflight_limit_pauses_publishing() -> None:
+    client = _BlockingClient()
+    client.gate.set()
+    pub = PanelMqttPublisher(client, "concord232", max_inflight=2)
+    pub.start()
+    try:
+        for n in range(4):
+            pub.publish_alarm(_alarm(n))
+        _wait(lambda: len(client.calls) == 2)
+        assert pub.inflight() == 2
+        assert len(client.calls) == 2
+        for info in client.infos:
+            info.acked = True
+        _wait(lambda: len(client.calls) == 4)
+    finally:
+        pub.stop()
+
+
+def test_disconnected_client_keeps_messages_in_the_queue() -> None:
+    import paho.mqtt.client as mqtt
+
+    client = mqtt.Client(client_id="test")  # never connected
+    pub = PanelMqttPublisher(client, "concord232", max_queue=10, max_inflight=5)
+    pub.start()
+    try:
+        for n in range(500):
+            pub.publish_alarm(_alarm(n))
+        _wait(lambda: pub.queued() < 500)
+        assert pub.published == 0 and pub.inflight() == 0
+        assert pub.queued() >= 500 - mqtt_events._BATCH_SIZE
+        assert len(client._out_messages) == 0
+    finally:
+        pub.stop()
+
+
+def test_messages_queued_by_paho_while_disconnected_stay_in_flight() -> None:
+    import paho.mqtt.client as mqtt
+
+    info = mqtt.MQTTMessageInfo(1)
+    info.rc = mqtt.MQTT_ERR_NO_CONN
+    assert not mqtt_events._is_published(info)
+    info._set_as_published()
+    assert mqtt_events._is_published(info)
+    info.rc = mqtt.MQTT_ERR_QUEUE_SIZE
+    assert mqtt_events._is_published(info)
+
+
+def test_stop_publishes_remaining_queue() -> None:
+    client = MagicMock()
+    pub = PanelMqttPublisher(client, "concord232")
+    pub.start()
+    pub.publish_online()
+    pub.stop()
+    client.publish.assert_called_once()
+
+
+def _state_calls(client: MagicMock) -> list:
+    return [
+        (c.args[0], json.loads(c.args[1]), c.kwargs.get("retain"))
+        for c in client.publish.call_args_list
+    ]
+
+
+def test_zone_state_is_retained_merged_and_change_only() -> None:
+    client = MagicMock()
+    pub = PanelMqttPublisher(client, "concord232")
+    pub.publish_zone_state(
+        {
+            "partition_number": 1,
+            "area_number": 0,
+            "group_number": 13,
+            "zone_number": 3,
+            "zone_type": "Hardwired",
+            "zone_text": "BACK DOOR",
+            "zone_state": ["Normal"],
+        }
+    )
+    pub.publish_zone_state(
+        {
+            "partition_number": 1,
+            "area_number": 0,
+            "zone_number": 3,
+            "zone_state": ["Normal"],
+        }
+    )
+    assert client.publish.call_count == 1
+    pub.publish_zone_state(
+        {
+            "partition_number": 1,
+            "area_number": 0,
+            "zone_number": 3,
+            "zone_state": ["Tripped"],
+        }
+    )
+    calls = _state_calls(client)
+    assert len(calls) == 2
+    topic, body, retain = calls[-1]
+    assert topic == "concord232/zone/1/3/state"
+    assert retain is True
+    assert body["zone_state"] == ["Tripped"]
+    assert body["zone_text"] == "BACK DOOR"
+    assert body["schema_version"] == 1
+    assert "updated_at" in body
+
+
+def test_partition_and_trouble_state_topics() -> None:
+    client = MagicMock()
+    pub = PanelMqttPublisher(client, "concord232")
+    pub.publish_partition_state(
+        {
+            "partition_number": 1,
+            "area_number": 0,
+            "arming_level": "Off",
+            "arming_level_code": 1,
+            "partition_text": "",
+        }
+    )
+    pub.publish_partition_state(
+        {
+            "partition_number": 1,
+            "arming_level": "Stay",
+            "arming_level_code": 2,
+            "user_info": "Regular User 3",
+        }
+    )
+    pub.publish_trouble_state(
+        {
+            "trouble": False,
+            "trouble_count": 0,
+            "trouble_detail": "",
+            "trouble_buses": [],
+        }
+    )
+    calls = _state_calls(client)
+    assert [c[0] for c in calls] == [
+        "concord232/partition/1/state",
+        "concord232/partition/1/state",
+        "concord232/trouble/state",
+    ]
+    assert calls[1][1]["arming_level"] == "Stay"
+    assert calls[1][1]["user_info"] == "Regular User 3"
+    assert calls[2][1]["trouble"] is False
+
+
+def test_state_publishing_can_be_disabled() -> None:
+    client = MagicMock()
+    pub = PanelMqttPublisher(client, "concord232", publish_state=False)
+    pub.publish_zone_state({"partition_number": 1, "zone_number": 1, "zone_state": []})
+    client.publish.assert_not_called()
+
+
+def _zone(z: int, text: str) -> dict:
+    return {
+        "partition_number": 1,
+        "area_number": 0,
+        "group_number": 13,
+        "zone_number": z,
+        "zone_type": "Hardwired",
+        "zone_text": text,
+        "zone_state": ["Normal"],
+    }
+
+
+def test_zone_and_partition_discovery_configs() -> None:
+    from concord232.mqtt_events import build_partition_discovery, build_zone_discovery
+
+    topic, config = build_zone_discovery(
+        "concord232", "concord232", _zone(3, "BACK DOOR")
+    )
+    assert topic == "homeassistant/binary_sensor/concord232/p1z3/config"
+    assert config["name"] == "BACK DOOR"
+    assert config["state_topic"] == "concord232/zone/1/3/state"
+    assert config["device_class"] == "door"
+    assert config["availability_topic"] == "concord232/status"
+
+    topic, config = build_partition_discovery(
+        "home/concord232", "home_concord232", {"partition_number": 2}
+    )
+    assert (
+        topic == "homeassistant/alarm_control_panel/home_concord232/partition2/config"
+    )
+    assert config["name"] == "Partition 2"
+    assert config["command_topic"] == "home/concord232/command/2"
+
+
+def test_partition_discovery_disarm_forwards_the_ha_code() -> None:
+    import jinja2
+
+    from concord232.mqtt_events import build_partition_discovery
+
+    _, config = build_partition_discovery("concord232", "concord232", {})
+    assert config["code"] == "REMOTE_CODE" and config["code_disarm_required"]
+    template = jinja2.Template(config["command_template"])
+    payload = template.render(action="DISARM", code="1234").encode()
+    assert parse_command(payload) == {"action": "disarm", "id": None, "code": "1234"}
+
+
+def test_publish_discovery_only_sends_changes_and_removals() -> None:
+    client = MagicMock()
+    pub = PanelMqttPublisher(client, "concord232")
+    zones = {"p1z1": _zone(1, "FRONT DOOR"), "p1z2": _zone(2, "HALL MOTION")}
+    partitions = {1: {"partition_number": 1, "partition_text": ""}}
+    assert pub.publish_discovery(zones, partitions) == 4
+    assert pub.publish_discovery(zones, partitions) == 0
+
+    zones["p1z1"] = _zone(1, "FRONT ENTRY")
+    del zones["p1z2"]
+    assert pub.publish_discovery(zones, partitions) == 2
+    last = client.publish.call_args_list[-2:]
+    removed = [c for c in last if c.args[1] == ""]
+    assert [c.args[0] for c in removed] == [
+        "homeassistant/binary_sensor/concord232/p1z2/config"
+    ]
+    renamed = [c for c in last if c.args[1] != ""]
+    assert json.loads(renamed[0].args[1])["name"] == "FRONT ENTRY"
+    assert all(c.kwargs["retain"] for c in client.publish.call_args_list)
+
+
+def test_parse_command_actions_and_aliases() -> None:
+    assert parse_command(b'{"action": "arm_stay", "id": 7}') == {
+        "action": "arm_stay",
+        "id": 7,
+        "option": None,
+    }
+    assert parse_command(b"ARM_AWAY")["action"] == "arm_away"
+    assert parse_command(b'{"action": "DISARM", "code": "1234"}')["code"] == "1234"
+    keys = parse_command(b'{"action": "send_keys", "keys": "12*", "group": true}')
+    assert keys["keys"] == ["1", "2", "*"] and keys["group"] is True
+    for bad in (
+        b'{"action": "explode"}',
+        b'{"action": "disarm", "code": ""}',
+        b'{"action": "arm_stay", "option": "loud"}',
+        b'{"action": "send_keys", "keys": []}',
+        b"[1, 2]",
+    ):
+        with pytest.raises(CommandError):
+            parse_command(bad)
+    with pytest.raises(CommandError):
+        parse_command(b'{"action": "send_keys", "keys": ["Z"]}', ("1", "2"))
+
+
+def _command_setup():
+    client = MagicMock()
+    panel = AlarmPanelInterface("fake", 0.0, logging.getLogger("test"))
+    panel.serial_interface = MagicMock()
+    pub = PanelMqttPublisher(client, "concord232")
+    pub.subscribe_commands(panel)
+    return client, panel, pub
+
+
+def _command(pub, partition: str, payload: bytes) -> None:
+    message = MagicMock(topic="concord232/command/%s" % partition, payload=payload)
+    pub._on_command(None, None, message)
+
+
+def _results(client: MagicMock) -> list:
+    return [
+        json.loads(c.args[1])
+        for c in client.publish.call_args_list
+        if c.args[0].endswith("/result")
+    ]
+
+
+def test_subscribe_commands_subscribes_wildcard() -> None:
+    client, _, _ = _command_setup()
+    client.message_callback_add.assert_called_once()
+    assert client.message_callback_add.call_args.args[0] == "concord232/command/+"
+    client.subscribe.assert_called_once_with("concord232/command/+", qos=1)
+
+
+def test_command_result_published_on_ack() -> None:
+    client, panel, pub = _command_setup()
+    _command(pub, "2", b'{"action": "arm_away", "option": "instant", "id": "x1"}')
+    assert _results(client) == []
+    msg = panel.tx_queue.get()
+    assert msg[2] == 2 and msg[4:6] == [0x03, 0x04]
+    panel.send_message(msg)
+    panel.ctrl_char_cb(ACK)
+    (result,) = _results(client)
+    assert client.publish.call_args.args[0] == "concord232/command/2/result"
+    assert result["result"] == "ack"
+    assert result["id"] == "x1"
+    assert result["action"] == "arm_away"
+    assert result["partition_number"] == 2
+    assert result["error"] is None
+
+
+def test_command_result_failed_after_resends() -> None:
+    client, panel, pub = _command_setup()
+    _command(pub, "1", b'{"action": "disarm", "code": "1234"}')
+    panel.send_message(panel.tx_queue.get())
+    for _ in range(3):
+        panel.maybe_resend_message("NAK")
+    (result,) = _results(client)
+    assert result["result"] == "failed"
+    assert result["error"] == "NAK"
+    assert "1234" not in client.publish.call_args.args[1]
+
+
+def test_send_keys_result_waits_for_every_key() -> None:
+    client, panel, pub = _command_setup()
+    _command(pub, "1", b'{"action": "send_keys", "keys": ["1", "2"]}')
+    for _ in range(2):
+        assert _results(client) == []
+        panel.send_message(panel.tx_queue.get())
+        panel.ctrl_char_cb(ACK)
+    assert [r["result"] for r in _results(client)] == ["ack"]
+
+
+def test_invalid_command_is_rejected() -> None:
+    client, panel, pub = _command_setup()
+    _command(pub, "9", b"ARM_HOME")
+    _command(pub, "1", b'{"action": "send_keys", "keys": ["Z"]}')
+    assert [r["result"] for r in _results(client)] == ["rejected", "rejected"]
+    assert panel.tx_queue.empty()
+
+
+_ALARM = {
+    "command_id": "ALARM",
+    "partition_number": 1,
+    "area_number": 0,
+    "source_type": "Zone",
+    "source_number": 5,
+    "alarm_general_type": "Alarm",
+    "alarm_specific_type": "Entry/Exit",
+    "alarm_general_type_code": 1,
+    "alarm_specific_type_code": 3,
+    "event_specific_data": 0,
+}
+
+
+def test_compact_alarm_payload_is_codes_only() -> None:
+    pytest.importorskip("msgpack")
+    when = datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+    body = build_alarm_payload_compact(_ALARM, received_at=when)
+    assert body == {
+        "v": 2,
+        "p": 1,
+        "a": 0,
+        "st": 2,
+        "sn": 5,
+        "g": 1,
+        "s": 3,
+        "d": 0,
+        "t": 1704164645678,
+    }
+    packed = encode_payload(body, "msgpack")
+    assert len(packed) < len(encode_payload(build_alarm_payload(_ALARM), "json")) / 3
+
+
+def test_compact_partition_state_is_codes_only() -> None:
+    from concord232.mqtt_events import build_partition_state_compact
+
+    when = datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+    decoded = {
+        "partition_number": 1,
+        "arming_level": "Stay",
+        "arming_level_code": 2,
+        "user_info": "Regular User 5",
+        "user_number_low": 5,
+    }
+    assert build_partition_state_compact(decoded, updated_at=when) == {
+        "v": 2,
+        "p": 1,
+        "l": 2,
+        "u": 5,
+        "t": 1704164645678,
+    }
+
+
+def test_parse_encodings() -> None:
+    pytest.importorskip("msgpack")
+    assert parse_encodings("") == {}
+    assert parse_encodings("alarm=msgpack, touchpad=json") == {
+        "alarm": "msgpack",
+        "touchpad": "json",
+    }
+    assert set(parse_encodings("*=msgpack")) == {
+        "alarm",
+        "touchpad",
+        "zone",
+        "partition",
+    }
+    for bad in ("alarm", "alarm=xml", "status=msgpack"):
+        with pytest.raises(ValueError):
+            parse_encodings(bad)
+
+
+@patch.object(mqtt_events, "cbor2", None)
+def test_parse_encodings_requires_library() -> None:
+    with pytest.raises(ValueError, match="cbor2"):
+        parse_encodings("alarm=cbor")
+
+
+def test_publisher_uses_per_topic_encoding() -> None:
+    msgpack = pytest.importorskip("msgpack")
+
+    client = MagicMock()
+    pub = PanelMqttPublisher(
+        client, "concord232", encodings={"alarm": "msgpack", "zone": "msgpack"}
+    )
+    pub.publish_alarm(_ALARM)
+    pub.publish_zone_state(
+        {"partition_number": 1, "zone_number": 3, "zone_state": ["Tripped"]}
+    )
+    pub.publish_partition_state({"partition_number": 1, "arming_level_code": 2})
+    alarm, zone, partition = client.publish.call_args_list
+    assert msgpack.unpackb(alarm.args[1])["g"] == 1
+    assert msgpack.unpackb(zone.args[1])["s"] == 1
+    assert zone.kwargs["retain"] is True
+    assert json.loads(partition.args[1])["schema_version"] == 1
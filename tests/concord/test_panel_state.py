@@ -0,0 +1,130 @@
+import logging
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from concord232 import concord
+from concord232.concord import AlarmPanelInterface
+from concord232.concord_commands import (
+    build_cmd_arming_level,
+    build_cmd_eqpt_list_done,
+    build_cmd_partition_data,
+    build_cmd_zone_data,
+    build_cmd_zone_status,
+)
+from concord232.concord_tokens import encode_text_tokens
+from concord232.panel_state import PanelState, current_state
+from concord232.server import api
+from concord232.server.state import build_snapshot
+
+
+def _zone(partition, number, name="ZONE"):
+    return build_cmd_zone_data(partition, 0, 10, number, 0, 0, encode_text_tokens(name))
+
+
+@pytest.fixture
+def panel():
+    return AlarmPanelInterface("fake", 0.25, logging.getLogger("test"))
+
+
+def test_panel_state_is_immutable():
+    state = PanelState(1)
+    with pytest.raises(AttributeError):
+        state.version = 2
+
+
+def test_updated_copies_only_changed_entities():
+    a, b = {"partition_number": 1, "n": 1}, {"partition_number": 2, "n": 2}
+    old = PanelState(1, {"trouble": False}, {"p1z1": a, "p2z2": b}, {1: {"x": 1}})
+    changed = {"partition_number": 2, "n": 3}
+    new = old.updated(2, zones={"p2z2": changed}, zone_versions={(2, 2): 2})
+    assert new.version == 2 and old.version == 1
+    assert new.zones["p1z1"] is old.zones["p1z1"]
+    assert new.zones["p2z2"] == changed and new.zones["p2z2"] is not changed
+    assert old.zones["p2z2"] is b
+    assert new.partitions is old.partitions and new.panel is old.panel
+    assert new.zone_versions == {(2, 2): 2} and old.zone_versions is None
+    assert new.zone_counts == {1: 1, 2: 1}
+
+
+def test_equipment_list_is_published_when_done(panel, deliver):
+    deliver(panel, build_cmd_partition_data(1, 0, 1, []))
+    deliver(panel, _zone(1, 1))
+    deliver(panel, _zone(1, 2))
+    assert panel.state.zones == {} and panel.state.partitions == {}
+    deliver(panel, build_cmd_eqpt_list_done())
+    state = panel.state
+    assert set(state.zones) == {"p1z1", "p1z2"} and set(state.partitions) == {1}
+    assert state.version == panel.state_version
+    assert state.zone_counts == {1: 2}
+
+    deliver(panel, build_cmd_zone_status(1, 0, 2, 1))
+    assert panel.state.zones["p1z2"]["zone_state"] == ["Tripped"]
+    assert state.zones["p1z2"]["zone_state"] == ["Normal"]
+    assert panel.state.zones["p1z1"] is state.zones["p1z1"]
+
+
+def test_unfinished_equipment_list_is_published_after_timeout(
+    panel, deliver, monkeypatch
+):
+    deliver(panel, _zone(1, 1))
+    assert panel.state.zones == {}
+    monkeypatch.setattr(concord, "EQPT_LIST_MAX_SECS", 0.0)
+    deliver(panel, build_cmd_zone_status(1, 0, 1, 1))
+    assert panel.state.zones["p1z1"]["zone_state"] == ["Tripped"]
+
+
+def test_unfinished_equipment_list_is_published_without_further_frames(
+    panel, deliver, monkeypatch
+):
+    deliver(panel, _zone(1, 1))
+    panel.serial_interface = MagicMock()
+    panel.serial_interface.message_chars_maybe_available.return_value = False
+    panel.timeout_secs = 0
+    panel._message_loop_once(datetime.now(), datetime.now())
+    assert panel.state.zones == {}
+    monkeypatch.setattr(concord, "EQPT_LIST_MAX_SECS", 0.0)
+    panel._message_loop_once(datetime.now(), datetime.now())
+    assert set(panel.state.zones) == {"p1z1"}
+
+
+def test_current_state_captures_controllers_without_states():
+    controller = SimpleNamespace(
+        panel={"trouble": False},
+        zones={"p1z1": {"partition_number": 1}},
+        partitions={},
+        state_version=4,
+    )
+    state = current_state(controller)
+    assert state.version == 4 and state.zone_counts == {1: 1}
+    assert current_state(state) is state
+
+
+def test_readers_never_see_tables_change_under_them(panel, deliver):
+    for number in (1, 2, 3):
+        deliver(panel, build_cmd_partition_data(number, 0, 1, []))
+    deliver(panel, build_cmd_eqpt_list_done())
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        try:
+            while not stop.is_set():
+                build_snapshot(panel, api.show_zone, api.show_partition)
+        except Exception as e:  # pragma: no cover - the failure being tested
+            errors.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for number in range(1, 400):
+            deliver(panel, build_cmd_zone_status(1 + number % 3, 0, number, 1))
+            deliver(panel, build_cmd_arming_level(1 + number % 3, 0, 1, number % 3))
+    finally:
+        stop.set()
+        reader.join()
+    assert errors == []
+    assert len(panel.state.zones) == 399
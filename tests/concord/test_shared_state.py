@@ -0,0 +1,210 @@
+import logging
+import os
+import queue
+import struct
+import subprocess
+import sys
+import threading
+import time
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from concord232.concord import AlarmPanelInterface
+from concord232.concord_commands import (
+    build_cmd_arming_level,
+    build_cmd_eqpt_list_done,
+    build_cmd_zone_data,
+    build_cmd_zone_status,
+)
+from concord232.concord_tokens import encode_text_tokens
+from concord232.shared_state import (
+    SegmentFull,
+    SharedStateReader,
+    SharedStateWriter,
+    create_segment,
+)
+from concord232.simulator import (
+    PanelSimulator,
+    TcpListenerTransport,
+    scenario_from_dict,
+)
+from concord232.supervisor import (
+    PanelSupervisor,
+    RemotePanel,
+    execute_command,
+    install_state_export,
+)
+
+
+@pytest.fixture
+def segment():
+    shm = create_segment(max_zones=4, max_partitions=2)
+    yield shm
+    shm.close()
+    shm.unlink()
+
+
+def _zone(z: int, text: str = "", state: str = "Normal") -> dict:
+    return {
+        "partition_number": 1,
+        "area_number": 0,
+        "group_number": 10,
+        "zone_number": z,
+        "zone_type": "Hardwired",
+        "zone_state": [state],
+        "zone_text": text,
+        "zone_text_tokens": [],
+    }
+
+
+def test_writer_reader_round_trip(segment: Any) -> None:
+    writer = SharedStateWriter(segment)
+    reader = SharedStateReader(segment)
+    assert reader.zones() == {} and reader.panel() == {}
+
+    assert writer.write_zone(_zone(3, "FRONT DOOR"))
+    assert not writer.write_zone(_zone(3, "FRONT DOOR"))
+    writer.write_partition(
+        {
+            "partition_number": 1,
+            "area_number": 0,
+            "arming_level": "Off",
+            "arming_level_code": 1,
+            "user_info": "User 1",
+            "partition_text": "",
+        }
+    )
+    writer.write_panel({"trouble": False, "trouble_count": 0, "trouble_detail": ""})
+
+    assert reader.zones() == {"p1z3": _zone(3, "FRONT DOOR")}
+    assert reader.partitions()[1]["arming_level"] == "Off"
+    assert reader.panel()["trouble"] is False
+    assert reader.version == 3
+
+    writer.write_zone(_zone(3, "FRONT DOOR", "Tripped"))
+    assert reader.zones()["p1z3"]["zone_state"] == ["Tripped"]
+    assert reader.version == 4
+
+
+def test_restarted_writer_reuses_slots(segment: Any) -> None:
+    SharedStateWriter(segment).write_zone(_zone(1, "A"))
+    writer = SharedStateWriter(segment)
+    assert not writer.write_zone(_zone(1, "A"))
+    writer.write_zone(_zone(2, "B"))
+    assert list(SharedStateReader(segment).zones()) == ["p1z1", "p1z2"]
+
+
+def test_segment_full(segment: Any) -> None:
+    writer = SharedStateWriter(segment)
+    for z in range(4):
+        writer.write_zone(_zone(z))
+    with pytest.raises(SegmentFull):
+        writer.write_zone(_zone(9))
+
+
+def test_reader_waits_for_odd_sequence(segment: Any) -> None:
+    writer = SharedStateWriter(segment)
+    writer.write_zone(_zone(1, "A"))
+    reader = SharedStateReader(segment)
+    offset = reader._zone_at(0)
+    (seq,) = struct.unpack_from("<I", segment.buf, offset)
+    struct.pack_into("<I", segment.buf, offset, seq + 1)
+
+    def finish() -> None:
+        time.sleep(0.05)
+        struct.pack_into("<I", segment.buf, offset, seq + 2)
+
+    t = threading.Thread(target=finish)
+    t.start()
+    assert reader.zones()["p1z1"]["zone_text"] == "A"
+    t.join()
+
+
+def test_state_export_follows_panel_messages(segment: Any) -> None:
+    panel = AlarmPanelInterface("fake", 0.25, logging.getLogger("test"))
+    install_state_export(panel, SharedStateWriter(segment))
+    reader = SharedStateReader(segment)
+    assert "trouble" in reader.panel()
+    for msg in (
+        build_cmd_zone_data(1, 0, 10, 5, 0, 0, encode_text_tokens("GARAGE")),
+        build_cmd_zone_status(1, 0, 5, 1),
+        build_cmd_arming_level(1, 0, 3, 1),
+        build_cmd_eqpt_list_done(),
+    ):
+        panel.enqueue_synthetic_msg_for_rx(msg)
+        panel.handle_message(panel.fake_rx_queue.get())
+    zone = reader.zones()["p1z5"]
+    assert zone["zone_text"] == "GARAGE"
+    assert zone["zone_state"] == ["Tripped"]
+    assert reader.partitions() == {}  # no PART_DATA yet: ARM_LEVEL is ignored
+
+
+def test_state_export_waits_for_whole_equipment_lists(segment: Any, deliver) -> None:
+    panel = AlarmPanelInterface("fake", 0.25, logging.getLogger("test"))
+    install_state_export(panel, SharedStateWriter(segment))
+    reader = SharedStateReader(segment)
+    deliver(panel, build_cmd_zone_data(1, 0, 10, 1, 0, 0, encode_text_tokens("A")))
+    deliver(panel, build_cmd_zone_data(1, 0, 10, 2, 0, 0, encode_text_tokens("B")))
+    assert reader.zones() == {}
+    deliver(panel, build_cmd_eqpt_list_done())
+    assert set(reader.zones()) == {"p1z1", "p1z2"}
+    version = reader.version
+    deliver(panel, build_cmd_zone_status(1, 0, 2, 1))
+    assert reader.zones()["p1z2"]["zone_state"] == ["Tripped"]
+    assert reader.version == version + 1
+
+
+def test_remote_panel_queues_allowed_commands() -> None:
+    commands: Any = queue.Queue()
+    remote = RemotePanel(MagicMock(), commands)
+    remote.arm_away("silent", partition=2)
+    remote.send_keys("12", False)
+    controller = MagicMock()
+    execute_command(controller, commands.get())
+    controller.arm_away.assert_called_once_with("silent", partition=2)
+    execute_command(controller, commands.get())
+    controller.send_keys.assert_called_once_with(["1", "2"], False, partition=1)
+    with pytest.raises(ValueError):
+        execute_command(controller, ("stop_loop", (), {}))
+
+
+def test_supervisor_worker_against_simulator(wait_for) -> None:
+    scenario = scenario_from_dict(
+        {
+            "partitions": [{"number": 1, "arming_level": 1}],
+            "zones": [{"partition": 1, "number": 1, "text": "FRONT DOOR"}],
+        }
+    )
+    sim = PanelSimulator(scenario, TcpListenerTransport("127.0.0.1", 0), seed=1)
+    sim.start()
+    supervisor = PanelSupervisor()
+    try:
+        remote = supervisor.add_panel("house", sim.transport.url)
+        supervisor.start()
+        assert wait_for(lambda: remote.zones and remote.partitions, timeout=20.0)
+        assert remote.zones["p1z1"]["zone_text"] == "FRONT DOOR"
+        remote.arm_away(None, partition=1)
+        assert wait_for(
+            lambda: remote.partitions[1]["arming_level_code"] == 3, timeout=20.0
+        )
+        assert supervisor.status()["house"]["alive"]
+    finally:
+        supervisor.stop()
+        sim.stop()
+
+
+def test_worker_modules_do_not_import_flask() -> None:
+    code = (
+        "import sys, concord232.supervisor, concord232.mqtt_setup;"
+        "print('flask' in sys.modules)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")),
+        check=True,
+    ).stdout
+    assert out.strip() == "False"
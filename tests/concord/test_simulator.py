@@ -0,0 +1,80 @@
+import logging
+import threading
+
+from concord232.concord import AlarmPanelInterface
+from concord232.concord_commands import (
+    build_cmd_partition_data,
+    build_cmd_touchpad,
+    build_cmd_zone_data,
+    cmd_partition_data,
+    cmd_touchpad,
+    cmd_zone_data,
+)
+from concord232.concord_tokens import decode_text_tokens, encode_text_tokens
+from concord232.simulator import (
+    PanelSimulator,
+    TcpListenerTransport,
+    scenario_from_dict,
+)
+
+
+class _State:
+    def __init__(self) -> None:
+        self.zones: dict = {}
+        self.partitions: dict = {}
+        self.display_messages: list = []
+
+
+def test_encode_text_tokens_round_trip() -> None:
+    assert decode_text_tokens(encode_text_tokens("Front Door 1")) == "FRONT DOOR 1"
+
+
+def test_builders_round_trip_through_parsers() -> None:
+    state = _State()
+    msg = build_cmd_zone_data(1, 0, 10, 300, 1, 2, encode_text_tokens("GARAGE"))
+    msg.append(0)
+    d = cmd_zone_data(state, msg)
+    assert d["zone_number"] == 300
+    assert d["zone_type"] == "RF"
+    assert d["zone_state"] == ["Faulted"]
+    assert d["zone_text"] == "GARAGE"
+
+    msg = build_cmd_partition_data(2, 0, 3, [])
+    msg.append(0)
+    assert cmd_partition_data(state, msg)["arming_level"] == "Away"
+
+    msg = build_cmd_touchpad(1, 0, 0, encode_text_tokens("SENSOR 07 OPEN"))
+    msg.append(0)
+    assert cmd_touchpad(state, msg)["display_text"] == "SENSOR 07 OPEN"
+
+
+def test_panel_interface_against_simulator(wait_for) -> None:
+    scenario = scenario_from_dict(
+        {
+            "partitions": [{"number": 1, "arming_level": 1}],
+            "zones": [
+                {"partition": 1, "number": 1, "text": "FRONT DOOR"},
+                {"partition": 1, "number": 2, "text": "KITCHEN"},
+            ],
+        }
+    )
+    sim = PanelSimulator(scenario, TcpListenerTransport("127.0.0.1", 0), seed=1)
+    sim.start()
+    panel = AlarmPanelInterface(sim.transport.url, 0.01, logging.getLogger("test"))
+    loop = threading.Thread(target=panel.message_loop, daemon=True)
+    loop.start()
+    try:
+        assert wait_for(lambda: len(panel.zones) == 2 and len(panel.partitions) == 1)
+        assert panel.zones["p1z1"]["zone_text"] == "FRONT DOOR"
+
+        sim.trip_zone(1, 2)
+        assert wait_for(lambda: panel.zones["p1z2"]["zone_state"] == ["Tripped"])
+
+        panel.arm_away(None, partition=1)
+        assert wait_for(lambda: panel.partitions[1]["arming_level"] == "Away/Full")
+        assert sim.stats["naks_sent"] == 0
+        assert wait_for(lambda: sim.stats["acks_received"] == sim.stats["frames_sent"])
+    finally:
+        panel.stop_loop()
+        loop.join(timeout=5)
+        sim.stop()
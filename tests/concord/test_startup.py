@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from concord232.startup import StartupProfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+# Generous budgets over a bare interpreter start.  `concord232_server
+# --help` takes a few tens of ms on a laptop and stays well under its budget
+# on a Raspberry Pi; pulling Flask back in would not.  Importing the API
+# (Flask and werkzeug) is the one expensive stage every server start pays.
+HELP_BUDGET_SECS = 0.5
+API_IMPORT_BUDGET_SECS = 1.5
+HEAVY = ("flask", "werkzeug", "paho", "ssl", "serial", "requests", "prettytable")
+
+
+def _python(code, *args):
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        check=True,
+    ).stdout
+    return out, time.perf_counter() - started
+
+
+def _loaded_after(code):
+    probe = "import json, sys; %s; print(json.dumps(sorted(set(m.split('.')[0] for m in sys.modules) & set(%r))))"
+    out, _ = _python(probe % (code, HEAVY))
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def test_server_module_imports_no_optional_subsystems():
+    assert _loaded_after("import concord232.main") == []
+
+
+def test_client_help_imports_nothing_heavy():
+    code = (
+        "import runpy, sys; sys.argv = ['concord232_client', '--help']\n"
+        "try:\n    runpy.run_path('concord232_client', run_name='__main__')\n"
+        "except SystemExit:\n    pass"
+    )
+    assert _loaded_after(f"exec({code!r})") == []
+
+
+_SERVER_HELP = (
+    "import runpy, sys; sys.argv = ['concord232_server', '--help']\n"
+    "try:\n    runpy.run_path('concord232_server', run_name='__main__')\n"
+    "except SystemExit:\n    pass"
+)
+
+
+def test_server_help_imports_nothing_heavy():
+    assert _loaded_after(f"exec({_SERVER_HELP!r})") == []
+
+
+def test_server_help_time_budget():
+    _, baseline = _python("pass")
+    out, elapsed = _python(_SERVER_HELP)
+    assert "--serial" in out
+    assert elapsed - baseline < HELP_BUDGET_SECS
+
+
+def test_api_import_time_budget():
+    _, baseline = _python("pass")
+    _, elapsed = _python("import concord232.server.api")
+    assert elapsed - baseline < API_IMPORT_BUDGET_SECS
+
+
+def test_startup_profile_report():
+    profile = StartupProfile()
+    with profile.stage("json"):
+        json.dumps({})
+    report = profile.report().splitlines()
+    assert report[0].startswith("json") and report[0].endswith("modules")
+    assert report[-1].startswith("total")
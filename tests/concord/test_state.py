@@ -0,0 +1,217 @@
+import logging
+
+import pytest
+
+from concord232.concord import AlarmPanelInterface
+from concord232.concord_commands import (
+    build_cmd_arming_level,
+    build_cmd_eqpt_list_done,
+    build_cmd_partition_data,
+    build_cmd_zone_data,
+    build_cmd_zone_status,
+)
+from concord232.concord_tokens import encode_text_tokens
+from concord232.server import api
+from concord232.server.state import BOOT_ID, StateSnapshot, build_snapshot, project
+
+
+@pytest.fixture
+def panel(deliver):
+    panel = AlarmPanelInterface("fake", 0.25, logging.getLogger("test"))
+    deliver(panel, build_cmd_partition_data(1, 0, 1, encode_text_tokens("HOUSE")))
+    deliver(panel, build_cmd_partition_data(2, 0, 1, encode_text_tokens("BARN")))
+    for partition, zone, name in (
+        (1, 1, "FRONT DOOR"),
+        (1, 2, "FRONT WINDOW"),
+        (1, 3, "GARAGE"),
+        (2, 1, "FRONT GATE"),
+    ):
+        deliver(
+            panel,
+            build_cmd_zone_data(partition, 0, 10, zone, 0, 0, encode_text_tokens(name)),
+        )
+    deliver(panel, build_cmd_eqpt_list_done())
+    deliver(panel, build_cmd_zone_status(1, 0, 2, 2))
+    deliver(panel, build_cmd_zone_status(2, 0, 1, 2))
+    return panel
+
+
+@pytest.fixture
+def client(panel):
+    api.CONTROLLER = panel
+    with api.app.test_client() as client:
+        yield client
+
+
+def test_state_version_counts_state_changes(panel, deliver):
+    version = panel.state_version
+    deliver(panel, build_cmd_zone_status(1, 0, 3, 1))
+    deliver(panel, build_cmd_arming_level(1, 0, 1, 2))
+    assert panel.state_version == version + 2
+
+
+def test_snapshot_indexes(panel):
+    snapshot = build_snapshot(panel, api.show_zone, api.show_partition)
+    assert snapshot.version == panel.state_version
+    assert [p["zones"] for p in snapshot.partitions] == [3, 1]
+    assert len(snapshot.zones_by_partition[1]) == 3
+    assert len(snapshot.zones_by_state["faulted"]) == 2
+    names = [snapshot.zones[i]["name"] for i in snapshot.zones_with_name_prefix("fr")]
+    assert names == ["FRONT DOOR", "FRONT GATE", "FRONT WINDOW"]
+    assert snapshot.zones_with_name_prefix("x") == []
+
+
+def test_select_combines_filters():
+    snapshot = StateSnapshot(
+        7,
+        {"trouble": False, "trouble_count": 0, "other": 1},
+        [{"number": 1}],
+        [
+            {"partition": 1, "number": 2, "name": "Hall", "state": []},
+            {"partition": 1, "number": 1, "name": "Hallway", "state": ["Faulted"]},
+        ],
+    )
+    state = snapshot.select(1, ["faulted", "tripped"], "HALL")
+    assert state["state_version"] == 7
+    assert [z["number"] for z in state["zones"]] == [1]
+    assert state["troubles"] == {"trouble": False, "trouble_count": 0}
+    assert [z["number"] for z in snapshot.select(states=["Normal"])["zones"]] == [2]
+    assert snapshot.select(partition=3) == dict(
+        snapshot.select(), partitions=[], zones=[]
+    )
+
+
+def test_project():
+    state = {
+        "state_version": 1,
+        "panel": {"trouble": False},
+        "partitions": [{"number": 1, "arming_level": "Off"}],
+        "zones": [{"number": 1, "name": "A", "state": []}],
+        "troubles": {},
+    }
+    assert project(state, ["zones.number", "zones.state", "panel"]) == {
+        "state_version": 1,
+        "zones": [{"number": 1, "state": []}],
+        "panel": {"trouble": False},
+    }
+    assert project(state, ["zones.name", "zones"])["zones"] == state["zones"]
+    with pytest.raises(ValueError):
+        project(state, ["users"])
+
+
+def test_state_endpoint(client, panel):
+    resp = client.get("/state")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert set(body) == {"state_version", "panel", "partitions", "zones", "troubles"}
+    assert body["state_version"] == panel.state_version
+    assert len(body["zones"]) == 4
+
+    body = client.get("/state?partition=1&state=Faulted&fields=zones.name").get_json()
+    assert body == {
+        "state_version": panel.state_version,
+        "zones": [{"name": "FRONT WINDOW"}],
+    }
+    body = client.get("/state?name=front%20g&fields=zones.number").get_json()
+    assert body["zones"] == [{"number": 1}]
+
+
+def test_state_endpoint_reuses_snapshot_until_state_changes(client, panel, deliver):
+    first = api._snapshot_for(panel)
+    assert api._snapshot_for(panel) is first
+    deliver(panel, build_cmd_zone_status(1, 0, 3, 2))
+    second = api._snapshot_for(panel)
+    assert second is not first
+    body = client.get("/state?state=faulted&fields=zones.number").get_json()
+    assert len(body["zones"]) == 3
+
+
+def test_state_endpoint_rejects_bad_arguments(client):
+    assert client.get("/state?partition=x").status_code == 400
+    assert client.get("/state?fields=users").status_code == 400
+    assert client.get("/panels/nope/state").status_code == 404
+
+
+def test_parsers_record_entity_versions(panel, deliver):
+    version = panel.state_version
+    deliver(panel, build_cmd_zone_status(1, 0, 2, 2))  # unchanged
+    assert panel.state_version == version
+    deliver(panel, build_cmd_zone_status(1, 0, 3, 1))
+    deliver(panel, build_cmd_arming_level(2, 0, 1, 3))
+    assert panel.zone_versions[(1, 3)] == version + 1
+    assert panel.partition_versions[2] == version + 2
+    assert panel.state_version == version + 2
+
+
+def test_single_zone_and_partition(client):
+    body = client.get("/zones/1/3").get_json()
+    assert body["zone"]["name"] == "GARAGE"
+    assert client.get("/partitions/2").get_json()["partition"]["zones"] == 1
+    assert client.get("/zones/1/9").status_code == 404
+    assert client.get("/partitions/5").status_code == 404
+    assert client.get("/zones/1/x").status_code == 404
+
+
+def test_changes_since(client, panel, deliver):
+    body = client.get("/changes").get_json()
+    assert not body["reset"] and "panel" in body
+    assert len(body["zones"]) == 4 and len(body["partitions"]) == 2
+    version = body["state_version"]
+
+    assert body["epoch"] == BOOT_ID
+
+    body = client.get("/changes?since=%d&epoch=%s" % (version, BOOT_ID)).get_json()
+    assert body == {
+        "epoch": BOOT_ID,
+        "state_version": version,
+        "reset": False,
+        "partitions": [],
+        "zones": [],
+    }
+
+    deliver(panel, build_cmd_zone_status(2, 0, 1, 0))
+    deliver(panel, build_cmd_arming_level(1, 0, 1, 2))
+    body = client.get("/changes?since=%d" % version).get_json()
+    assert body["state_version"] == version + 2
+    assert [(z["partition"], z["number"]) for z in body["zones"]] == [(2, 1)]
+    assert [p["number"] for p in body["partitions"]] == [1]
+
+    body = client.get("/changes?since=%d" % (version + 100)).get_json()
+    assert body["reset"] and len(body["zones"]) == 4
+    assert client.get("/changes?since=x").status_code == 400
+
+
+def test_changes_include_partitions_whose_zone_count_changed(client, panel, deliver):
+    version = client.get("/changes").get_json()["state_version"]
+    deliver(
+        panel,
+        build_cmd_zone_data(2, 0, 10, 2, 0, 0, encode_text_tokens("BARN DOOR")),
+    )
+    deliver(panel, build_cmd_eqpt_list_done())
+    body = client.get("/changes?since=%d&epoch=%s" % (version, BOOT_ID)).get_json()
+    assert [(z["partition"], z["number"]) for z in body["zones"]] == [(2, 2)]
+    assert [(p["number"], p["zones"]) for p in body["partitions"]] == [(2, 2)]
+
+    version = body["state_version"]
+    deliver(panel, build_cmd_zone_status(2, 0, 2, 1))  # known zone, same count
+    body = client.get("/changes?since=%d&epoch=%s" % (version, BOOT_ID)).get_json()
+    assert [(z["partition"], z["number"]) for z in body["zones"]] == [(2, 2)]
+    assert body["partitions"] == []
+
+
+def test_changes_from_another_boot_reset(client, panel):
+    version = client.get("/changes").get_json()["state_version"]
+    body = client.get("/changes?since=%d&epoch=other" % version).get_json()
+    assert body["reset"] and body["epoch"] == BOOT_ID
+    assert len(body["zones"]) == 4 and "panel" in body
+    body = client.get("/changes?since=%d&epoch=%s" % (version, BOOT_ID)).get_json()
+    assert not body["reset"] and body["zones"] == []
+
+
+def test_changes_without_entity_versions():
+    snapshot = StateSnapshot(3, {}, [{"number": 1}], [])
+    assert snapshot.changes(2)["partitions"] == [{"number": 1}]
+    assert snapshot.changes(3)["partitions"] == []
+    assert "panel" not in snapshot.changes(3)
+    assert snapshot.changes(3, BOOT_ID)["partitions"] == []
+    assert snapshot.changes(3, "old boot")["reset"]
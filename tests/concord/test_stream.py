@@ -0,0 +1,54 @@
+import logging
+
+from concord232.concord import AlarmPanelInterface
+from concord232.concord_commands import (
+    build_cmd_eqpt_list_done,
+    build_cmd_zone_data,
+    build_cmd_zone_status,
+)
+from concord232.concord_tokens import encode_text_tokens
+from concord232.server.api import show_partition, show_zone
+from concord232.server.stream import ChangeFeed, install_change_feed
+
+
+def test_feed_sends_snapshot_then_deltas(deliver):
+    panel = AlarmPanelInterface("fake", 0.25, logging.getLogger("test"))
+    feed = install_change_feed(panel, show_zone, show_partition)
+    events = feed.events(keepalive=60)
+    first = next(events)
+    assert first.startswith("id: 1\nevent: snapshot\n")
+    assert '"zones":[]' in first
+    link = next(events)
+    assert link.startswith("id: 2\nevent: link\n") and '"last_rx_secs":null' in link
+
+    deliver(panel, build_cmd_zone_data(1, 0, 10, 5, 0, 0, encode_text_tokens("GARAGE")))
+    deliver(panel, build_cmd_zone_status(1, 0, 5, 1))
+    added, tripped = next(events), next(events)
+    assert added.startswith("id: 3\nevent: zone\n") and '"name":"GARAGE"' in added
+    assert '"state":["Tripped"]' in tripped
+
+    deliver(panel, build_cmd_eqpt_list_done())
+    assert next(events).startswith("id: 5\nevent: snapshot\n")
+    assert panel.link_health()["rx_frames"] == 3
+
+    events.close()
+    assert feed.subscriber_count == 0
+
+
+def test_keepalive_without_link_health():
+    events = ChangeFeed(dict).events(keepalive=0.01)
+    next(events)
+    assert next(events) == ": keepalive\n\n"
+    events.close()
+
+
+def test_lagging_subscriber_gets_a_fresh_snapshot():
+    feed = ChangeFeed(lambda: {"n": "snap"}, queue_size=2)
+    events = feed.events()
+    next(events)
+    for i in range(5):
+        feed.publish("zone", {"n": i})
+    assert '"n":"snap"' in next(events)
+    feed.publish("zone", {"n": 9})
+    assert '"n":9' in next(events)
+    events.close()
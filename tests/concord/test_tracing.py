@@ -0,0 +1,186 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, List
+from unittest.mock import MagicMock
+
+from concord232.concord import (
+    ACK,
+    MSG_START,
+    AlarmPanelInterface,
+    compute_checksum,
+    encode_message_to_ascii,
+)
+from concord232.concord_commands import build_cmd_zone_status
+from concord232.tracing import FrameTrace, JsonLinesExporter, Tracer
+
+
+class ListExporter:
+    def __init__(self) -> None:
+        self.traces: List[Any] = []
+
+    def export(self, trace: Any) -> None:
+        self.traces.append(trace.to_dict())
+
+    def close(self) -> None:
+        pass
+
+
+class FakeSerdev:
+    def __init__(self, data: bytes) -> None:
+        self.data = bytearray(data)
+        self.written: List[bytes] = []
+
+    def inWaiting(self) -> int:
+        return len(self.data)
+
+    def read(self, size: int = 1) -> bytes:
+        out = bytes(self.data[:size])
+        del self.data[:size]
+        return out
+
+    def write(self, data: bytes) -> None:
+        self.written.append(data)
+
+
+def _panel(**tracer_kwargs: Any) -> Any:
+    panel = AlarmPanelInterface("fake", 0.0, logging.getLogger("test"))
+    exporter = ListExporter()
+    panel.set_tracer(Tracer(exporter, **tracer_kwargs))
+    return panel, exporter
+
+
+def _events(trace: dict) -> List[str]:
+    return [e["event"] for e in trace["events"]]
+
+
+def test_rx_frame_trace_from_wire() -> None:
+    panel, exporter = _panel(trace_bytes=True)
+    msg = build_cmd_zone_status(1, 0, 3, 1)
+    msg.append(compute_checksum(msg))
+    wire = (MSG_START + encode_message_to_ascii(msg)).encode()
+    panel.serial_interface.serdev = FakeSerdev(wire)
+    handler = MagicMock(__qualname__="h")
+    panel.register_message_handler("ZONE_STATUS", handler)
+
+    panel._message_loop_once(datetime.now(), datetime.now())
+
+    assert len(exporter.traces) == 1
+    trace = exporter.traces[0]
+    assert trace["kind"] == "rx"
+    events = _events(trace)
+    assert events[0] == "rx_start"
+    assert events.count("rx_byte") == len(wire) - 1
+    assert [e for e in events if e != "rx_byte"] == [
+        "rx_start",
+        "frame_complete",
+        "checksum_ok",
+        "ack_sent",
+        "parsed",
+        "handler_start",
+        "handler_end",
+    ]
+    parsed = trace["events"][-3]
+    assert parsed["command_id"] == "ZONE_STATUS"
+    times = [e["t_us"] for e in trace["events"]]
+    assert times == sorted(times)
+    assert panel.serial_interface.byte_hook is None
+
+
+def test_bad_checksum_trace() -> None:
+    panel, exporter = _panel()
+    msg = build_cmd_zone_status(1, 0, 3, 1)
+    msg.append((compute_checksum(msg) + 1) % 256)
+    panel.serial_interface.serdev = FakeSerdev(
+        (MSG_START + encode_message_to_ascii(msg)).encode()
+    )
+    panel._message_loop_once(datetime.now(), datetime.now())
+    assert _events(exporter.traces[0]) == [
+        "rx_start",
+        "frame_complete",
+        "checksum_bad",
+    ]
+
+
+def test_tx_trace_enqueue_write_ack() -> None:
+    panel, exporter = _panel()
+    panel.serial_interface = MagicMock()
+    panel.serial_interface.message_chars_maybe_available.return_value = False
+    panel.request_zones()
+    panel._message_loop_once(datetime.now(), datetime.now())
+    assert exporter.traces == []
+    panel.ctrl_char_cb(ACK)
+    trace = exporter.traces[0]
+    assert trace["kind"] == "tx"
+    assert _events(trace) == ["enqueue", "tx_write", "ack"]
+    assert trace["events"][1]["attempt"] == 1
+
+
+def test_tx_trace_failure() -> None:
+    panel, exporter = _panel()
+    panel.serial_interface = MagicMock()
+    panel.request_zones()
+    panel.send_message(panel.tx_queue.get())
+    for _ in range(3):
+        panel.maybe_resend_message("timeout")
+    events = _events(exporter.traces[0])
+    assert events == ["enqueue", "tx_write", "tx_write", "tx_write", "failed"]
+
+
+def test_sampling_skips_frames() -> None:
+    panel, exporter = _panel(sample_rate=0.0)
+    panel.enqueue_synthetic_msg_for_rx(build_cmd_zone_status(1, 0, 3, 1))
+    panel.serial_interface = MagicMock()
+    panel.serial_interface.message_chars_maybe_available.return_value = False
+    panel._message_loop_once(datetime.now(), datetime.now())
+    assert exporter.traces == []
+    assert panel.zones
+
+
+def test_json_lines_exporter(tmp_path: Any) -> None:
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(JsonLinesExporter(str(path)))
+    for _ in range(2):
+        trace = tracer.start("rx")
+        assert trace is not None
+        trace.event("parsed", command_id="ALARM")
+        tracer.finish(trace)
+    tracer.close()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [t["trace_id"] for t in lines] == [1, 2]
+    assert lines[0]["events"][0]["command_id"] == "ALARM"
+
+
+def test_json_lines_exporter_drops_instead_of_blocking(tmp_path: Any) -> None:
+    exporter = JsonLinesExporter(str(tmp_path / "traces.jsonl"), maxsize=1)
+    real_file = exporter._fh
+    release = threading.Event()
+
+    class SlowFile(object):
+        def write(self, text: str) -> None:
+            release.wait()
+            real_file.write(text)
+
+        def flush(self) -> None:
+            real_file.flush()
+
+        def close(self) -> None:
+            real_file.close()
+
+    exporter._fh = SlowFile()
+    tracer = Tracer(exporter)
+    tracer.finish(FrameTrace(1, "rx"))
+    deadline = time.monotonic() + 5
+    while not exporter._queue.empty() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    started = time.perf_counter()
+    tracer.finish(FrameTrace(2, "rx"))
+    tracer.finish(FrameTrace(3, "rx"))
+    assert time.perf_counter() - started < 0.5
+    assert exporter.dropped == 1
+    release.set()
+    tracer.close()
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert [json.loads(line)["trace_id"] for line in lines] == [1, 2]
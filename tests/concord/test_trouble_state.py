@@ -68,3 +68,26 @@ def test_idempotent_repeated_trouble() -> None:
     assert apply_alarm_to_trouble_store(store, t) is True
     assert apply_alarm_to_trouble_store(store, t) is False
     assert len(store) == 1
+
+
+def test_trouble_handler_called_on_change() -> None:
+    import logging
+
+    from concord232.concord import AlarmPanelInterface
+
+    panel = AlarmPanelInterface("fake", 0.25, logging.getLogger("test"))
+    seen: list = []
+    panel.register_trouble_handler(seen.append)
+    assert seen == [
+        {
+            "trouble": False,
+            "trouble_count": 0,
+            "trouble_detail": "",
+            "trouble_buses": [],
+        }
+    ]
+    panel._merge_trouble_state(_sys_trouble(4, 21, "Bus Device Failure"))
+    assert seen[-1]["trouble"] is True
+    assert seen[-1]["trouble_buses"] == [4]
+    panel._merge_trouble_state(_sys_trouble(4, 21, "Bus Device Failure"))
+    assert len(seen) == 2
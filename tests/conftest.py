@@ -0,0 +1,29 @@
+import time
+
+import pytest
+
+
+def _deliver(panel, msg):
+    panel.enqueue_synthetic_msg_for_rx(msg)
+    panel.handle_message(panel.fake_rx_queue.get())
+
+
+def _wait_for(cond, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def deliver():
+    """deliver(panel, msg): hand a built panel message to a fake-port panel."""
+    return _deliver
+
+
+@pytest.fixture
+def wait_for():
+    """wait_for(cond, timeout=5.0): poll cond() until true; False on timeout."""
+    return _wait_for